@@ -40,23 +40,52 @@ from autogen_core import CancellationToken
 from autogen_core.model_context import (
     BufferedChatCompletionContext,
     HeadAndTailChatCompletionContext,
-    TokenLimitedChatCompletionContext,
     UnboundedChatCompletionContext,
 )
-from autogen_core.models import AssistantMessage, SystemMessage, UserMessage
+from autogen_core.models import SystemMessage, UserMessage
+from autogen_core.tools import BaseTool as AutogenBaseTool
 from autogen_ext.agents.web_surfer import MultimodalWebSurfer
 from autogen_ext.models.openai._openai_client import (
     AzureOpenAIChatCompletionClient,
     OpenAIChatCompletionClient,
 )
 
+from . import config as _config
 from .logging_utils import get_logger, trace  # noqa: F401
+from .loop_watchdog import track, tracked
+from .model_context import (
+    CachedTokenLimitedChatCompletionContext,
+    ContextBudgetExceeded,
+    ContextFittingChatCompletionClient,
+    MessageTokenCounter,
+    PromptPrefix,
+    SummarizingChatCompletionContext,
+)
 from .model_manager import ModelManager
 from .terminator import SmartReflectorTermination
+from .tool_execution import (
+    CachedTool,
+    ManagedTool,
+    SessionWorkbench,
+    StagedTool,
+    ToolCallRecord,
+    ToolExecutionStage,
+    ToolResultCache,
+    ToolResultStore,
+    policy_for,
+    resolve_cache_policy,
+    resolve_execution_policy,
+    resolve_output_policies,
+)
 from .tool_utils import (
+    LazyTool,
+    MCPSessionPool,
+    MCPToolSchemaCache,
+    MCPValidationCache,
     create_mcp_validation_task,
     load_agent_mcp_tools,
     load_tools,
+    pending_agent_mcp_loads,
     register_mcp_placeholders,
     replace_mcp_placeholders_with_real_tools,
     validate_and_load_mcp_tools,
@@ -224,21 +253,46 @@ class AgentManager:
             if val.get("chooseable", True)
         ]
 
-        # Initialize available tools
+        # Compiled prompt prefixes, shared by all sessions of an agent
+        self._prompt_prefixes: dict[tuple, PromptPrefix] = {}
+        # Results of idempotent tool calls, shared by all sessions
+        self.tool_result_cache = ToolResultCache()
+
+        settings = _config.get_settings()
+
+        # Initialize available tools. Tools are discovered without importing
+        # them; a tool is imported when a session of an agent using it starts.
+        # The discovery manifest is cached at the tool_manifest_path setting.
+        manifest_cache = settings.get("tool_manifest_path", None)
         if tools_directory is None:
             # Load only default tools or none at all
-            self.tools = load_tools(None) if load_default_tools else {}
+            self.tools = (
+                load_tools(None, lazy=True, manifest_cache=manifest_cache)
+                if load_default_tools
+                else {}
+            )
         else:
             # Load custom tools; optionally merge default tools
-            custom_tools = load_tools(tools_directory)
+            custom_tools = load_tools(
+                tools_directory, lazy=True, manifest_cache=manifest_cache
+            )
             if load_default_tools:
-                default_tools = load_tools(None)
+                default_tools = load_tools(
+                    None, lazy=True, manifest_cache=manifest_cache
+                )
                 self.tools = {**default_tools, **custom_tools}
             else:
                 self.tools = custom_tools
 
         # Initialize MCP tool manager and validate MCP tools
         self.mcp_manager = None
+        # Live MCP server sessions shared by all conversations of this manager
+        self.mcp_pool = MCPSessionPool(schema_cache=MCPToolSchemaCache())
+        # Validated MCP tool lists, kept until the server changes; with the
+        # mcp_validation_cache_path setting they also survive restarts
+        self.mcp_validation_cache = MCPValidationCache(
+            settings.get("mcp_validation_cache_path", None)
+        )
         self._mcp_validation_task = None
         self._mcp_placeholder_tools = {}  # spec_string -> placeholder tool name
         # Register MCP placeholders via tool_utils
@@ -247,6 +301,44 @@ class AgentManager:
         )
         self._start_mcp_validation()
 
+    def _model_name(self, model_id: str) -> str | None:
+        """Provider model name for a model id, used to pick a tokenizer."""
+        config = getattr(self.mm, "config", {}).get(model_id)
+        return getattr(config, "model", None)
+
+    def get_prompt_prefix(self, agent_name: str, model_id: str) -> PromptPrefix:
+        """Return the compiled prompt prefix of an agent for a model.
+
+        The prefix (system prompt or injected prompt, plus `extra_context`
+        messages) and its token count are built once and shared by reference
+        across sessions. It is rebuilt automatically if the agent's prompt or
+        extra_context change.
+        """
+        agent_data = self._agents[agent_name]
+        prompt = agent_data.get("prompt", "")
+        extra_context = tuple(
+            tuple(extra) for extra in agent_data.get("extra_context") or []
+        )
+        key = (agent_name, model_id, prompt, extra_context)
+        prefix = self._prompt_prefixes.get(key)
+        if prefix is None:
+            prefix = PromptPrefix.build(
+                agent_name,
+                prompt,
+                extra_context,
+                system_prompt_support=self.mm.get_system_prompt_support(model_id),
+                token_counter=MessageTokenCounter(model=self._model_name(model_id)),
+            )
+            # drop prefixes built from an older version of this agent
+            for stale in [k for k in self._prompt_prefixes if k[:2] == key[:2]]:
+                del self._prompt_prefixes[stale]
+            self._prompt_prefixes[key] = prefix
+            logger.debug(
+                f"compiled prompt prefix for {agent_name} on {model_id}: "
+                f"{len(prefix.messages)} messages, {prefix.token_count} tokens"
+            )
+        return prefix
+
     def new_agent(
         self, agent_name, model_name, prompt, tools: list | None = None
     ) -> None:
@@ -442,9 +534,37 @@ class AgentManager:
             return True
         return False
 
+    def get_tool(self, tool_name: str):
+        """Get a tool from the global registry, importing it on first use.
+
+        Args:
+            tool_name: Name of the tool
+
+        Returns:
+            The tool, or None if it is unknown or failed to load
+        """
+        tool = self.tools.get(tool_name)
+        if isinstance(tool, LazyTool):
+            loaded = tool.load()
+            if loaded is None:
+                # not callable (e.g. missing API key); drop it like eager loading
+                logger.warning(
+                    f"Tool '{tool_name}' could not be loaded on first use; "
+                    "removed from the registry"
+                )
+                del self.tools[tool_name]
+                return None
+            self.tools[tool_name] = tool = loaded
+        return tool
+
     def list_tools(self) -> list[str]:
         """Get list of all available tools.
 
+        Tools discovered but not imported yet are listed from the tool manifest
+        without importing them; one that turns out not to be callable (its
+        `verify_setup` fails) is reported and dropped on first use by
+        `get_tool`.
+
         Returns:
             List of tool names in the global registry
         """
@@ -528,9 +648,9 @@ class AgentManager:
             Dictionary with tool information including which agents use it
 
         Raises:
-            ValueError: If tool doesn't exist
+            ValueError: If tool doesn't exist or is not callable
         """
-        if tool_name not in self.tools:
+        if self.get_tool(tool_name) is None:
             raise ValueError(f"Tool '{tool_name}' not found")
 
         # Find which agents use this tool
@@ -551,11 +671,13 @@ class AgentManager:
 
     def _start_mcp_validation(self):
         """Start MCP tool validation in the background (delegates to tool_utils)."""
-        self._mcp_validation_task = create_mcp_validation_task(self._agents)
+        self._mcp_validation_task = create_mcp_validation_task(
+            self._agents, self.mcp_pool, self.mcp_validation_cache
+        )
 
     # removed: _validate_mcp_tools (handled by tool_utils.run_mcp_validation)
 
-    async def get_agent_mcp_tools(self, agent_name: str) -> dict[str, any]:
+    async def get_agent_mcp_tools(self, agent_name: str) -> dict[str, Any]:
         """Get MCP tools for a specific agent.
 
         This is called when starting a conversation to load MCP tools.
@@ -572,7 +694,9 @@ class AgentManager:
         # Ensure MCP manager is initialized
         if self.mcp_manager is None:
             # If validation didn't run during init, do it now
-            self.mcp_manager, _ = await validate_and_load_mcp_tools(self._agents)
+            self.mcp_manager, _ = await validate_and_load_mcp_tools(
+                self._agents, self.mcp_pool, self.mcp_validation_cache
+            )
 
         # Wait for validation to complete if it's still running
         if self._mcp_validation_task and not self._mcp_validation_task.done():
@@ -590,6 +714,16 @@ class AgentManager:
 
         return mcp_tools
 
+    def get_pending_mcp_loads(self, agent_name: str) -> dict[str, asyncio.Task]:
+        """Get the MCP servers of an agent that are still loading in the background.
+
+        Servers that miss their `load_timeout` when a conversation starts keep
+        loading; sessions attach their tools once the returned tasks finish.
+        """
+        if agent_name not in self._agents:
+            raise ValueError(f"Agent '{agent_name}' does not exist")
+        return pending_agent_mcp_loads(self._agents[agent_name], self.mcp_manager)
+
     def _replace_placeholder_tools_with_real_tools(self, mcp_tools: dict):
         """Replace placeholders with actual loaded MCP tools in the global registry.
 
@@ -613,6 +747,7 @@ class AgentManager:
 
         if self.mcp_manager:
             await self.mcp_manager.cleanup_connections()
+        await self.mcp_pool.close()
 
     async def __aenter__(self):
         """Async context manager entry."""
@@ -698,26 +833,44 @@ class AgentSession:
         self._stream_tokens = stream_tokens
         self._streaming_preference = stream_tokens
         # per-session callback; use provided callback or fall back to manager default
-        self._agent_callback = (
+        self._agent_callback = tracked(
             agent_callback
             if agent_callback is not None
-            else manager._default_agent_callback
+            else manager._default_agent_callback,
+            "callback:agent_callback",
         )
-        self._message_callback = (
+        self._message_callback = tracked(
             message_callback
             if message_callback is not None
-            else manager._default_message_callback
+            else manager._default_message_callback,
+            "callback:message_callback",
         )
 
         # Will be used to cancel ongoing tasks for this session
         self._cancelation_token: CancellationToken | None = None
 
+        # Full results of compacted tool outputs, readable by the agent
+        self.tool_results = ToolResultStore()
+        # Tool calls of this session answered from the manager's result cache
+        self.tool_cache_hits = 0
+        # Runs the session's tool calls (created with the first tools wrapped)
+        self._tool_stage: ToolExecutionStage | None = None
+        # Records (latency, errors) of the last batch of executed tool calls
+        self.last_tool_calls: list[ToolCallRecord] = []
+        # MCP servers still loading when the session started (spec -> task)
+        self._pending_mcp_loads: dict[str, asyncio.Task] = {}
+        # workbench of the solo agent's tools
+        self._workbench: SessionWorkbench | None = None
+
         # These will be set during initialization
         self.agent = None
         self.agent_team = None
         self.terminator = None
         self.oneshot = False
         self._prompt = ""
+        self._prompt_prefix: PromptPrefix | None = None
+        # session-specific prefix installed by evolve_prompt()
+        self._own_prompt_prefix: PromptPrefix | None = None
         self._description = ""
 
     @classmethod
@@ -817,12 +970,18 @@ class AgentSession:
             else:
                 # Load regular Python tools (filter out dict-based MCP tools)
                 string_tools = [t for t in agent_data["tools"] if isinstance(t, str)]
-                regular_tools = [tools_map[t] for t in string_tools if t in tools_map]
+                regular_tools = [
+                    tool
+                    for t in string_tools
+                    if t in tools_map and (tool := self.manager.get_tool(t)) is not None
+                ]
 
                 # Load MCP tools for this agent
                 mcp_tools = await self.manager.get_agent_mcp_tools(agent)
                 mcp_tool_list = list(mcp_tools.values())
 
+                self._pending_mcp_loads = self.manager.get_pending_mcp_loads(agent)
+
                 # Combine regular and MCP tools
                 tools = regular_tools + mcp_tool_list
 
@@ -830,14 +989,18 @@ class AgentSession:
                     f"Loaded {len(regular_tools)} regular tools and "
                     f"{len(mcp_tool_list)} MCP tools for agent {agent}"
                 )
+                tools = self._wrap_tools(tools, agent_data, source=agent)
 
-            # system message if supported; else pass prompt as initial user message
-            if mm.get_system_prompt_support(self._model_id):
-                system_message = self._prompt
-                initial_messages = None
-            else:
-                system_message = None
-                initial_messages = [UserMessage(content=self._prompt, source="user")]
+            # system message if supported; else pass prompt as initial user
+            # message. The compiled prefix is shared by all sessions of the agent
+            # unless this session evolved its own.
+            prefix = self._own_prompt_prefix or self.manager.get_prompt_prefix(
+                agent, self._model_id
+            )
+            self._prompt_prefix = prefix
+            self._prompt = prefix.prompt
+            system_message = prefix.system_message
+            initial_messages = list(prefix.initial_messages) or None
 
             # Build the model_context (with optional initial messages)
             model_context = self._make_model_context(
@@ -847,22 +1010,18 @@ class AgentSession:
                 initial_messages=initial_messages,
             )
 
-            # Load Extra multi-shot messages if they exist
-            if "extra_context" not in agents[agent]:
-                agents[agent]["extra_context"] = []
-            for extra in agents[agent]["extra_context"]:
-                if extra[0] == "ai":
-                    await model_context.add_message(
-                        AssistantMessage(content=extra[1], source=agent)
-                    )
-                elif extra[0] == "human":
-                    await model_context.add_message(
-                        UserMessage(content=extra[1], source="user")
-                    )
-                elif extra[0] == "system":
-                    raise ValueError(f"system message not implemented: {extra[0]}")
-                else:
-                    raise ValueError(f"Unknown extra context type {extra[0]}")
+            # Load Extra multi-shot messages if they exist (shared, not copied)
+            for message in prefix.extra_messages:
+                await model_context.add_message(message)
+
+            # Optionally fit every request into the model's context budget
+            model_client = self._fit_model_client(
+                model_client,
+                self._model_id,
+                agent_data,
+                model_context,
+                initial_messages,
+            )
 
             # build the agent
             if agent_data.get("type") == "autogen-agent":
@@ -887,6 +1046,7 @@ class AgentSession:
                         "name",
                         "model_client",
                         "tools",
+                        "workbench",
                         "model_context",
                         "system_message",
                         "model_client_stream",
@@ -902,10 +1062,12 @@ class AgentSession:
                             sorted(dropped),
                         )
 
+                # an owned workbench, so tools of late MCP servers can be added
+                self._workbench = SessionWorkbench(tools) if tools is not None else None
                 self.agent = AssistantAgent(
                     name=agent,
                     model_client=model_client,
-                    tools=tools,
+                    workbench=self._workbench,
                     model_context=model_context,
                     system_message=system_message,
                     model_client_stream=True,
@@ -1001,7 +1163,8 @@ class AgentSession:
                         "injected prompt."
                     )
             # token-limited and unbounded are acceptable; trimming is token-based
-            # and not deterministic here
+            # and not deterministic here. summarizing always keeps the initial
+            # messages verbatim, so the injected prompt survives compaction.
         except Exception as e:
             # Surface as configuration error with proper chaining
             name = agent_data.get("name", "unknown")
@@ -1020,7 +1183,7 @@ class AgentSession:
 
         Supported configuration on the agent:
           context:
-            type: unbounded | buffered | token | head_tail
+            type: unbounded | buffered | token | head_tail | summarizing
             # buffered
             buffer_size: int
             # token
@@ -1028,6 +1191,12 @@ class AgentSession:
             # head_tail
             head_size: int
             tail_size: int
+            # summarizing
+            token_threshold: int
+            tail_size: int
+            summary_model: str | null
+            # any type; applied to the model client, see _fit_model_client
+            fit_to_model: bool
 
         Falls back to UnboundedChatCompletionContext if unset or invalid.
         """
@@ -1067,11 +1236,14 @@ class AgentSession:
                     else int(token_limit_raw)
                 )
                 # tool_schema is optional; for now we let it be None (tools are
-                # passed to agent separately)
-                return TokenLimitedChatCompletionContext(
+                # passed to agent separately). Token counts are memoized per
+                # message using the tiktoken encoding of the agent's model.
+                model_id = agent_data.get("model", self._model_id)
+                return CachedTokenLimitedChatCompletionContext(
                     model_client=model_client,
                     token_limit=token_limit,
                     initial_messages=initial_messages,
+                    model=self.manager._model_name(model_id),
                 )
 
             if ctx_type in ("head_tail", "headandtail", "head_and_tail", "head-tail"):
@@ -1085,6 +1257,19 @@ class AgentSession:
                     initial_messages=initial_messages,
                 )
 
+            if ctx_type in ("summarizing", "summarize", "summary"):
+                mm = self.manager.mm
+                token_threshold = int(ctx_cfg.get("token_threshold", 4000))
+                tail_size = int(ctx_cfg.get("tail_size", 10))
+                summary_model = ctx_cfg.get("summary_model") or mm.default_mini_model
+                return SummarizingChatCompletionContext(
+                    summary_client=mm.open_model(summary_model),
+                    token_threshold=token_threshold,
+                    tail_size=tail_size,
+                    model_client=model_client,
+                    initial_messages=initial_messages,
+                )
+
         except Exception as e:
             logger.warning(
                 "invalid context config for agent '%s': %s; defaulting to unbounded",
@@ -1101,6 +1286,140 @@ class AgentSession:
         )
         return UnboundedChatCompletionContext(initial_messages=initial_messages)
 
+    def _wrap_tools(
+        self, tools: list, agent_data: dict, source: str | None = None
+    ) -> list:
+        """Run tools through the session's execution stage, then apply the
+        agent's tool result caching and its output policies."""
+        tools = self._apply_tool_execution(tools, agent_data, source)
+        return self._apply_tool_output_policies(
+            self._apply_tool_cache(tools, agent_data), agent_data
+        )
+
+    @property
+    def tool_stage(self) -> ToolExecutionStage:
+        """The session's tool execution stage; its parallelism comes from the
+        `tool_execution` settings of the session's agent (or team)."""
+        if self._tool_stage is None:
+            policy = resolve_execution_policy(
+                self.manager._agents.get(self.agent_name, {})
+            )
+            self._tool_stage = ToolExecutionStage(
+                policy.max_parallel, on_complete=self._handle_tool_call_complete
+            )
+        return self._tool_stage
+
+    def _apply_tool_execution(
+        self, tools: list, agent_data: dict, source: str | None
+    ) -> list:
+        """Run tool calls concurrently through the session's stage, bounded by
+        the agent's `tool_execution` timeouts."""
+        wrapped = []
+        for tool in tools:
+            # only autogen tools can be wrapped (skip test doubles and the like)
+            if not isinstance(tool, AutogenBaseTool):
+                wrapped.append(tool)
+                continue
+            timeout = resolve_execution_policy(agent_data, tool.name).timeout
+            wrapped.append(StagedTool(tool, self.tool_stage, timeout, source))
+        return wrapped
+
+    def _apply_tool_cache(self, tools: list, agent_data: dict) -> list:
+        """Serve repeated calls of idempotent tools from the manager's cache.
+
+        Caching is enabled by the tool itself (`cacheable` class attribute or
+        MCP read-only/idempotent annotations) or by the agent's `tool_cache`.
+        """
+        cache = self.manager.tool_result_cache
+        wrapped = []
+        for tool in tools:
+            # only autogen tools can be wrapped (skip test doubles and the like)
+            if not isinstance(tool, AutogenBaseTool):
+                wrapped.append(tool)
+                continue
+            policy = resolve_cache_policy(agent_data, tool)
+            wrapped.append(tool if policy is None else CachedTool(tool, policy, cache))
+        return wrapped
+
+    def _apply_tool_output_policies(self, tools: list, agent_data: dict) -> list:
+        """Wrap tools with the agent's tool output policies (`tool_output`).
+
+        Tools with an active policy are wrapped in a ManagedTool that compacts
+        their results; when any full result may be stored out-of-band, the
+        `read_tool_result` tool is added so the agent can dereference handles.
+        """
+        policies = resolve_output_policies(agent_data)
+        mm = self.manager.mm
+        wrapped = []
+        stores = False
+        for tool in tools:
+            policy = policy_for(policies, getattr(tool, "name", ""))
+            # only autogen tools can be wrapped (skip test doubles and the like)
+            if policy is None or not isinstance(tool, AutogenBaseTool):
+                wrapped.append(tool)
+                continue
+            summary_client = summary_budget = None
+            if policy.strategy == "summarize":
+                summary_model = policy.summary_model or mm.default_mini_model
+                summary_client = mm.open_model(summary_model)
+                max_context = mm.get_max_context(summary_model)
+                if max_context:
+                    summary_budget = max_context - (
+                        mm.get_max_output(summary_model) or 0
+                    )
+            wrapped.append(
+                ManagedTool(
+                    tool, policy, self.tool_results, summary_client, summary_budget
+                )
+            )
+            stores = stores or policy.store
+        if stores:
+            wrapped.append(self.tool_results.as_tool())
+        return wrapped
+
+    def _fit_model_client(
+        self,
+        model_client,
+        model_id: str,
+        agent_data: dict,
+        model_context,
+        initial_messages: list | None = None,
+    ) -> Any:
+        """Wrap the model client with request-time context fitting if enabled.
+
+        Enabled per agent with `context: {fit_to_model: true}`. Requests that
+        would exceed the model's `_max_context` minus its reserved output are
+        fitted using the agent's context policy, and the agent callback is
+        told with a message and the ContextBudgetExceeded as `event`.
+        """
+        ctx_cfg = (agent_data or {}).get("context") or {}
+        if not isinstance(ctx_cfg, dict) or not ctx_cfg.get("fit_to_model", False):
+            return model_client
+        mm = self.manager.mm
+        max_context = mm.get_max_context(model_id)
+        if not max_context:
+            logger.warning(
+                f"fit_to_model set for agent '{agent_data.get('name', 'unknown')}' "
+                f"but model '{model_id}' has no _max_context; not fitting"
+            )
+            return model_client
+        return ContextFittingChatCompletionClient(
+            model_client,
+            max_context=max_context,
+            max_output=mm.get_max_output(model_id) or 0,
+            model_id=model_id,
+            model_context=model_context,
+            on_budget_exceeded=self._report_budget_exceeded,
+            head_size=len(initial_messages or []),
+        )
+
+    async def _report_budget_exceeded(self, event: ContextBudgetExceeded) -> None:
+        await self._agent_callback(
+            f"Context budget exceeded for {event.model}: {event.tokens} > "
+            f"{event.budget} tokens, fitted to {event.fitted_tokens}",
+            event=event,
+        )
+
     # --- Agent-specific properties (session-scoped)
 
     @property
@@ -1108,6 +1427,61 @@ class AgentSession:
         """Returns the current prompt for this session's agent"""
         return getattr(self, "_prompt", "")
 
+    @property
+    def prompt_prefix(self) -> PromptPrefix | None:
+        """The compiled prompt prefix (shared by the agent's sessions unless evolved)"""
+        return getattr(self, "_prompt_prefix", None)
+
+    async def evolve_prompt(
+        self,
+        prompt: str | None = None,
+        extra_context: list[list[str]] | None = None,
+    ) -> PromptPrefix:
+        """Give this session its own prompt and/or extra_context.
+
+        Derives a variant of the current prefix with PromptPrefix.evolve(),
+        leaving the shared prefix and other sessions untouched, and swaps the
+        prefix messages of the session's agent and model context for it. The
+        context's full state (history, summary, trimming) is kept.
+
+        Raises:
+            RuntimeError: If the session has no solo agent with a prefix.
+        """
+        old = self._prompt_prefix
+        if old is None or self.agent is None:
+            raise RuntimeError("evolve_prompt requires a solo agent session")
+        prefix = old.evolve(
+            prompt=prompt,
+            extra_context=extra_context,
+            token_counter=MessageTokenCounter(
+                model=self.manager._model_name(self._model_id)
+            ),
+        )
+        # the context's messages start with the old prefix messages (unless the
+        # context was cleared since); swap them in its saved state, so the
+        # history, summary and trimming of the context are kept
+        model_context = self.agent.model_context
+        state = dict(await model_context.save_state())
+        messages = state["messages"]
+        old_messages = [
+            m.model_dump() for m in old.initial_messages + old.extra_messages
+        ]
+        if messages[: len(old_messages)] == old_messages:
+            new_messages = [
+                m.model_dump() for m in prefix.initial_messages + prefix.extra_messages
+            ]
+            state["messages"] = new_messages + messages[len(old_messages) :]
+            # indexes past the prefix move with the messages
+            if state.get("summarized_upto", 0) >= len(old_messages):
+                state["summarized_upto"] += len(new_messages) - len(old_messages)
+            await model_context.load_state(state)
+
+        if hasattr(self.agent, "_system_messages"):
+            self.agent._system_messages = list(prefix.system_messages)
+        self._own_prompt_prefix = self._prompt_prefix = prefix
+        self._prompt = prefix.prompt
+        return prefix
+
     @property
     def description(self) -> str:
         """Returns the current description for this session's agent"""
@@ -1200,10 +1574,14 @@ class AgentSession:
                     # load the tools (skip unknown tool ids gracefully)
                     tools = []
                     for tool in subagent_data["tools"]:
-                        if tool in tools_map:
-                            tools.append(tools_map[tool])
+                        loaded = (
+                            self.manager.get_tool(tool) if tool in tools_map else None
+                        )
+                        if loaded is not None:
+                            tools.append(loaded)
                         else:
                             logger.warning(f"Tool {tool} not found; skipping.")
+                    tools = self._wrap_tools(tools, subagent_data, source=agent)
 
                 # system message if supported; else include prompt as initial
                 # user message in the context
@@ -1224,6 +1602,14 @@ class AgentSession:
                     initial_messages=sub_initial_messages,
                 )
 
+                model_client = self._fit_model_client(
+                    model_client,
+                    subagent_data["model"],
+                    subagent_data,
+                    sub_model_context,
+                    sub_initial_messages,
+                )
+
                 extra_kwargs = {}
                 if isinstance(subagent_data.get("extra_kwargs", None), dict):
                     reserved = {
@@ -1314,16 +1700,38 @@ class AgentSession:
         else:
             raise ValueError(f"Unknown team type {team_type}")
 
+    def _attach_late_mcp_tools(self) -> None:
+        """Add the tools of MCP servers that finished loading after session start."""
+        ready = [k for k, t in self._pending_mcp_loads.items() if t.done()]
+        if not ready or self._workbench is None:
+            return
+        agent_data = self.manager._agents[self.agent_name]
+        for key in ready:
+            task = self._pending_mcp_loads.pop(key)
+            if task.cancelled() or task.exception() is not None:
+                logger.warning(f"MCP server {key} failed to load; tools not attached")
+                continue
+            mcp_tools = task.result()
+            self.manager._replace_placeholder_tools_with_real_tools(mcp_tools)
+            self._workbench.add_tools(
+                self._wrap_tools(
+                    list(mcp_tools.values()), agent_data, source=self.agent_name
+                )
+            )
+            logger.info(f"Attached {len(mcp_tools)} late MCP tools from {key}")
+
     async def ask(self, task: str) -> TaskResult:
         self._cancelation_token = CancellationToken()
+        self._attach_late_mcp_tools()
 
         try:
-            result: TaskResult = await self._consume_agent_stream(
-                agent_runner=self.agent_team.run_stream,
-                oneshot=self.oneshot,
-                task=task,
-                cancellation_token=self._cancelation_token,
-            )
+            with track(f"session:{self.agent_name}"):
+                result: TaskResult = await self._consume_agent_stream(
+                    agent_runner=self.agent_team.run_stream,
+                    oneshot=self.oneshot,
+                    task=task,
+                    cancellation_token=self._cancelation_token,
+                )
         except Exception as e:
             logger.error(f"Error in agent stream: {e}")
             result = TaskResult(
@@ -1355,6 +1763,11 @@ class AgentSession:
     def cancel(self) -> None:
         if self._cancelation_token:
             self._cancelation_token.cancel()
+        # stop in-flight tool and MCP calls now, rather than when they finish
+        if self._tool_stage is not None:
+            cancelled = self._tool_stage.cancel_all()
+            if cancelled:
+                logger.info(f"Cancelled {cancelled} running tool call(s)")
 
     def terminate(self) -> None:
         if hasattr(self, "terminator") and self.terminator:
@@ -1510,10 +1923,37 @@ class AgentSession:
         self, response: ToolCallExecutionEvent
     ) -> None:
         logger.info(f"Tool call result: {response.content}")
+        call_ids = [getattr(result, "call_id", None) for result in response.content]
+        hits = self.manager.tool_result_cache.pop_hits(call_ids)
+        records = self.tool_stage.pop_records(call_ids)
+        if records:
+            # latencies in the order of the results (cache hits have none)
+            self.last_tool_calls = records
+            response.metadata["latency_ms"] = ",".join(
+                f"{record.call_id}={record.latency * 1000:.0f}" for record in records
+            )
+        if hits:
+            # mark the event so callers can measure what the cache saved
+            self.tool_cache_hits += len(hits)
+            response.metadata["cache_hits"] = ",".join(hits)
+            logger.info(f"{len(hits)} tool call(s) served from cache")
         await self._message_callback("done", agent=response.source, complete=True)
 
+    async def _handle_tool_call_complete(
+        self, record: ToolCallRecord, result: Any
+    ) -> None:
+        """Report each tool call as it completes, before the whole batch."""
+        status = f"failed: {record.error}" if record.error else "done"
+        await self._message_callback(
+            f"\n{record.tool} {status} ({record.latency:.2f}s)\n",
+            agent=record.source,
+            flush=True,
+        )
+
     async def _handle_tool_call_request(self, response: ToolCallRequestEvent) -> None:
         tool_message = "\n\ncalling tool"
+        if len(response.content) > 1:
+            tool_message = f"\n\ncalling {len(response.content)} tools in parallel:\n"
         for tool in response.content:
             tool_message += f"{tool.name} with arguments:\n{tool.arguments}\n"
         tool_message += "..."
@@ -0,0 +1,221 @@
+"""
+Async embedding clients for the embedding models configured in ModelManager.
+
+    client = ModelManager().open_model("text-embedding-3-small", cache=True)
+    vectors = await client.embed(texts)     # float32 array, one row per text
+
+- inputs are split into requests within the provider limits (inputs and
+  tokens per request), and requests run concurrently under a cap
+- identical texts in a call are embedded once
+- with an EmbeddingCache, vectors are kept on disk keyed by model and a hash
+  of the text, so no text is ever embedded twice by the same model
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from collections.abc import Sequence
+
+import numpy as np
+
+from .logging_utils import get_logger
+from .model_context import get_encoding
+from .tool_utils import default_cache_path, tool_executor
+
+logger = get_logger(__name__)
+
+# OpenAI limits: inputs per request and tokens across the inputs of a request
+MAX_BATCH_INPUTS = 2048
+MAX_BATCH_TOKENS = 300_000
+# Characters per token assumed when no tiktoken encoding is available
+_CHARS_PER_TOKEN = 3
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk cache of embedding vectors, keyed by (model, text hash).
+
+    Vectors are stored as float32 bytes in a SQLite database.
+
+    Args:
+        path: Database file (default: `~/.cache/mchat_core/embeddings.sqlite`).
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or default_cache_path("embeddings.sqlite")
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT, key TEXT, vector BLOB, PRIMARY KEY (model, key))"
+            )
+        return self._db
+
+    def get_many(self, model: str, keys: Sequence[str]) -> dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            db = self._connect()
+            # stay under SQLite's limit on query parameters
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                rows = db.execute(
+                    "SELECT key, vector FROM embeddings WHERE model = ? AND key IN "
+                    f"({', '.join('?' * len(chunk))})",
+                    (model, *chunk),
+                )
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, vectors: dict[str, np.ndarray]) -> None:
+        with self._lock:
+            db = self._connect()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [
+                    (model, key, np.asarray(vector, np.float32).tobytes())
+                    for key, vector in vectors.items()
+                ],
+            )
+            db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class EmbeddingClient:
+    """Embed texts with an OpenAI or Azure OpenAI embedding model.
+
+    Args:
+        client: An `AsyncOpenAI` or `AsyncAzureOpenAI` client.
+        model: Model (or Azure deployment) name.
+        max_concurrency: Embedding requests in flight at once.
+        max_batch: Most inputs per request.
+        max_batch_tokens: Most tokens across the inputs of a request.
+        dimensions: Output dimensions, for models that can shorten vectors.
+        cache: Cache of vectors by model and text.
+    """
+
+    def __init__(
+        self,
+        client,
+        model: str,
+        max_concurrency: int = 4,
+        max_batch: int = MAX_BATCH_INPUTS,
+        max_batch_tokens: int = MAX_BATCH_TOKENS,
+        dimensions: int | None = None,
+        cache: EmbeddingCache | None = None,
+    ):
+        if max_concurrency <= 0 or max_batch <= 0 or max_batch_tokens <= 0:
+            raise ValueError("embedding limits must be positive")
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_batch = max_batch
+        self.max_batch_tokens = max_batch_tokens
+        self.dimensions = dimensions
+        self.cache = cache
+        self.requests = 0
+        self._slots: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def cache_model(self) -> str:
+        return f"{self.model}:{self.dimensions}" if self.dimensions else self.model
+
+    async def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        return await self.embed(texts)
+
+    async def embed_one(self, text: str) -> np.ndarray:
+        return (await self.embed([text]))[0]
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Vectors of `texts`, as a float32 array with one row per text."""
+        if not texts:
+            return np.empty((0, self.dimensions or 0), dtype=np.float32)
+        keys = [text_key(text) for text in texts]
+        # one embedding per distinct text
+        unique = dict(zip(keys, texts, strict=True))
+        vectors: dict[str, np.ndarray] = {}
+        loop = asyncio.get_running_loop()
+        if self.cache is not None:
+            vectors = await loop.run_in_executor(
+                tool_executor("thread"),
+                self.cache.get_many,
+                self.cache_model,
+                list(unique),
+            )
+        missing = {key: text for key, text in unique.items() if key not in vectors}
+        if missing:
+            # token counting (and loading the encoding) stays off the loop
+            batches = await loop.run_in_executor(
+                tool_executor("thread"), self._batches, list(missing.items())
+            )
+            results = await asyncio.gather(
+                *(self._embed_batch([text for _, text in b]) for b in batches)
+            )
+            new = {
+                key: vector
+                for batch, rows in zip(batches, results, strict=True)
+                for (key, _), vector in zip(batch, rows, strict=True)
+            }
+            vectors.update(new)
+            if self.cache is not None:
+                await loop.run_in_executor(
+                    tool_executor("thread"), self.cache.put_many, self.cache_model, new
+                )
+        return np.stack([vectors[key] for key in keys])
+
+    def _batches(self, items: list[tuple[str, str]]) -> list[list[tuple[str, str]]]:
+        """Split (key, text) items into requests within the provider limits."""
+        encoding = get_encoding(self.model)
+        if encoding is not None:
+            counts = [
+                len(t) for t in encoding.encode_ordinary_batch([t for _, t in items])
+            ]
+        else:
+            counts = [-(-len(text) // _CHARS_PER_TOKEN) for _, text in items]
+        batches: list[list[tuple[str, str]]] = []
+        batch: list[tuple[str, str]] = []
+        tokens = 0
+        for item, count in zip(items, counts, strict=True):
+            if batch and (
+                len(batch) >= self.max_batch or tokens + count > self.max_batch_tokens
+            ):
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append(item)
+            tokens += count
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+        async with self._slots:
+            self.requests += 1
+            response = await self.client.embeddings.create(
+                model=self.model, input=texts, **kwargs
+            )
+        data = sorted(response.data, key=lambda item: item.index)
+        return np.asarray([item.embedding for item in data], dtype=np.float32)
+
+    async def close(self) -> None:
+        await self.client.close()
@@ -0,0 +1,302 @@
+"""
+Async image generation with a local, content-addressed store of the results.
+
+    generator = ImageGenerator(AsyncOpenAI(api_key=...))
+    images = await generator.generate("a lighthouse at dusk", model="dall-e-3",
+                                      num_images=2)
+    # [{"path": "~/.cache/mchat_core/images/ab/ab12….png", "url": ...,
+    #   "revised_prompt": ..., "cached": False}, ...]
+
+- the images of a call are split into requests the model accepts (dall-e-3
+  makes one image per request), run concurrently, `max_concurrency` at a time
+- returned URLs expire, so the images of each response are downloaded as
+  soon as it arrives, in parallel, into files named by the SHA-256 of their
+  content; base64 images are stored the same way
+- a prompt asked for again with the same model, size and quality is served
+  from the store, and only the images still missing are generated
+- with a log file, requests and responses are appended from the tool thread
+  pool, off the path of the call
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from .logging_utils import get_logger
+from .tool_utils import default_cache_path, tool_executor
+from .web_fetch import PageFetcher
+
+logger = get_logger(__name__)
+
+# Most images a model returns from one request
+_IMAGES_PER_REQUEST = {"dall-e-3": 1}
+_DEFAULT_IMAGES_PER_REQUEST = 10
+# Largest image downloaded, in bytes
+MAX_IMAGE_BYTES = 50_000_000
+
+_SUFFIXES = {
+    b"\x89PNG": ".png",
+    b"\xff\xd8\xff": ".jpg",
+    b"RIFF": ".webp",
+    b"GIF8": ".gif",
+}
+
+
+def _suffix(data: bytes) -> str:
+    for magic, suffix in _SUFFIXES.items():
+        if data.startswith(magic):
+            return suffix
+    return ".img"
+
+
+class ImageStore:
+    """Generated images on disk, named by the SHA-256 of their content.
+
+    An index (`index.json`) maps a hash of each request (prompt, model, size,
+    quality) to the images generated for it, so repeated prompts reuse them.
+
+    Args:
+        path: Store directory (default: `~/.cache/mchat_core/images`).
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or default_cache_path("images")
+        self._lock = threading.Lock()
+        self._index: dict[str, list[dict]] | None = None
+
+    @staticmethod
+    def request_key(**request) -> str:
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def put(self, data: bytes) -> str:
+        """Store an image; returns its path (an existing file if identical)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.path, digest[:2], digest + _suffix(data))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return path
+
+    def lookup(self, key: str) -> list[dict]:
+        """Images stored for a request whose files still exist."""
+        with self._lock:
+            images = self._load().get(key, [])
+            return [
+                image
+                for image in images
+                if os.path.exists(os.path.join(self.path, image["file"]))
+            ]
+
+    def remember(self, key: str, images: list[dict]) -> None:
+        """Record images (with `path` and `revised_prompt`) for a request."""
+        with self._lock:
+            index = self._load()
+            known = index.get(key, [])
+            files = {image["file"] for image in known}
+            for image in images:
+                file = os.path.relpath(image["path"], self.path)
+                if file not in files:
+                    files.add(file)
+                    known.append(
+                        {"file": file, "revised_prompt": image["revised_prompt"]}
+                    )
+            index[key] = known
+            self._save()
+
+    def file_path(self, image: dict) -> str:
+        return os.path.join(self.path, image["file"])
+
+    def _load(self) -> dict[str, list[dict]]:
+        if self._index is None:
+            try:
+                with open(os.path.join(self.path, "index.json"), encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                self._index = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable image store index: {e}")
+                self._index = {}
+        return self._index
+
+    def _save(self) -> None:
+        index_path = os.path.join(self.path, "index.json")
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = f"{index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            logger.warning(f"Could not write image store index {index_path}: {e}")
+
+
+class RequestLog:
+    """Appends records to a file in the tool thread pool, without waiting."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending: set[asyncio.Future] = set()
+
+    def write(self, text: str) -> None:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(tool_executor("thread"), self._append, text)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+    async def flush(self) -> None:
+        """Wait for the records written so far to reach the file."""
+        await asyncio.gather(*self._pending)
+
+    def _append(self, text: str) -> None:
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            logger.warning(f"Could not write image request log {self.path}: {e}")
+
+
+class ImageGenerator:
+    """Generate images with an OpenAI or Azure OpenAI image model.
+
+    Args:
+        client: An `AsyncOpenAI` or `AsyncAzureOpenAI` client.
+        store: Where images are kept (default: an ImageStore at the default
+            path).
+        max_concurrency: Image requests in flight at once.
+        fetcher: PageFetcher the image URLs are downloaded with.
+        log_file: File requests and responses are logged to.
+    """
+
+    def __init__(
+        self,
+        client,
+        store: ImageStore | None = None,
+        max_concurrency: int = 4,
+        fetcher: PageFetcher | None = None,
+        log_file: str | None = None,
+    ):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be positive")
+        self.client = client
+        self.store = store or ImageStore()
+        self.max_concurrency = max_concurrency
+        # image URLs all point at one host; politeness limits would serialise
+        # the downloads
+        self.fetcher = fetcher or PageFetcher(
+            max_concurrency=2 * max_concurrency,
+            per_host=2 * max_concurrency,
+            host_interval=0.0,
+            timeout=120.0,
+        )
+        self.log = RequestLog(log_file) if log_file else None
+        self._slots: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def generate(
+        self,
+        prompt: str,
+        model: str = "dall-e-2",
+        num_images: int = 1,
+        size: str = "1024x1024",
+        quality: str = "standard",
+        reuse: bool = True,
+    ) -> list[dict]:
+        """Generate `num_images` images for `prompt`.
+
+        Returns one dict per image: `path` (the stored file), `url` (the
+        provider's URL, or a file URI for reused images), `revised_prompt`
+        and `cached`. If a request fails its error is raised, but the images
+        of the other requests are stored and reused by the next call.
+        """
+        if num_images <= 0:
+            raise ValueError("num_images must be positive")
+        key = self.store.request_key(
+            prompt=prompt, model=model, size=size, quality=quality
+        )
+        loop = asyncio.get_running_loop()
+        images = []
+        if reuse:
+            stored = await loop.run_in_executor(
+                tool_executor("thread"), self.store.lookup, key
+            )
+            for image in stored[:num_images]:
+                path = self.store.file_path(image)
+                images.append(
+                    {
+                        "path": path,
+                        "url": Path(path).as_uri(),
+                        "revised_prompt": image["revised_prompt"],
+                        "cached": True,
+                    }
+                )
+        missing = num_images - len(images)
+        if missing:
+            per_request = _IMAGES_PER_REQUEST.get(model, _DEFAULT_IMAGES_PER_REQUEST)
+            counts = [per_request] * (missing // per_request)
+            if missing % per_request:
+                counts.append(missing % per_request)
+            request = {"prompt": prompt, "model": model, "size": size}
+            if quality:
+                request["quality"] = quality
+            batches = await asyncio.gather(
+                *(self._generate_batch(request, n) for n in counts),
+                return_exceptions=True,
+            )
+            new = [
+                image
+                for batch in batches
+                if not isinstance(batch, BaseException)
+                for image in batch
+            ]
+            # images of the batches that succeeded are kept even if one failed
+            if new:
+                await loop.run_in_executor(
+                    tool_executor("thread"), self.store.remember, key, new
+                )
+            for batch in batches:
+                if isinstance(batch, BaseException):
+                    raise batch
+            images.extend(new)
+        return images
+
+    async def _generate_batch(self, request: dict, n: int) -> list[dict]:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        async with self._slots:
+            response = await self.client.images.generate(
+                **request, n=n, response_format="url"
+            )
+        if self.log is not None:
+            self.log.write(f"Request: {request!r}, n={n}\nResponse: {response!r}\n\n")
+        return await asyncio.gather(*(self._store(item) for item in response.data))
+
+    async def _store(self, item) -> dict:
+        if item.b64_json:
+            data = base64.b64decode(item.b64_json)
+        else:
+            data = await self.fetcher.fetch_bytes(item.url, MAX_IMAGE_BYTES)
+        loop = asyncio.get_running_loop()
+        path = await loop.run_in_executor(tool_executor("thread"), self.store.put, data)
+        return {
+            "path": path,
+            "url": item.url or Path(path).as_uri(),
+            "revised_prompt": item.revised_prompt,
+            "cached": False,
+        }
+
+    async def close(self) -> None:
+        if self.log is not None:
+            await self.log.flush()
+        await self.fetcher.close()
+        await self.client.close()
@@ -0,0 +1,380 @@
+"""
+Event-loop stall watchdog.
+
+A single blocking call on the event loop (a sync tool, heavy log formatting,
+a slow callback) freezes every concurrent AgentSession. The watchdog is
+opt-in and finds such calls:
+
+- a heartbeat measures loop lag (how late a timer fires) continuously; a
+  heartbeat that is late by `threshold` or more is reported as a stall
+- a monitor thread notices an overdue heartbeat while the loop is still
+  blocked, and samples the blocking stack and the task that runs it, so the
+  stall is attributed to the activity (session, tool, callback) it ran for
+- `stats()` exposes stall counts, durations and lag
+
+With `start(debug=True)` the loop runs in asyncio debug mode instead, with
+`slow_callback_duration` set to `threshold`: asyncio times every callback and
+its slow-callback warnings become the stall reports, which then name the exact
+callback and its duration. This relies on the `asyncio` logger emitting
+warnings, and also turns on asyncio's other checks (coroutine origins,
+non-threadsafe calls); the loop's previous debug setting and
+`slow_callback_duration` are restored by `stop()`.
+
+Activities are labelled with `track()`; labels are carried in a context
+variable, so tasks started within an activity inherit it. Sessions, tools and
+session callbacks are labelled already.
+
+    watchdog = LoopWatchdog(threshold=0.2)
+    watchdog.start()          # from the running loop
+    ...
+    print(watchdog.stats())
+    watchdog.stop()
+"""
+
+import asyncio
+import contextvars
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Labels of the activities the current code runs for, outermost first
+_activity: contextvars.ContextVar[tuple[str, ...]] = contextvars.ContextVar(
+    "mchat_activity", default=()
+)
+# Running watchdogs; labelling is skipped while there are none
+_watchdogs: dict[asyncio.AbstractEventLoop, "LoopWatchdog"] = {}
+# Labels of the tasks inside an activity, readable from the monitor thread
+# (a task's context is not, before Python 3.12)
+_task_activity: "weakref.WeakKeyDictionary[asyncio.Task, tuple[str, ...]]" = (
+    weakref.WeakKeyDictionary()
+)
+# asyncio's debug-mode report of a slow callback
+_SLOW_CALLBACK_MESSAGE = "Executing %s took %.3f seconds"
+# Innermost frames kept in a stall's stack sample
+_STACK_DEPTH = 12
+
+
+@contextmanager
+def track(label: str):
+    """Attribute loop time spent inside the block (and its tasks) to `label`."""
+    if not _watchdogs:
+        yield
+        return
+    labels = _activity.get() + (label,)
+    token = _activity.set(labels)
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    outer = _task_activity.get(task) if task is not None else None
+    if task is not None:
+        _task_activity[task] = labels
+    try:
+        yield
+    finally:
+        _activity.reset(token)
+        if task is not None:
+            if outer is None:
+                _task_activity.pop(task, None)
+            else:
+                _task_activity[task] = outer
+
+
+def tracked(callback: Callable, label: str) -> Callable:
+    """Wrap an async callback so the time it spends is attributed to `label`."""
+
+    async def wrapper(*args, **kwargs):
+        with track(label):
+            return await callback(*args, **kwargs)
+
+    wrapper.__wrapped__ = callback  # type: ignore[attr-defined]
+    return wrapper
+
+
+def current_activity() -> str:
+    """The current activity labels, joined outermost first ('' when none)."""
+    return " > ".join(_activity.get())
+
+
+@dataclass
+class StallReport:
+    duration: float
+    activity: str
+    callback: str
+    stack: str | None
+    started_at: float
+
+
+class LoopWatchdog:
+    """Measure event-loop lag and report callbacks that block the loop.
+
+    Stalls are detected from the heartbeat, or in debug mode read from
+    asyncio's slow-callback warnings, which the watchdog takes over (they are
+    logged again with their activity and stack sample) while it runs.
+
+    Args:
+        threshold: Seconds a single callback may hold the loop before it is
+            reported as a stall.
+        interval: Seconds between heartbeats measuring loop lag.
+        history: Number of recent stall reports kept.
+    """
+
+    def __init__(
+        self, threshold: float = 0.25, interval: float = 0.1, history: int = 50
+    ):
+        if threshold <= 0 or interval <= 0:
+            raise ValueError("threshold and interval must be positive")
+        self.threshold = threshold
+        self.interval = interval
+        self.reports: deque[StallReport] = deque(maxlen=history)
+        self.stall_count = 0
+        self.stall_time = 0.0
+        self.max_stall = 0.0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._lag_total = 0.0
+        self._beats = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._debug = False
+        self._heartbeat: asyncio.Task | None = None
+        # perf_counter time the next heartbeat is due
+        self._beat_due = 0.0
+        self._monitor: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._filter: _SlowCallbackFilter | None = None
+        # the loop's own debug settings, restored on stop
+        self._saved_debug = False
+        self._saved_slow_callback_duration = 0.1
+        # (handle, or heartbeat number without debug mode, activity, callback,
+        # stack) sampled while the loop was blocked
+        self._sample: tuple[object, tuple[str, ...], str, str] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def start(
+        self, loop: asyncio.AbstractEventLoop | None = None, debug: bool = False
+    ) -> None:
+        """Start watching `loop` (default: the running loop).
+
+        Args:
+            loop: The loop to watch, from its own thread.
+            debug: Run the loop in asyncio debug mode and report stalls from
+                its slow-callback warnings (exact callback and duration).
+        """
+        if self.running:
+            return
+        loop = loop or asyncio.get_running_loop()
+        if loop in _watchdogs:
+            raise RuntimeError("a watchdog is already watching this loop")
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._debug = debug
+        _watchdogs[loop] = self
+        if debug:
+            self._saved_debug = loop.get_debug()
+            self._saved_slow_callback_duration = loop.slow_callback_duration
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+            self._filter = _SlowCallbackFilter(self)
+            logging.getLogger("asyncio").addFilter(self._filter)
+        self._stopping.clear()
+        self._beat_due = time.perf_counter() + self.interval
+        self._heartbeat = loop.create_task(self._beat(), name="mchat-loop-heartbeat")
+        self._monitor = threading.Thread(
+            target=self._watch, name="mchat-loop-watchdog", daemon=True
+        )
+        self._monitor.start()
+        logger.debug(
+            f"Loop watchdog started (threshold {self.threshold}s"
+            + (", debug mode)" if debug else ")")
+        )
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stopping.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        _watchdogs.pop(self._loop, None)
+        if self._filter is not None:
+            logging.getLogger("asyncio").removeFilter(self._filter)
+            self._filter = None
+            self._loop.set_debug(self._saved_debug)
+            self._loop.slow_callback_duration = self._saved_slow_callback_duration
+        self._loop = None
+        self._sample = None
+        logger.debug("Loop watchdog stopped")
+
+    def stats(self) -> dict:
+        return {
+            "stalls": self.stall_count,
+            "stall_time": self.stall_time,
+            "max_stall": self.max_stall,
+            "lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "mean_lag": self._lag_total / self._beats if self._beats else 0.0,
+        }
+
+    # -- loop thread -------------------------------------------------------
+
+    async def _beat(self) -> None:
+        while True:
+            self._beat_due = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - self._beat_due)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._lag_total += lag
+            if not self._debug and lag >= self.threshold:
+                self._lagged(lag)
+            self._beats += 1
+
+    def _lagged(self, lag: float) -> None:
+        """Report a stall from a late heartbeat (outside debug mode)."""
+        sample, self._sample = self._sample, None
+        if sample is not None and sample[0] == self._beats:
+            _, activity, callback, stack = sample
+        else:
+            activity, callback, stack = (), "<unknown>", None
+        self._report(lag, activity, callback, stack)
+
+    def _stall(self, handle: asyncio.Handle, duration: float) -> None:
+        """Report a stall from asyncio's slow-callback warning (debug mode)."""
+        sample, self._sample = self._sample, None
+        if sample is not None and sample[0] is handle:
+            # the activity may have been left by the time the callback returns
+            _, activity, _, stack = sample
+        else:
+            activity = handle._context.get(_activity, ())  # type: ignore[attr-defined]
+            stack = None
+        self._report(duration, activity, _describe(handle), stack)
+
+    def _report(
+        self,
+        duration: float,
+        activity: tuple[str, ...],
+        callback: str,
+        stack: str | None,
+    ) -> None:
+        report = StallReport(
+            duration=duration,
+            activity=" > ".join(activity) or "<untracked>",
+            callback=callback,
+            stack=stack,
+            started_at=time.time() - duration,
+        )
+        self.stall_count += 1
+        self.stall_time += duration
+        self.max_stall = max(self.max_stall, duration)
+        self.reports.append(report)
+        logger.warning(
+            f"Event loop blocked for {duration:.3f}s by {report.callback} "
+            f"(activity: {report.activity})"
+            + (f"\n{report.stack}" if report.stack else "")
+        )
+
+    # -- monitor thread ----------------------------------------------------
+
+    def _watch(self) -> None:
+        # sample often enough to catch a callback while it is still blocking
+        poll = self.threshold / 2
+        seen = None
+        while not self._stopping.wait(poll):
+            loop = self._loop
+            if not self._debug:
+                beat = self._beats
+                if time.perf_counter() - self._beat_due < poll or (
+                    self._sample is not None and self._sample[0] == beat
+                ):
+                    continue
+                # the heartbeat is overdue: whatever runs now is blocking
+                task = asyncio.current_task(loop)
+                frames = self._loop_frames()
+                if frames is None:
+                    continue
+                if task is not None:
+                    activity = _task_activity.get(task, ())
+                    callback = _describe_task(task)
+                else:
+                    activity = ()
+                    callback = frames[0].name if frames else "<unknown>"
+                self._sample = (beat, activity, callback, _format_stack(frames))
+                continue
+            # set by the loop around each callback in debug mode
+            handle = getattr(loop, "_current_handle", None)
+            if handle is None or handle is not seen:
+                # not blocking yet, or a callback started since the last poll
+                seen = handle
+                continue
+            if self._sample is not None and self._sample[0] is handle:
+                continue
+            frames = self._loop_frames()
+            if frames is None:
+                continue
+            activity = handle._context.get(_activity, ())  # type: ignore[attr-defined]
+            self._sample = (handle, activity, "", _format_stack(frames))
+
+    def _loop_frames(self) -> list[traceback.FrameSummary] | None:
+        """The loop thread's current stack, below the event loop's own frames."""
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return None
+        frames = traceback.extract_stack(frame)
+        for i, summary in enumerate(frames):
+            if summary.name == "_run_once":
+                return frames[i + 2 :]
+        return frames
+
+
+class _SlowCallbackFilter(logging.Filter):
+    """Turns asyncio's slow-callback warnings for a watched loop into stalls."""
+
+    def __init__(self, watchdog: LoopWatchdog):
+        super().__init__()
+        self.watchdog = watchdog
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        watchdog = self.watchdog
+        if (
+            record.msg != _SLOW_CALLBACK_MESSAGE
+            or threading.get_ident() != watchdog._loop_thread
+        ):
+            return True
+        # the warning is logged while the loop still holds the handle
+        handle = getattr(watchdog._loop, "_current_handle", None)
+        if handle is None:
+            return True
+        watchdog._stall(handle, record.args[1])  # type: ignore[index]
+        return False
+
+
+def _format_stack(frames: list[traceback.FrameSummary]) -> str:
+    return "".join(traceback.format_list(frames[-_STACK_DEPTH:]))
+
+
+def _describe_task(task: asyncio.Task) -> str:
+    coro = task.get_coro()
+    name = getattr(coro, "__qualname__", None) or repr(coro)
+    return f"task {task.get_name()} ({name})"
+
+
+def _describe(handle: asyncio.Handle) -> str:
+    callback = handle._callback  # type: ignore[attr-defined]
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        return _describe_task(task)
+    return getattr(callback, "__qualname__", None) or repr(callback)
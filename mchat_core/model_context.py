@@ -0,0 +1,912 @@
+"""
+Chat completion contexts provided by mchat_core.
+
+These complement the autogen contexts (unbounded, buffered, head_tail) selected in
+`AgentSession._make_model_context`.
+
+- CachedTokenLimitedChatCompletionContext: a drop-in for autogen's token-limited
+  context that counts each message once (batch-encoded with a prewarmed tiktoken
+  encoding), keeps a running total and trims from the front, so get_messages()
+  costs O(new + trimmed) instead of re-tokenizing the whole history every turn.
+- PromptPrefix: the compiled system prompt and few-shot messages of an agent,
+  built once and shared by reference across its sessions.
+- ContextFittingChatCompletionClient: an opt-in model client wrapper that
+  counts each outgoing request (messages plus tool schemas) against the model's
+  context budget and fits it before sending, instead of letting the provider
+  reject it.
+- SummarizingChatCompletionContext: once the un-summarized history grows past a
+  token threshold, the oldest span is folded into a running summary by a
+  (usually mini) model.  Compaction runs as a background task so it never adds
+  latency to the request that triggered it; until it finishes, get_messages()
+  simply returns the longer history.
+"""
+
+import asyncio
+import functools
+import json
+import threading
+from collections.abc import AsyncGenerator, Awaitable, Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+import tiktoken
+from autogen_core import CancellationToken
+from autogen_core.model_context import (
+    ChatCompletionContext,
+    TokenLimitedChatCompletionContext,
+)
+from autogen_core.models import (
+    AssistantMessage,
+    ChatCompletionClient,
+    CreateResult,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    ModelCapabilities,  # type: ignore
+    ModelInfo,
+    RequestUsage,
+    SystemMessage,
+    UserMessage,
+)
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+from .logging_utils import get_logger, trace  # noqa: F401
+
+logger = get_logger(__name__)
+
+compaction_prompt = (
+    "You are maintaining the memory of a long conversation between a user and an "
+    "AI assistant. Merge the existing summary and the new messages below into a "
+    "single concise summary. Preserve facts, decisions, names, numbers, open "
+    "questions and anything the assistant promised to do. Reply with the summary "
+    "only.\n\n"
+    "Existing summary:\n{summary}\n\n"
+    "New messages:\n{conversation}"
+)
+
+SUMMARY_SOURCE = "summary"
+
+# Token accounting follows the OpenAI chat format (see autogen's
+# count_tokens_openai): a fixed overhead per message plus the encoded content,
+# and every reply is primed with a few tokens.
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+REPLY_PRIMING_TOKENS = 3
+# Flat estimate for an image part (a 1024x1024 image at high detail)
+IMAGE_TOKENS = 765
+# Rough characters-per-token ratio used when no encoding can be loaded
+CHARS_PER_TOKEN = 4
+
+
+def message_to_text(message: LLMMessage) -> str:
+    """Render an LLM message as a single line of plain text for summarization."""
+    if isinstance(message, FunctionExecutionResultMessage):
+        results = "; ".join(f"{r.name}: {r.content}" for r in message.content)
+        return f"tool results: {results}"
+    source = getattr(message, "source", type(message).__name__)
+    content = message.content
+    if isinstance(content, list):
+        parts = []
+        for item in content:
+            if hasattr(item, "name") and hasattr(item, "arguments"):
+                parts.append(f"[call {item.name}({item.arguments})]")
+            elif isinstance(item, str):
+                parts.append(item)
+            else:
+                parts.append(f"<{type(item).__name__}>")
+        content = " ".join(parts)
+    return f"{source}: {content}"
+
+
+@functools.cache
+def get_encoding(model: str | None) -> "tiktoken.Encoding | None":
+    """Return the (cached) tiktoken encoding for a model, or None if unavailable.
+
+    Loading an encoding may download its BPE file on first use; failures are
+    cached too, so callers fall back to estimation instead of retrying.
+    """
+    try:
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(
+            f"tiktoken encoding for '{model}' unavailable, estimating token "
+            f"counts: {type(e).__name__}: {e}"
+        )
+        return None
+
+
+_prewarmed: set[str | None] = set()
+
+
+def prewarm_encoding(model: str | None) -> None:
+    """Load the tiktoken encoding for `model` in a background thread, once."""
+    if model in _prewarmed:
+        return
+    _prewarmed.add(model)
+    threading.Thread(
+        target=get_encoding, args=(model,), name="tiktoken-prewarm", daemon=True
+    ).start()
+
+
+def _message_parts(message: LLMMessage) -> tuple[list[str], int]:
+    """Split a message into texts to encode plus a fixed token overhead."""
+    texts: list[str] = []
+    extra = TOKENS_PER_MESSAGE
+    if isinstance(message, FunctionExecutionResultMessage):
+        # each result is sent as its own tool message
+        extra = 0
+        for result in message.content:
+            extra += TOKENS_PER_MESSAGE
+            texts.extend([result.content, result.call_id])
+        return texts, extra
+    source = getattr(message, "source", None)
+    if source and not isinstance(message, SystemMessage):
+        texts.append(source)
+        extra += TOKENS_PER_NAME
+    content = message.content
+    if isinstance(content, str):
+        texts.append(content)
+    elif isinstance(content, list):
+        for item in content:
+            if isinstance(item, str):
+                texts.append(item)
+            elif hasattr(item, "name") and hasattr(item, "arguments"):
+                call = {"name": item.name, "arguments": item.arguments}
+                texts.append(json.dumps(call))
+            else:
+                extra += IMAGE_TOKENS
+    if isinstance(message, AssistantMessage) and message.thought:
+        texts.append(message.thought)
+    return texts, extra
+
+
+class MessageTokenCounter:
+    """Counts tokens per message, batch-encoding with a prewarmed encoding.
+
+    Args:
+        model: Model name used to pick the tiktoken encoding.
+        encoding: Explicit encoding (anything with `encode_batch`); overrides
+            `model`. When neither yields an encoding, counts are estimated
+            from the text length.
+        prewarm: Start loading the encoding in the background right away.
+    """
+
+    def __init__(
+        self,
+        model: str | None = None,
+        encoding: Any | None = None,
+        prewarm: bool = True,
+    ) -> None:
+        self._model = model
+        self._encoding = encoding
+        if encoding is None and prewarm:
+            prewarm_encoding(model)
+
+    @property
+    def encoding(self) -> Any | None:
+        if self._encoding is None:
+            self._encoding = get_encoding(self._model)
+        return self._encoding
+
+    def _encode_lengths(self, texts: list[str]) -> list[int]:
+        if not texts:
+            return []
+        encoding = self.encoding
+        if encoding is None:
+            return [-(-len(t) // CHARS_PER_TOKEN) for t in texts]
+        return [len(tokens) for tokens in encoding.encode_batch(texts)]
+
+    def count(self, messages: Sequence[LLMMessage]) -> list[int]:
+        """Return the token count of each message, encoding all texts in one batch."""
+        parts = [_message_parts(m) for m in messages]
+        lengths = iter(self._encode_lengths([t for texts, _ in parts for t in texts]))
+        return [extra + sum(next(lengths) for _ in texts) for texts, extra in parts]
+
+    def count_tools(self, tool_schema: Sequence[ToolSchema]) -> int:
+        """Approximate token count of the tool definitions sent with a request."""
+        texts = []
+        for schema in tool_schema:
+            try:
+                texts.append(json.dumps(schema))
+            except TypeError:
+                texts.append(str(schema))
+        return sum(self._encode_lengths(texts))
+
+
+class CachedTokenLimitedChatCompletionContext(TokenLimitedChatCompletionContext):
+    """Token-limited context with memoized per-message token counts.
+
+    Each message is counted once when it first becomes visible, and a running
+    total is kept for the current view. When the total exceeds the limit, the
+    oldest non-initial messages are dropped from the front; dropped messages
+    stay dropped, so trimming is O(messages trimmed). Initial messages (e.g. a
+    prompt injected for models without system prompt support) are always kept.
+
+    Args:
+        model_client: Used only to derive the limit when token_limit is None.
+        token_limit: Maximum tokens in the returned view, including the reply
+            priming and tool definitions.
+        tool_schema: Tool definitions counted against the limit.
+        initial_messages: Messages always kept at the head of the view.
+        token_counter: Per-message counter; defaults to a MessageTokenCounter
+            for `model`.
+        model: Model name used to select the tiktoken encoding.
+    """
+
+    def __init__(
+        self,
+        model_client: ChatCompletionClient,
+        *,
+        token_limit: int | None = None,
+        tool_schema: list[ToolSchema] | None = None,
+        initial_messages: list[LLMMessage] | None = None,
+        token_counter: MessageTokenCounter | None = None,
+        model: str | None = None,
+    ) -> None:
+        super().__init__(
+            model_client,
+            token_limit=token_limit,
+            tool_schema=tool_schema,
+            initial_messages=initial_messages,
+        )
+        self._counter = token_counter or MessageTokenCounter(model=model)
+        self._head_size = len(initial_messages or [])
+        self._reset_counts()
+        self._limit: int | None = None
+        self._limit_resolved = False
+
+    def _reset_counts(self) -> None:
+        # token counts aligned with self._messages; only a prefix may be counted
+        self._token_counts: list[int] = []
+        # index of the first non-initial message in the view
+        self._start = self._head_size
+        # tokens of the head plus self._messages[self._start:] (counted part)
+        self._total = 0
+
+    @property
+    def head_size(self) -> int:
+        """Number of initial messages always kept at the head of the view."""
+        return self._head_size
+
+    @property
+    def total_tokens(self) -> int:
+        """Tokens in the current view, as of the last get_messages()."""
+        return self._total
+
+    async def get_messages(self) -> list[LLMMessage]:
+        self._count_new_messages()
+        limit = self._resolve_limit()
+        messages = self._messages
+        if limit is not None:
+            while self._total > limit and self._start < len(messages):
+                self._drop_front()
+        # never start the view with a tool result orphaned from its call
+        while self._start < len(messages) and isinstance(
+            messages[self._start], FunctionExecutionResultMessage
+        ):
+            self._drop_front()
+        return messages[: self._head_size] + messages[self._start :]
+
+    async def clear(self) -> None:
+        await super().clear()
+        self._head_size = 0
+        self._reset_counts()
+
+    async def save_state(self) -> Mapping[str, Any]:
+        state = dict(await super().save_state())
+        state["head_size"] = self._head_size
+        return state
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        await super().load_state(state)
+        self._head_size = int(state.get("head_size", 0))
+        self._reset_counts()
+
+    def _count_new_messages(self) -> None:
+        counted = len(self._token_counts)
+        if counted == len(self._messages):
+            return
+        counts = self._counter.count(self._messages[counted:])
+        self._token_counts.extend(counts)
+        for index, count in enumerate(counts, start=counted):
+            if index < self._head_size or index >= self._start:
+                self._total += count
+
+    def _drop_front(self) -> None:
+        self._total -= self._token_counts[self._start]
+        self._start += 1
+
+    def _resolve_limit(self) -> int | None:
+        """Message token budget: the limit minus reply priming and tools."""
+        if self._limit_resolved:
+            return self._limit
+        limit = self._token_limit
+        if limit is None:
+            try:
+                # the model's context size, as known by the client
+                limit = self._model_client.remaining_tokens(
+                    []
+                ) + self._model_client.count_tokens([])
+            except Exception as e:
+                logger.warning(
+                    f"could not determine the model token limit, not trimming: {e}"
+                )
+        if limit is not None:
+            limit -= REPLY_PRIMING_TOKENS + self._counter.count_tools(self._tool_schema)
+        self._limit = limit
+        self._limit_resolved = True
+        return limit
+
+
+class SummarizingChatCompletionContext(ChatCompletionContext):
+    """A context that compacts old history into a summary in the background.
+
+    The view returned by get_messages() is:
+
+        initial messages (verbatim) + [summary] + un-summarized messages
+
+    Args:
+        summary_client: Model client used to write summaries (e.g. the mini model).
+        token_threshold: When the un-summarized history exceeds this many tokens,
+            a background compaction is scheduled.
+        tail_size: Number of most recent messages that are never summarized.
+        token_counter: Callable returning the token count of a list of messages.
+            Defaults to `model_client.count_tokens` when a model_client is given.
+        model_client: Client used for token counting if no token_counter is given.
+        initial_messages: Messages always kept verbatim at the head (e.g. an
+            injected prompt for models without system prompt support).
+    """
+
+    def __init__(
+        self,
+        summary_client: ChatCompletionClient,
+        token_threshold: int = 4000,
+        tail_size: int = 10,
+        token_counter: Callable[[Sequence[LLMMessage]], int] | None = None,
+        model_client: ChatCompletionClient | None = None,
+        initial_messages: list[LLMMessage] | None = None,
+    ) -> None:
+        super().__init__(initial_messages)
+        if token_threshold <= 0:
+            raise ValueError("token_threshold must be > 0")
+        if tail_size <= 0:
+            raise ValueError("tail_size must be > 0")
+        if token_counter is None:
+            if model_client is None:
+                raise ValueError("either token_counter or model_client is required")
+            token_counter = model_client.count_tokens
+        self._summary_client = summary_client
+        self._token_threshold = token_threshold
+        self._tail_size = tail_size
+        self._count_tokens = token_counter
+        self._head_size = len(initial_messages or [])
+        self._summary: str | None = None
+        # index into self._messages of the first message not yet summarized
+        self._summarized_upto = self._head_size
+        self._compaction_task: asyncio.Task | None = None
+
+    @property
+    def summary(self) -> str | None:
+        """The current running summary, or None if nothing was compacted yet."""
+        return self._summary
+
+    @property
+    def head_size(self) -> int:
+        """Number of initial messages always kept verbatim at the head."""
+        return self._head_size
+
+    async def add_message(self, message: LLMMessage) -> None:
+        await super().add_message(message)
+        self._maybe_schedule_compaction()
+
+    def split_view(
+        self,
+    ) -> tuple[list[LLMMessage], LLMMessage | None, list[LLMMessage]]:
+        """The view as (initial messages, summary message or None, recent messages)."""
+        head = self._messages[: self._head_size]
+        recent = self._messages[self._summarized_upto :]
+        if self._summary is None:
+            return head, None, recent
+        summary_message = UserMessage(
+            content=f"Summary of the earlier conversation: {self._summary}",
+            source=SUMMARY_SOURCE,
+        )
+        return head, summary_message, recent
+
+    async def get_messages(self) -> list[LLMMessage]:
+        head, summary_message, recent = self.split_view()
+        if summary_message is None:
+            return head + recent
+        return head + [summary_message] + recent
+
+    async def clear(self) -> None:
+        self._cancel_compaction()
+        await super().clear()
+        self._summary = None
+        self._head_size = 0
+        self._summarized_upto = 0
+
+    async def wait_for_compaction(self) -> None:
+        """Wait for any in-flight background compaction to finish."""
+        task = self._compaction_task
+        if task is not None and not task.done():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def compact(self) -> bool:
+        """Compact now, regardless of the token threshold.
+
+        Waits for any in-flight background compaction first. Returns True if
+        more history was folded into the summary.
+        """
+        await self.wait_for_compaction()
+        before = self._summarized_upto
+        await self._compact()
+        return self._summarized_upto > before
+
+    async def save_state(self) -> Mapping[str, Any]:
+        state = dict(await super().save_state())
+        state["summary"] = self._summary
+        state["summarized_upto"] = self._summarized_upto
+        state["head_size"] = self._head_size
+        return state
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        self._cancel_compaction()
+        await super().load_state(state)
+        self._summary = state.get("summary")
+        self._head_size = int(state.get("head_size", 0))
+        self._summarized_upto = int(state.get("summarized_upto", self._head_size))
+
+    # - - Compaction
+
+    def _pending_tokens(self) -> int:
+        return self._count_tokens(self._messages[self._summarized_upto :])
+
+    def _compaction_boundary(self) -> int:
+        """Index up to which messages may be summarized, keeping the tail intact.
+
+        The boundary never leaves a tool result at the start of the verbatim
+        span, since it would be orphaned from its originating tool call.
+        """
+        boundary = len(self._messages) - self._tail_size
+        while boundary > self._summarized_upto and isinstance(
+            self._messages[boundary], FunctionExecutionResultMessage
+        ):
+            boundary -= 1
+        return boundary
+
+    def _maybe_schedule_compaction(self) -> None:
+        if self._compaction_task is not None and not self._compaction_task.done():
+            return
+        if self._compaction_boundary() <= self._summarized_upto:
+            return
+        try:
+            if self._pending_tokens() <= self._token_threshold:
+                return
+        except Exception as e:
+            logger.debug(f"token counting failed, skipping compaction: {e}")
+            return
+        self._compaction_task = asyncio.create_task(self._compact())
+
+    def _cancel_compaction(self) -> None:
+        if self._compaction_task is not None and not self._compaction_task.done():
+            self._compaction_task.cancel()
+        self._compaction_task = None
+
+    async def _compact(self) -> None:
+        start = self._summarized_upto
+        end = self._compaction_boundary()
+        if end <= start:
+            return
+        span = self._messages[start:end]
+        prompt = compaction_prompt.format(
+            summary=self._summary or "(none)",
+            conversation="\n".join(message_to_text(m) for m in span),
+        )
+        try:
+            result = await self._summary_client.create([SystemMessage(content=prompt)])
+        except Exception as e:
+            logger.warning(f"context compaction failed: {type(e).__name__}: {e}")
+            return
+        if not isinstance(result.content, str) or not result.content.strip():
+            logger.warning("context compaction returned no summary; keeping history")
+            return
+        # history may have been cleared or reloaded while we were waiting
+        if self._summarized_upto != start or len(self._messages) < end:
+            logger.debug("context changed during compaction; discarding summary")
+            return
+        self._summary = result.content.strip()
+        self._summarized_upto = end
+        logger.debug(f"compacted {end - start} messages into summary")
+
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    """The immutable start of every request for an agent.
+
+    Holds the system prompt (or, for models without system prompt support, the
+    prompt injected as the first user message) followed by the `extra_context`
+    few-shot messages, in configuration order, so that every session sends a
+    byte-identical prefix and provider-side prompt caching keeps hitting.
+
+    A prefix is built once per agent and model and shared by reference; the
+    message objects must not be mutated. To change it for one session, derive
+    a new prefix with `evolve()`, which leaves the shared one untouched.
+    """
+
+    agent_name: str
+    prompt: str
+    extra_context: tuple[tuple[str, str], ...]
+    system_prompt_support: bool = True
+    system_messages: tuple[SystemMessage, ...] = field(default=(), compare=False)
+    initial_messages: tuple[LLMMessage, ...] = field(default=(), compare=False)
+    extra_messages: tuple[LLMMessage, ...] = field(default=(), compare=False)
+    token_count: int = field(default=0, compare=False)
+
+    @classmethod
+    def build(
+        cls,
+        agent_name: str,
+        prompt: str,
+        extra_context: Sequence[Sequence[str]] | None = None,
+        system_prompt_support: bool = True,
+        token_counter: MessageTokenCounter | None = None,
+    ) -> "PromptPrefix":
+        """Compile the prefix messages and precompute their token count.
+
+        Raises:
+            ValueError: For an unknown or unsupported extra_context entry type.
+        """
+        extra_context = tuple(
+            (str(kind), str(text)) for kind, text in extra_context or ()
+        )
+        extra_messages: list[LLMMessage] = []
+        for kind, text in extra_context:
+            if kind == "ai":
+                extra_messages.append(AssistantMessage(content=text, source=agent_name))
+            elif kind == "human":
+                extra_messages.append(UserMessage(content=text, source="user"))
+            elif kind == "system":
+                raise ValueError(f"system message not implemented: {kind}")
+            else:
+                raise ValueError(f"Unknown extra context type {kind}")
+
+        if system_prompt_support:
+            system_messages = (SystemMessage(content=prompt),)
+            initial_messages = ()
+        else:
+            system_messages = ()
+            initial_messages = (UserMessage(content=prompt, source="user"),)
+
+        messages = [*system_messages, *initial_messages, *extra_messages]
+        counter = token_counter or MessageTokenCounter(prewarm=False)
+        return cls(
+            agent_name=agent_name,
+            prompt=prompt,
+            extra_context=extra_context,
+            system_prompt_support=system_prompt_support,
+            system_messages=system_messages,
+            initial_messages=initial_messages,
+            extra_messages=tuple(extra_messages),
+            token_count=sum(counter.count(messages)),
+        )
+
+    @property
+    def system_message(self) -> str | None:
+        """The system prompt, or None when it is injected as a user message."""
+        return self.system_messages[0].content if self.system_messages else None
+
+    @property
+    def messages(self) -> tuple[LLMMessage, ...]:
+        """All prefix messages in request order."""
+        return self.system_messages + self.initial_messages + self.extra_messages
+
+    def evolve(
+        self,
+        prompt: str | None = None,
+        extra_context: Sequence[Sequence[str]] | None = None,
+        token_counter: MessageTokenCounter | None = None,
+    ) -> "PromptPrefix":
+        """Return a new prefix with the given parts replaced (copy-on-write)."""
+        return PromptPrefix.build(
+            self.agent_name,
+            self.prompt if prompt is None else prompt,
+            self.extra_context if extra_context is None else extra_context,
+            self.system_prompt_support,
+            token_counter,
+        )
+
+
+def _message_units(
+    messages: Sequence[LLMMessage], start: int = 0
+) -> list[tuple[int, int]]:
+    """Split `messages[start:]` into (start, end) spans that are trimmed as one.
+
+    An assistant message with function calls and the tool results following
+    it form one span; every other message is a span of its own.
+    """
+    units = []
+    i = start
+    while i < len(messages):
+        end = i + 1
+        if isinstance(messages[i], AssistantMessage) and isinstance(
+            messages[i].content, list
+        ):
+            while end < len(messages) and isinstance(
+                messages[end], FunctionExecutionResultMessage
+            ):
+                end += 1
+        units.append((i, end))
+        i = end
+    return units
+
+
+@dataclass
+class ContextBudgetExceeded:
+    """Event emitted when a request would overflow the model's context budget.
+
+    Attributes:
+        model: Model id of the client.
+        tokens: Estimated prompt tokens of the request as built by the agent.
+        budget: Prompt token budget (max context minus reserved output).
+        fitted_tokens: Estimated prompt tokens after fitting.
+        dropped_messages: Number of messages removed from the request.
+        compacted: True if the agent's context was compacted to make room.
+    """
+
+    model: str
+    tokens: int
+    budget: int
+    fitted_tokens: int
+    dropped_messages: int = 0
+    compacted: bool = False
+
+
+class ContextFittingChatCompletionClient(ChatCompletionClient):
+    """Model client wrapper that fits each request into the context budget.
+
+    Before a request is sent, the messages and tool schemas are counted. If
+    they exceed `max_context - max_output`, the agent's context policy is
+    applied to the request: a summarizing context is compacted immediately,
+    and any other context is trimmed from the front, keeping system messages
+    and the context's initial messages; a tool call and its results are
+    dropped together. A ContextBudgetExceeded event is then passed to
+    `on_budget_exceeded`.
+
+    Args:
+        client: The wrapped model client; everything else is delegated to it.
+        max_context: Model context window in tokens.
+        max_output: Tokens reserved for the response.
+        model_id: Model id reported in events.
+        model_context: The agent's model context, used to apply its policy.
+        token_counter: Per-message counter; defaults to a MessageTokenCounter.
+        on_budget_exceeded: Async callable receiving a ContextBudgetExceeded.
+        head_size: Initial messages at the head of a context that has no
+            `head_size` of its own (e.g. autogen's buffered contexts).
+    """
+
+    def __init__(
+        self,
+        client: ChatCompletionClient,
+        max_context: int,
+        max_output: int = 0,
+        model_id: str = "",
+        model_context: ChatCompletionContext | None = None,
+        token_counter: MessageTokenCounter | None = None,
+        on_budget_exceeded: Callable[[ContextBudgetExceeded], Awaitable[None]]
+        | None = None,
+        head_size: int = 0,
+    ) -> None:
+        if max_context <= max_output:
+            raise ValueError("max_context must be greater than max_output")
+        self._client = client
+        self._budget = max_context - max_output
+        self._model_id = model_id
+        self._model_context = model_context
+        self._counter = token_counter or MessageTokenCounter(model=model_id)
+        self._on_budget_exceeded = on_budget_exceeded
+        self._context_head_size = head_size
+        # id(message) -> (message, tokens); holding the message keeps ids unique
+        self._counts: dict[int, tuple[LLMMessage, int]] = {}
+
+    @property
+    def budget(self) -> int:
+        return self._budget
+
+    @property
+    def client(self) -> ChatCompletionClient:
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        # delegate client-specific attributes (e.g. _create_args)
+        if name == "_client":
+            raise AttributeError(name)
+        return getattr(self._client, name)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: bool | type[BaseModel] | None = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: CancellationToken | None = None,
+    ) -> CreateResult:
+        messages = await self.fit(messages, tools)
+        return await self._client.create(
+            messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: bool | type[BaseModel] | None = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: CancellationToken | None = None,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        messages = await self.fit(messages, tools)
+        async for chunk in self._client.create_stream(
+            messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        ):
+            yield chunk
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return self._client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._client.total_usage()
+
+    def count_tokens(
+        self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []
+    ) -> int:
+        return self._client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(
+        self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []
+    ) -> int:
+        return self._client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return self._client.capabilities
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._client.model_info
+
+    # - - Fitting
+
+    def _message_tokens(self, messages: Sequence[LLMMessage]) -> list[int]:
+        """Per-message counts, only encoding messages not seen in earlier requests."""
+        new = [m for m in messages if self._counts.get(id(m), (None,))[0] is not m]
+        fresh = dict(zip(map(id, new), self._counter.count(new), strict=True))
+        counts = {}
+        for m in messages:
+            tokens = fresh[id(m)] if id(m) in fresh else self._counts[id(m)][1]
+            counts[id(m)] = (m, tokens)
+        # forget messages that are no longer part of the conversation
+        self._counts = counts
+        return [counts[id(m)][1] for m in messages]
+
+    def _fixed_tokens(self, tools: Sequence[Tool | ToolSchema]) -> int:
+        schemas = [t.schema if isinstance(t, Tool) else t for t in tools]
+        return REPLY_PRIMING_TOKENS + self._counter.count_tools(schemas)
+
+    def _head_size(self, messages: Sequence[LLMMessage]) -> int:
+        """Number of leading messages that must never be trimmed."""
+        size = 0
+        while size < len(messages) and isinstance(messages[size], SystemMessage):
+            size += 1
+        head = getattr(self._model_context, "head_size", self._context_head_size)
+        return min(size + head, len(messages))
+
+    async def _compact(self, messages: list[LLMMessage]) -> list[LLMMessage] | None:
+        """Apply a summarizing context's compaction to the request, if possible."""
+        ctx = self._model_context
+        if not isinstance(ctx, SummarizingChatCompletionContext):
+            return None
+        if not await ctx.compact():
+            return None
+        _, summary_message, recent = ctx.split_view()
+        if summary_message is None or not recent:
+            return None
+        # the request is system messages + the context's view, possibly with
+        # messages the agent adapted for the model; keep the request's own
+        # head and its copies of the recent messages, replacing what was
+        # summarized with the summary
+        head_size = self._head_size(messages)
+        head, history = messages[:head_size], messages[head_size:]
+        if len(recent) > len(history):
+            return None
+        return head + [summary_message] + history[len(history) - len(recent) :]
+
+    async def fit(
+        self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []
+    ) -> list[LLMMessage]:
+        """Return `messages`, fitted to the budget if they would overflow it.
+
+        Raises:
+            ValueError: The latest tool call and its results exceed the budget
+                on their own, so no valid request fits.
+        """
+        messages = list(messages)
+        fixed = self._fixed_tokens(tools)
+        counts = self._message_tokens(messages)
+        tokens = fixed + sum(counts)
+        if tokens <= self._budget:
+            return messages
+
+        original = len(messages)
+        compacted = await self._compact(messages)
+        if compacted is not None:
+            messages = compacted
+            counts = self._message_tokens(messages)
+
+        total = fixed + sum(counts)
+        head = self._head_size(messages)
+        units = _message_units(messages, head)
+        # drop the oldest units, always keeping the latest one; a tool call and
+        # its results go together, and results whose call is not part of the
+        # request (an earlier trim) are dropped regardless
+        while len(units) > 1 and (
+            total > self._budget
+            or isinstance(messages[units[0][0]], FunctionExecutionResultMessage)
+        ):
+            first, end = units.pop(0)
+            total -= sum(counts[first:end])
+        start = units[0][0] if units else len(messages)
+        fitted = messages[:head] + messages[start:]
+        if total > self._budget and units and units[0][1] - units[0][0] > 1:
+            raise ValueError(
+                f"the latest tool call and its results alone exceed the context "
+                f"budget of {self._model_id} ({total} > {self._budget} tokens)"
+            )
+        if total > self._budget:
+            logger.warning(
+                f"request for {self._model_id} still exceeds the context budget "
+                f"after fitting ({total} > {self._budget} tokens)"
+            )
+
+        event = ContextBudgetExceeded(
+            model=self._model_id,
+            tokens=tokens,
+            budget=self._budget,
+            fitted_tokens=total,
+            dropped_messages=original - len(fitted),
+            compacted=compacted is not None,
+        )
+        logger.info(
+            f"context budget exceeded for {self._model_id}: {tokens} > "
+            f"{self._budget} tokens, fitted to {total}"
+        )
+        if self._on_budget_exceeded is not None:
+            try:
+                await self._on_budget_exceeded(event)
+            except Exception as e:
+                logger.warning(f"budget-exceeded callback failed: {e}")
+        return fitted
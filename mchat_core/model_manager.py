@@ -10,11 +10,13 @@ from autogen_ext.models.openai import (
     OpenAIChatCompletionClient,
 )
 from dynaconf import Dynaconf, DynaconfFormatError
-from openai import OpenAI
+from openai import AsyncAzureOpenAI, AsyncOpenAI, AzureOpenAI, OpenAI
 from pydantic.networks import HttpUrl
 
 from . import config as _config
 from .azure_auth import AzureADTokenProvider
+from .embeddings import EmbeddingCache, EmbeddingClient
+from .images import ImageGenerator, ImageStore
 from .logging_utils import get_logger, trace  # noqa: F401
 
 logger = get_logger(__name__)
@@ -150,6 +152,14 @@ class ModelConfigEmbeddingAzure(ModelConfig):
 
 
 class DallEAPIWrapper:
+    """An image model opened with ModelManager.open_model.
+
+    `arun` generates images with an async client and keeps them in an
+    ImageStore (see `mchat_core.images`); it returns their URLs, one per
+    line. `run` is the synchronous equivalent and does not store images; it
+    uses `sync_client` (default: an OpenAI client with `api_key`).
+    """
+
     def __init__(
         self,
         api_key: str | None = None,
@@ -158,6 +168,10 @@ class DallEAPIWrapper:
         separator: str = "\n",
         model: str | None = "dall-e-2",
         quality: str | None = "standard",
+        client: AsyncOpenAI | AsyncAzureOpenAI | None = None,
+        sync_client: OpenAI | AzureOpenAI | None = None,
+        store: ImageStore | None = None,
+        max_concurrency: int = 4,
         **kwargs,
     ):
         self.api_key = api_key
@@ -166,11 +180,17 @@ class DallEAPIWrapper:
         self.separator = separator
         self.model = model
         self.quality = quality
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = client or AsyncOpenAI(api_key=self.api_key)
+        self.generator = ImageGenerator(
+            self.client, store=store, max_concurrency=max_concurrency
+        )
+        self._sync_client = sync_client
 
     def run(self, query: str) -> str:
+        if self._sync_client is None:
+            self._sync_client = OpenAI(api_key=self.api_key)
         try:
-            response = self.client.images.generate(
+            response = self._sync_client.images.generate(
                 prompt=query,
                 n=self.num_images,
                 size=self.size,
@@ -185,17 +205,14 @@ class DallEAPIWrapper:
 
     async def arun(self, query: str) -> str:
         try:
-            response = await asyncio.to_thread(
-                lambda: self.client.images.generate(
-                    prompt=query,
-                    n=self.num_images,
-                    size=self.size,
-                    model=self.model,
-                    quality=self.quality,
-                    response_format="url",
-                )
+            images = await self.generator.generate(
+                query,
+                model=self.model,
+                num_images=self.num_images,
+                size=self.size,
+                quality=self.quality,
             )
-            image_urls = self.separator.join([item.url for item in response.data])
+            image_urls = self.separator.join(image["url"] for image in images)
             return image_urls if image_urls else "No image was generated"
         except Exception as e:
             return f"Image Generation Error: {str(e)}"
@@ -284,6 +301,9 @@ class ModelManager:
         self.default_chat_model = settings.defaults.chat_model
         self.default_image_model = settings.get("defaults.image_model", None)
         self.default_embedding_model = settings.get("defaults.embedding_model", None)
+        # Keep embedding vectors on disk, so no text is embedded twice
+        self.embedding_cache = settings.get("defaults.embedding_cache", False)
+        self._embedding_cache: EmbeddingCache | None = None
         self.default_chat_temperature = settings.defaults.chat_temperature
         # Mini model for internal utilities; fall back to chat model if unset
         self.default_mini_model = (
@@ -297,7 +317,9 @@ class ModelManager:
             if all(getattr(value, k) in v for k, v in filter_dict.items())
         ]
 
-    def open_model(self, model_id: str, **kwargs) -> ChatCompletionClient:
+    def open_model(
+        self, model_id: str, **kwargs
+    ) -> ChatCompletionClient | DallEAPIWrapper | EmbeddingClient:
         logger.debug(f"Opening model {model_id}")
         record = copy.deepcopy(self.config[model_id])
         model_kwargs = {
@@ -355,10 +377,57 @@ class ModelManager:
             elif record.api_type == "azure":
                 return AzureOpenAIChatCompletionClient(**model_kwargs)
         elif record.model_type == "image":
+            if record.api_type == "azure":
+                azure_params = {
+                    "azure_endpoint": str(model_kwargs.pop("azure_endpoint")),
+                    **{
+                        name: model_kwargs.pop(name)
+                        for name in (
+                            "api_key",
+                            "azure_ad_token_provider",
+                            "azure_deployment",
+                            "api_version",
+                        )
+                        if name in model_kwargs
+                    },
+                }
+                model_kwargs["client"] = AsyncAzureOpenAI(**azure_params)
+                model_kwargs["sync_client"] = AzureOpenAI(**azure_params)
             return DallEAPIWrapper(**model_kwargs)
+        elif record.model_type == "embedding":
+            return self._open_embedding_model(record, model_kwargs)
 
         raise ValueError("Invalid model_type")
 
+    def _open_embedding_model(
+        self, record: ModelConfig, model_kwargs: dict
+    ) -> EmbeddingClient:
+        """An EmbeddingClient; `cache` (bool or EmbeddingCache) overrides the
+        `defaults.embedding_cache` setting."""
+        cache = model_kwargs.pop("cache", self.embedding_cache)
+        if cache is True:
+            if self._embedding_cache is None:
+                self._embedding_cache = EmbeddingCache()
+            cache = self._embedding_cache
+        options = {
+            name: model_kwargs.pop(name)
+            for name in (
+                "max_concurrency",
+                "max_batch",
+                "max_batch_tokens",
+                "dimensions",
+            )
+            if name in model_kwargs
+        }
+        model_kwargs.pop("model_id")
+        model = model_kwargs.pop("model")
+        if record.api_type == "azure":
+            model_kwargs["azure_endpoint"] = str(model_kwargs["azure_endpoint"])
+            client = AsyncAzureOpenAI(**model_kwargs)
+        else:
+            client = AsyncOpenAI(**model_kwargs)
+        return EmbeddingClient(client, model, cache=cache or None, **options)
+
     @staticmethod
     async def aask(question: str, model: str = None, system_prompt: str = None) -> str:
         """Asks a question to the model and returns the response."""
@@ -397,6 +466,16 @@ class ModelManager:
     def get_structured_output_support(self, model_id: str) -> bool:
         return self.config[model_id]._structured_output_support
 
+    def get_max_context(self, model_id: str) -> int | None:
+        return getattr(self.config[model_id], "_max_context", None)
+
+    def get_max_output(self, model_id: str) -> int | None:
+        """Tokens reserved for output: max_output_tokens if set, else _max_output."""
+        record = self.config[model_id]
+        return getattr(record, "max_output_tokens", None) or getattr(
+            record, "_max_output", None
+        )
+
     def get_compatible_models(self, agent: str, agents: dict) -> list:
         filter = {"model_type": ["chat"]}
         if "tools" in agents[agent]:
@@ -0,0 +1,923 @@
+"""
+Tool execution helpers used by agent sessions.
+
+- ToolOutputPolicy: how a tool result is compacted before it enters the model
+  context: JSON field projection, a hard token cap with head/tail truncation,
+  or mini-model summarization of oversized results.
+- ToolResultStore: keeps full results out-of-band under a handle, so nothing
+  is lost when a result is compacted; agents dereference handles on demand
+  with the `read_tool_result` tool.
+- ManagedTool: wraps an autogen tool and applies its output policy.
+- ToolResultCache / CachedTool: reuse results of idempotent tool calls across
+  sessions, keyed by tool name and canonical JSON arguments.
+- ToolExecutionStage / StagedTool: run the tool calls of a session with a cap
+  on parallel calls and per-tool timeouts, recording each call's latency and
+  reporting every call as it completes.
+- SessionWorkbench: a session's tools, extended as late MCP servers load.
+
+Policies are configured per agent in agents.yaml, with per-tool overrides:
+
+    researcher:
+      tools: [google_search, fetch_fred_data]
+      tool_output:
+        max_tokens: 1500        # agent default for all tools
+        strategy: head_tail     # head | tail | head_tail | summarize
+        tools:
+          fetch_fred_data:
+            fields: [title, observations.date, observations.value]
+          google_search:
+            strategy: summarize
+      tool_cache:
+        ttl: 600                # seconds; for cached tools without their own ttl
+        tools:
+          fetch_fred_data:
+            enabled: true
+      tool_execution:
+        max_parallel: 4         # concurrent tool calls per session
+        timeout: 60             # seconds per call (default: no limit)
+        tools:
+          google_search:
+            timeout: 120
+
+Caching is also enabled by the tools themselves: `cacheable`/`cache_ttl`
+class attributes of mchat tools and the `readOnlyHint`/`idempotentHint`
+annotations of MCP tools.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass, field, fields, replace
+from typing import Any
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, SystemMessage
+from autogen_core.tools import BaseTool, FunctionTool, StaticStreamWorkbench
+from pydantic import BaseModel
+
+from .logging_utils import get_logger, trace  # noqa: F401
+from .model_context import (
+    CHARS_PER_TOKEN,
+    REPLY_PRIMING_TOKENS,
+    TOKENS_PER_MESSAGE,
+    get_encoding,
+)
+from .tool_utils import tool_executor
+
+logger = get_logger(__name__)
+
+STRATEGIES = ("head", "tail", "head_tail", "summarize")
+
+READ_TOOL_NAME = "read_tool_result"
+
+tool_summary_prompt = (
+    "The following is the output of the tool '{tool}'. Summarize it in at most "
+    "{max_tokens} tokens for an AI assistant that will use it to answer the "
+    "user. Keep every fact, number, name, date, URL and error message that "
+    "could matter; drop boilerplate and repetition. Reply with the summary "
+    "only.\n\nTool output:\n{output}"
+)
+
+
+@dataclass
+class ToolOutputPolicy:
+    """How to compact the output of a tool before it enters the model context.
+
+    Attributes:
+        max_tokens: Hard cap on the tokens of the result; None means no cap.
+        strategy: head, tail or head_tail truncation, or summarize (mini model,
+            falling back to head_tail if summarization fails).
+        fields: JSON field projection applied first; dotted paths select
+            nested fields and lists are projected element-wise.
+        store: Keep the full result out-of-band under a handle when compacted.
+        summary_model: Model for the summarize strategy (default: mini model).
+    """
+
+    max_tokens: int | None = None
+    strategy: str = "head_tail"
+    fields: list[str] = field(default_factory=list)
+    store: bool = True
+    summary_model: str | None = None
+
+    def __post_init__(self):
+        if self.strategy not in STRATEGIES:
+            raise ValueError(
+                f"invalid tool output strategy '{self.strategy}', "
+                f"expected one of {', '.join(STRATEGIES)}"
+            )
+        if self.max_tokens is not None:
+            self.max_tokens = int(self.max_tokens)
+            if self.max_tokens <= 0:
+                raise ValueError("tool output max_tokens must be > 0")
+        if isinstance(self.fields, str):
+            self.fields = [self.fields]
+
+    @property
+    def is_active(self) -> bool:
+        return self.max_tokens is not None or bool(self.fields)
+
+    def merged(self, overrides: Mapping[str, Any]) -> "ToolOutputPolicy":
+        """Return a copy with the given configuration keys overridden."""
+        known = {f.name for f in fields(self)}
+        unknown = set(overrides) - known
+        if unknown:
+            raise ValueError(f"unknown tool output option(s): {sorted(unknown)}")
+        return replace(self, **dict(overrides))
+
+
+def resolve_output_policies(agent_data: dict) -> dict[str, ToolOutputPolicy]:
+    """Return the output policies of an agent, keyed by tool name.
+
+    The `tool_output` mapping of the agent sets the default, stored under "*",
+    and its `tools` mapping overrides it per tool (MCP tools included).
+    """
+    cfg = (agent_data or {}).get("tool_output") or {}
+    if not isinstance(cfg, Mapping):
+        raise ValueError("tool_output must be a mapping")
+    cfg = dict(cfg)
+    per_tool = cfg.pop("tools", None) or {}
+    default = ToolOutputPolicy().merged(cfg)
+    policies = {"*": default}
+    for tool, overrides in per_tool.items():
+        policies[tool] = default.merged(overrides or {})
+    return policies
+
+
+def policy_for(
+    policies: Mapping[str, ToolOutputPolicy], tool_name: str
+) -> ToolOutputPolicy | None:
+    """Return the active policy for a tool, or None if its output is left as is."""
+    policy = policies.get(tool_name, policies.get("*"))
+    return policy if policy is not None and policy.is_active else None
+
+
+# - - Compaction primitives
+
+_encoding_loaded = False
+
+
+async def load_text_encoding() -> None:
+    """Load the encoding used for tool results in the tool thread pool, once.
+
+    Loading may read or download a BPE file; afterwards count_text_tokens and
+    truncate_text use the cached encoding without blocking the event loop.
+    """
+    global _encoding_loaded
+    if not _encoding_loaded:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(tool_executor("thread"), get_encoding, None)
+        _encoding_loaded = True
+
+
+def count_text_tokens(text: str) -> int:
+    encoding = get_encoding(None)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_text(text: str, max_tokens: int, strategy: str = "head_tail") -> str:
+    """Truncate text to about max_tokens tokens, marking the omitted span."""
+    encoding = get_encoding(None)
+    if encoding is None:
+        units: Any = text
+        limit = max_tokens * CHARS_PER_TOKEN
+        unit_name = "characters"
+
+        def join(part):
+            return part
+    else:
+        units = encoding.encode(text, disallowed_special=())
+        limit = max_tokens
+        unit_name = "tokens"
+        join = encoding.decode
+    if len(units) <= limit:
+        return text
+
+    omitted = len(units) - limit
+    marker = f"\n...[{omitted} {unit_name} omitted]...\n"
+    if strategy == "head":
+        return join(units[:limit]) + marker
+    if strategy == "tail":
+        return marker + join(units[-limit:])
+    head = limit // 2
+    tail = limit - head
+    return join(units[:head]) + marker + join(units[-tail:])
+
+
+def project_json(value: Any, paths: list[str]) -> Any:
+    """Keep only the given (dotted) fields of a JSON value."""
+    if isinstance(value, list):
+        return [project_json(item, paths) for item in value]
+    if not isinstance(value, dict):
+        return value
+    nested: dict[str, list[str]] = {}
+    for path in paths:
+        key, _, rest = path.partition(".")
+        nested.setdefault(key, []).append(rest)
+    projected = {}
+    for key, rests in nested.items():
+        if key not in value:
+            continue
+        if "" in rests:
+            projected[key] = value[key]
+        else:
+            projected[key] = project_json(value[key], rests)
+    return projected
+
+
+class ToolResultStore:
+    """Out-of-band store of full tool results, addressed by handle.
+
+    Results are kept in memory, evicting the least recently used entry once
+    `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries: int = 100):
+        self.max_entries = max_entries
+        self._results: OrderedDict[str, tuple[str, str]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def put(self, tool_name: str, content: str) -> str:
+        handle = f"res_{uuid.uuid4().hex[:10]}"
+        self._results[handle] = (tool_name, content)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return handle
+
+    def get(self, handle: str) -> str | None:
+        entry = self._results.get(handle)
+        if entry is None:
+            return None
+        self._results.move_to_end(handle)
+        return entry[1]
+
+    def read(self, handle: str, offset: int = 0, length: int = 8000) -> str:
+        """Return a character slice of a stored result with a position header."""
+        content = self.get(handle)
+        if content is None:
+            return f"Error: no stored tool result with handle '{handle}'"
+        offset = max(0, int(offset))
+        end = min(len(content), offset + max(1, int(length)))
+        header = f"[{self._results[handle][0]} result {handle}: characters "
+        header += f"{offset}-{end} of {len(content)}]\n"
+        return header + content[offset:end]
+
+    def clear(self) -> None:
+        self._results.clear()
+
+    def as_tool(self) -> FunctionTool:
+        """A tool that lets the agent read stored results on demand."""
+
+        def read_tool_result(handle: str, offset: int = 0, length: int = 8000) -> str:
+            return self.read(handle, offset, length)
+
+        return FunctionTool(
+            read_tool_result,
+            name=READ_TOOL_NAME,
+            description=(
+                "Read the full output of an earlier tool call that was compacted. "
+                "Pass the handle from the compaction note and a character offset "
+                "and length to page through the result."
+            ),
+        )
+
+
+class ManagedTool(BaseTool[BaseModel, str]):
+    """Wraps an autogen tool and compacts its output per a ToolOutputPolicy.
+
+    The wrapped tool keeps its name, description and schema, so the model
+    sees no difference except for the size of the results.
+
+    Args:
+        tool: The wrapped tool.
+        policy: Output policy applied to its results.
+        store: Store keeping full results of compacted outputs.
+        summary_client: Model client of the summarize strategy.
+        summary_budget: Prompt token budget of the summary model (its context
+            minus reserved output); larger outputs are truncated to fit it
+            before they are summarized.
+    """
+
+    def __init__(
+        self,
+        tool: BaseTool,
+        policy: ToolOutputPolicy,
+        store: ToolResultStore | None = None,
+        summary_client: ChatCompletionClient | None = None,
+        summary_budget: int | None = None,
+    ):
+        super().__init__(
+            args_type=tool.args_type(),
+            return_type=str,
+            name=tool.name,
+            description=tool.description,
+        )
+        self.tool = tool
+        self.policy = policy
+        self.store = store
+        self.summary_client = summary_client
+        self.summary_budget = summary_budget
+
+    @property
+    def schema(self):
+        return self.tool.schema
+
+    async def run(self, args: BaseModel, cancellation_token: CancellationToken) -> str:
+        value = await self.tool.run(args, cancellation_token)
+        return await self.compact(self.tool.return_value_as_string(value))
+
+    async def run_json(
+        self,
+        args: Mapping[str, Any],
+        cancellation_token: CancellationToken,
+        call_id: str | None = None,
+    ) -> str:
+        value = await self.tool.run_json(args, cancellation_token, call_id=call_id)
+        return await self.compact(self.tool.return_value_as_string(value))
+
+    async def save_state_json(self) -> Mapping[str, Any]:
+        return await self.tool.save_state_json()
+
+    async def load_state_json(self, state: Mapping[str, Any]) -> None:
+        await self.tool.load_state_json(state)
+
+    async def compact(self, output: str) -> str:
+        """Apply the output policy to a result string."""
+        await load_text_encoding()
+        policy = self.policy
+        result = output
+        if policy.fields:
+            try:
+                projected = project_json(json.loads(output), policy.fields)
+                result = json.dumps(projected, ensure_ascii=False)
+            except (json.JSONDecodeError, TypeError):
+                logger.debug(f"{self.name} output is not JSON; skipping projection")
+
+        tokens = count_text_tokens(result)
+        if policy.max_tokens is not None and tokens > policy.max_tokens:
+            summary = None
+            if policy.strategy == "summarize":
+                summary = await self._summarize(result, policy.max_tokens)
+            result = summary or truncate_text(
+                result,
+                policy.max_tokens,
+                "head_tail" if policy.strategy == "summarize" else policy.strategy,
+            )
+
+        if result == output:
+            return output
+        note = f"[{self.name} output compacted from ~{count_text_tokens(output)} "
+        note += f"to ~{count_text_tokens(result)} tokens"
+        if policy.store and self.store is not None:
+            handle = self.store.put(self.name, output)
+            note += (
+                f"; full result stored as handle '{handle}', use "
+                f"{READ_TOOL_NAME}(handle='{handle}') to read it"
+            )
+        logger.debug(note)
+        return f"{result}\n{note}]"
+
+    async def _summarize(self, text: str, max_tokens: int) -> str | None:
+        if self.summary_client is None:
+            return None
+        if self.summary_budget is not None:
+            frame = tool_summary_prompt.format(
+                tool=self.name, max_tokens=max_tokens, output=""
+            )
+            # leave room for the message overhead and the truncation marker
+            marker = f"\n...[{len(text)} characters omitted]...\n"
+            room = (
+                self.summary_budget
+                - count_text_tokens(frame + marker)
+                - TOKENS_PER_MESSAGE
+                - REPLY_PRIMING_TOKENS
+            )
+            if room <= 0:
+                return None
+            text = truncate_text(text, room)
+        prompt = tool_summary_prompt.format(
+            tool=self.name, max_tokens=max_tokens, output=text
+        )
+        try:
+            result = await self.summary_client.create([SystemMessage(content=prompt)])
+        except Exception as e:
+            logger.warning(f"summarizing {self.name} output failed: {e}")
+            return None
+        if not isinstance(result.content, str) or not result.content.strip():
+            return None
+        return truncate_text(result.content.strip(), max_tokens, "head")
+
+
+# - - Result caching
+
+
+@dataclass
+class ToolCachePolicy:
+    """Whether and for how long the results of a tool are cached.
+
+    Attributes:
+        enabled: Cache successful results of the tool.
+        ttl: Seconds a result stays valid; None keeps it until evicted.
+    """
+
+    enabled: bool = False
+    ttl: float | None = 300.0
+
+    def __post_init__(self):
+        if self.ttl is not None:
+            self.ttl = float(self.ttl)
+            if self.ttl <= 0:
+                raise ValueError("tool cache ttl must be > 0")
+
+    def merged(self, overrides: Mapping[str, Any]) -> "ToolCachePolicy":
+        """Return a copy with the given configuration keys overridden."""
+        known = {f.name for f in fields(self)}
+        unknown = set(overrides) - known
+        if unknown:
+            raise ValueError(f"unknown tool cache option(s): {sorted(unknown)}")
+        return replace(self, **dict(overrides))
+
+
+def tool_cache_hints(tool: BaseTool) -> dict[str, Any]:
+    """Caching options a tool declares about itself.
+
+    mchat tools declare them with `cacheable` and `cache_ttl` class attributes
+    (found through the bound method wrapped by FunctionTool); MCP tools with
+    the `readOnlyHint` or `idempotentHint` annotation are cacheable.
+    """
+    if isinstance(tool, StagedTool):
+        tool = tool.tool
+    func = getattr(tool, "_func", None)
+    # mchat tools are registered through BaseTool.as_coroutine_function
+    func = getattr(func, "__wrapped__", func)
+    owner = getattr(func, "__self__", None)
+    if owner is not None and getattr(owner, "cacheable", False):
+        hints: dict[str, Any] = {"enabled": True}
+        if getattr(owner, "cache_ttl", None) is not None:
+            hints["ttl"] = owner.cache_ttl
+        return hints
+    # pooled MCP tools keep the autogen adapter (and its MCP definition) inside
+    adapter = getattr(tool, "_adapter", tool)
+    annotations = getattr(getattr(adapter, "_tool", None), "annotations", None)
+    if annotations is not None and (
+        annotations.readOnlyHint or annotations.idempotentHint
+    ):
+        return {"enabled": True}
+    return {}
+
+
+def resolve_cache_policy(agent_data: dict, tool: BaseTool) -> ToolCachePolicy | None:
+    """Return the cache policy of a tool for an agent, or None if not cached.
+
+    The agent's `tool_cache` settings are the defaults, the tool's own hints
+    (e.g. its `cache_ttl`) take precedence over them, and the per-tool
+    overrides under `tool_cache.tools` win over both. The agent-level
+    `enabled` only switches caching of tools the hints mark cacheable; other
+    tools are cached only when a per-tool override enables them.
+    """
+    cfg = (agent_data or {}).get("tool_cache") or {}
+    if not isinstance(cfg, Mapping):
+        raise ValueError("tool_cache must be a mapping")
+    cfg = dict(cfg)
+    per_tool = cfg.pop("tools", None) or {}
+    enabled = cfg.pop("enabled", None)
+    hints = tool_cache_hints(tool)
+    policy = ToolCachePolicy().merged(cfg).merged(hints)
+    if enabled is not None and hints.get("enabled"):
+        policy = replace(policy, enabled=bool(enabled))
+    policy = policy.merged(per_tool.get(tool.name) or {})
+    return policy if policy.enabled else None
+
+
+class ToolResultCache:
+    """Results of idempotent tool calls, shared by all sessions of a manager.
+
+    Entries expire per their policy's TTL and the least recently used entry is
+    evicted once `max_entries` is reached. Identical calls made while the
+    first is still running wait for its result instead of running again.
+    Failed calls are never cached.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        # call ids answered from the cache, until reported
+        self._hit_calls: OrderedDict[str, None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(tool_name: str, args: Mapping[str, Any]) -> str:
+        """Cache key of a call: tool name plus canonical JSON arguments."""
+        return json.dumps(
+            {"tool": tool_name, "args": args},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+
+    def _lookup(self, key: str) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: str, value: Any, ttl: float | None) -> None:
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _record_hit(self, call_id: str | None) -> None:
+        self.hits += 1
+        if call_id:
+            self._hit_calls[call_id] = None
+            while len(self._hit_calls) > self.max_entries:
+                self._hit_calls.popitem(last=False)
+
+    async def get_or_run(
+        self,
+        key: str,
+        ttl: float | None,
+        run: Callable[[], Awaitable[Any]],
+        call_id: str | None = None,
+    ) -> Any:
+        """Return the cached result for key, running `run` on a miss."""
+        found, value = self._lookup(key)
+        if found:
+            self._record_hit(call_id)
+            return value
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                value = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # the first caller was cancelled, not us: run the call ourselves
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            else:
+                self._record_hit(call_id)
+                return value
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await run()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here; waiters re-raise it
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        future.set_result(value)
+        self.put(key, value, ttl)
+        return value
+
+    def pop_hits(self, call_ids: Iterable[str]) -> list[str]:
+        """Return (and forget) which of the given tool calls were cache hits."""
+        hits = [call_id for call_id in call_ids if call_id in self._hit_calls]
+        for call_id in hits:
+            del self._hit_calls[call_id]
+        return hits
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._hit_calls.clear()
+
+
+class CachedTool(BaseTool[BaseModel, Any]):
+    """Wraps an autogen tool and serves repeated calls from a ToolResultCache."""
+
+    def __init__(self, tool: BaseTool, policy: ToolCachePolicy, cache: ToolResultCache):
+        super().__init__(
+            args_type=tool.args_type(),
+            return_type=tool.return_type(),
+            name=tool.name,
+            description=tool.description,
+        )
+        self.tool = tool
+        self.policy = policy
+        self.cache = cache
+
+    @property
+    def schema(self):
+        return self.tool.schema
+
+    def return_value_as_string(self, value: Any) -> str:
+        return self.tool.return_value_as_string(value)
+
+    def _key(self, args: Mapping[str, Any]) -> str:
+        # validate to fill in defaults, so equivalent calls share an entry
+        try:
+            args = self.args_type().model_validate(args).model_dump(mode="json")
+        except Exception:
+            pass
+        return self.cache.key(self.name, args)
+
+    async def run(self, args: BaseModel, cancellation_token: CancellationToken) -> Any:
+        return await self.cache.get_or_run(
+            self._key(args.model_dump(mode="json")),
+            self.policy.ttl,
+            lambda: self.tool.run(args, cancellation_token),
+        )
+
+    async def run_json(
+        self,
+        args: Mapping[str, Any],
+        cancellation_token: CancellationToken,
+        call_id: str | None = None,
+    ) -> Any:
+        return await self.cache.get_or_run(
+            self._key(args),
+            self.policy.ttl,
+            lambda: self.tool.run_json(args, cancellation_token, call_id=call_id),
+            call_id,
+        )
+
+    async def save_state_json(self) -> Mapping[str, Any]:
+        return await self.tool.save_state_json()
+
+    async def load_state_json(self, state: Mapping[str, Any]) -> None:
+        await self.tool.load_state_json(state)
+
+
+# - - Execution stage
+
+
+@dataclass
+class ToolExecutionPolicy:
+    """How the tool calls of a session are executed.
+
+    Attributes:
+        max_parallel: Tool calls of a session that may run at the same time;
+            calls a model requests together beyond this wait for a slot.
+        timeout: Seconds a call may run before it fails; None means no limit.
+    """
+
+    max_parallel: int = 4
+    timeout: float | None = None
+
+    def __post_init__(self):
+        self.max_parallel = int(self.max_parallel)
+        if self.max_parallel < 1:
+            raise ValueError("tool execution max_parallel must be >= 1")
+        if self.timeout is not None:
+            self.timeout = float(self.timeout)
+            if self.timeout <= 0:
+                raise ValueError("tool execution timeout must be > 0")
+
+    def merged(self, overrides: Mapping[str, Any]) -> "ToolExecutionPolicy":
+        """Return a copy with the given configuration keys overridden."""
+        known = {f.name for f in fields(self)}
+        unknown = set(overrides) - known
+        if unknown:
+            raise ValueError(f"unknown tool execution option(s): {sorted(unknown)}")
+        return replace(self, **dict(overrides))
+
+
+def resolve_execution_policy(
+    agent_data: dict, tool_name: str | None = None
+) -> ToolExecutionPolicy:
+    """Return the execution policy of an agent, or of one of its tools.
+
+    The `tool_execution` mapping of the agent sets the default and its `tools`
+    mapping overrides it per tool.
+    """
+    cfg = (agent_data or {}).get("tool_execution") or {}
+    if not isinstance(cfg, Mapping):
+        raise ValueError("tool_execution must be a mapping")
+    cfg = dict(cfg)
+    per_tool = cfg.pop("tools", None) or {}
+    policy = ToolExecutionPolicy().merged(cfg)
+    if tool_name is not None:
+        policy = policy.merged(per_tool.get(tool_name) or {})
+    return policy
+
+
+@dataclass
+class ToolCallRecord:
+    """Outcome of one tool call run by a ToolExecutionStage."""
+
+    tool: str
+    call_id: str | None
+    source: str | None
+    latency: float
+    error: str | None = None
+    timed_out: bool = False
+
+
+class ToolExecutionStage:
+    """Runs the tool calls of a session: bounded parallelism and timeouts.
+
+    A model may request several tools in one response; they run concurrently,
+    at most `max_parallel` at a time. Every call is recorded with its latency
+    (see `pop_records`) and reported to `on_complete` as soon as it finishes,
+    so a UI can show results in completion order.
+
+    Args:
+        max_parallel: Concurrent calls allowed.
+        on_complete: Optional async callable invoked with the ToolCallRecord of
+            each finished call and its result (None if it failed).
+    """
+
+    def __init__(
+        self,
+        max_parallel: int = 4,
+        on_complete: Callable[[ToolCallRecord, Any], Awaitable[None]] | None = None,
+    ):
+        self.max_parallel = max_parallel
+        self.on_complete = on_complete
+        self._slots = asyncio.Semaphore(max_parallel)
+        self._records: dict[str, ToolCallRecord] = {}
+        self._running: set[asyncio.Future] = set()
+        self.in_flight = 0
+
+    async def execute(
+        self,
+        tool: str,
+        run: Callable[[], Awaitable[Any]],
+        call_id: str | None = None,
+        timeout: float | None = None,
+        source: str | None = None,
+        cancellation_token: CancellationToken | None = None,
+    ) -> Any:
+        """Run one tool call in a free slot, bounded by `timeout`.
+
+        Cancelling `cancellation_token` cancels the call wherever it is: still
+        waiting for a slot, or running (which cancels the tool's coroutine).
+        """
+        if cancellation_token is None:
+            cancellation_token = CancellationToken()
+        async with self._slots:
+            if cancellation_token.is_cancelled():
+                raise asyncio.CancelledError("Operation cancelled")
+            self.in_flight += 1
+            start = time.perf_counter()
+            record = ToolCallRecord(tool, call_id, source, latency=0.0)
+            result = None
+            cancelled = False
+            call = asyncio.ensure_future(asyncio.wait_for(run(), timeout))
+            cancellation_token.link_future(call)
+            self._running.add(call)
+            try:
+                result = await call
+            except asyncio.CancelledError:
+                cancelled = True
+                call.cancel()
+                raise
+            except TimeoutError:
+                if timeout is None:
+                    raise
+                record.timed_out = True
+                record.error = f"Tool {tool} timed out after {timeout} seconds"
+                raise TimeoutError(record.error) from None
+            except Exception as e:
+                record.error = str(e) or type(e).__name__
+                raise
+            finally:
+                self._running.discard(call)
+                self.in_flight -= 1
+                record.latency = time.perf_counter() - start
+                if call_id is not None:
+                    self._records[call_id] = record
+                logger.debug(
+                    f"Tool {tool} ({call_id}) finished in {record.latency:.3f}s"
+                    + (f": {record.error}" if record.error else "")
+                    + (" (cancelled)" if cancelled else "")
+                )
+                # failures are reported too; cancelled calls are not
+                if self.on_complete is not None and not cancelled:
+                    try:
+                        await self.on_complete(record, result)
+                    except Exception as e:
+                        logger.warning(f"Tool completion callback failed: {e}")
+            return result
+
+    def cancel_all(self) -> int:
+        """Cancel every running call of the stage; returns how many."""
+        running = [call for call in self._running if not call.done()]
+        for call in running:
+            call.cancel()
+        return len(running)
+
+    def pop_records(self, call_ids: Iterable[str | None]) -> list[ToolCallRecord]:
+        """Remove and return the records of the given calls, in that order."""
+        return [
+            record
+            for call_id in call_ids
+            if call_id is not None
+            and (record := self._records.pop(call_id, None)) is not None
+        ]
+
+
+class StagedTool(BaseTool[BaseModel, Any]):
+    """Wraps an autogen tool so its calls run through a ToolExecutionStage."""
+
+    def __init__(
+        self,
+        tool: BaseTool,
+        stage: ToolExecutionStage,
+        timeout: float | None = None,
+        source: str | None = None,
+    ):
+        super().__init__(
+            args_type=tool.args_type(),
+            return_type=tool.return_type(),
+            name=tool.name,
+            description=tool.description,
+        )
+        self.tool = tool
+        self.stage = stage
+        self.timeout = timeout
+        self.source = source
+
+    @property
+    def schema(self):
+        return self.tool.schema
+
+    def return_value_as_string(self, value: Any) -> str:
+        return self.tool.return_value_as_string(value)
+
+    async def run(self, args: BaseModel, cancellation_token: CancellationToken) -> Any:
+        return await self.stage.execute(
+            self.name,
+            lambda: self.tool.run(args, cancellation_token),
+            timeout=self.timeout,
+            source=self.source,
+            cancellation_token=cancellation_token,
+        )
+
+    async def run_json(
+        self,
+        args: Mapping[str, Any],
+        cancellation_token: CancellationToken,
+        call_id: str | None = None,
+    ) -> Any:
+        return await self.stage.execute(
+            self.name,
+            lambda: self.tool.run_json(args, cancellation_token, call_id=call_id),
+            call_id=call_id,
+            timeout=self.timeout,
+            source=self.source,
+            cancellation_token=cancellation_token,
+        )
+
+    async def save_state_json(self) -> Mapping[str, Any]:
+        return await self.tool.save_state_json()
+
+    async def load_state_json(self, state: Mapping[str, Any]) -> None:
+        await self.tool.load_state_json(state)
+
+
+# - - Session workbench
+
+
+class SessionWorkbench(StaticStreamWorkbench):
+    """The tool workbench of one agent session; tools can be added later.
+
+    Lets a session attach the tools of MCP servers that finished loading after
+    the agent was built, without reaching into the agent's workbench.
+    """
+
+    def __init__(self, tools: Iterable[BaseTool] = ()):
+        tools = list(tools)
+        names = [tool.name for tool in tools]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Tool names must be unique: {names}")
+        super().__init__(tools)
+
+    @property
+    def tools(self) -> list[BaseTool]:
+        return list(self._tools)
+
+    def add_tools(self, tools: Iterable[BaseTool]) -> list[str]:
+        """Add tools whose names are not taken yet; returns the names added."""
+        known = {tool.name for tool in self._tools}
+        added = []
+        for tool in tools:
+            if tool.name not in known:
+                self._tools.append(tool)
+                known.add(tool.name)
+                added.append(tool.name)
+        return added
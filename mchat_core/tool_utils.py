@@ -1,12 +1,29 @@
 import asyncio
+import contextlib
+import contextvars
+import functools
+import hashlib
 import importlib.util
+import json
+import multiprocessing
 import os
 import shlex
+import shutil
+import threading
+import time
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
 from urllib.parse import urlparse
 
+from autogen_core import CancellationToken
+from autogen_core.tools import BaseTool as AutogenBaseTool
 from autogen_core.tools import FunctionTool
+from pydantic import BaseModel
 
 from .logging_utils import get_logger
+from .loop_watchdog import track
 
 logger = get_logger(__name__)
 
@@ -202,6 +219,254 @@ def parse_mcp_tools(
     return mcp_tools
 
 
+@dataclass
+class MCPValidation:
+    """Reusable result of validating an MCP server.
+
+    Besides the verdict it keeps the tool list and input schemas the server
+    reported, so loading the server's tools later needs no second handshake.
+    `cached` is True when the result came from the on-disk validation cache.
+    """
+
+    spec_string: str
+    valid: bool
+    tools: list[dict] = field(default_factory=list)
+    cached: bool = False
+
+    @property
+    def tool_names(self) -> list[str]:
+        return [tool["name"] for tool in self.tools]
+
+
+def default_cache_path(filename: str) -> str:
+    """Path of a cache file in the user's cache directory (XDG_CACHE_HOME)."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "mchat_core", filename)
+
+
+class MCPValidationCache:
+    """Cache of successful stdio MCP server validations.
+
+    Entries are keyed by the command, args, env and cwd of the server and the
+    modification times of its executable and of any args that are files, so
+    an upgraded server or changed configuration is probed again. Web servers
+    and failed validations are never cached. With `path`, entries are
+    persisted to disk as JSON and survive restarts; otherwise they are kept
+    in memory.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = os.path.expanduser(path) if path else None
+        self._entries: dict[str, dict] | None = None if path else {}
+
+    def key_for(self, spec: "MCPToolSpec") -> str | None:
+        if spec.type != "stdio":
+            return None
+        command = spec.connection_info["command"]
+        executable = command if os.path.isabs(command) else shutil.which(command)
+        if not executable:
+            return None
+        cwd = spec.get_config_value("cwd", os.getcwd())
+        try:
+            mtimes = {executable: os.stat(executable).st_mtime_ns}
+            for arg in spec.connection_info.get("args", []):
+                path = os.path.join(cwd, arg)
+                if os.path.isfile(path):
+                    mtimes[arg] = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        payload = {
+            "command": command,
+            "args": spec.connection_info.get("args", []),
+            "env": spec.get_config_value("env", None),
+            "cwd": cwd,
+            "mtimes": mtimes,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _load(self) -> dict[str, dict]:
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable MCP validation cache: {e}")
+                self._entries = {}
+        return self._entries
+
+    def get(self, spec: "MCPToolSpec") -> MCPValidation | None:
+        key = self.key_for(spec)
+        entry = self._load().get(key) if key else None
+        if entry is None:
+            return None
+        return MCPValidation(spec.spec_string, True, entry["tools"], cached=True)
+
+    def put(self, spec: "MCPToolSpec", validation: MCPValidation) -> None:
+        key = self.key_for(spec)
+        if key is None or not validation.valid:
+            return
+        entries = self._load()
+        entries[key] = {"spec": spec.spec_string, "tools": validation.tools}
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write MCP validation cache {self.path}: {e}")
+
+
+def _mcp_tool_schema(tool: AutogenBaseTool) -> dict:
+    """The MCP tool definition behind an autogen MCP tool adapter."""
+    if isinstance(tool, PooledMCPTool):
+        tool = tool._adapter
+    mcp_tool = getattr(tool, "_tool", None)
+    if mcp_tool is not None and hasattr(mcp_tool, "model_dump"):
+        return mcp_tool.model_dump(mode="json", exclude_none=True)
+    schema = tool.schema
+    return {
+        "name": schema["name"],
+        "description": schema.get("description", ""),
+        "inputSchema": schema.get("parameters", {"type": "object", "properties": {}}),
+    }
+
+
+def mcp_tools_from_schemas(
+    server_params: Any, tools: list[dict], session: Any = None
+) -> dict[str, Any]:
+    """Build MCP tool adapters from stored tool definitions, without listing them.
+
+    With a `session` the adapters call through it; otherwise each call opens
+    its own connection to the server.
+    """
+    from autogen_ext.tools.mcp import (
+        StdioMcpToolAdapter,
+        StdioServerParams,
+        StreamableHttpMcpToolAdapter,
+    )
+    from mcp.types import Tool
+
+    if isinstance(server_params, StdioServerParams):
+        adapter_cls = StdioMcpToolAdapter
+    else:
+        adapter_cls = StreamableHttpMcpToolAdapter
+    return {
+        tool["name"]: adapter_cls(
+            server_params=server_params, tool=Tool.model_validate(tool), session=session
+        )
+        for tool in tools
+    }
+
+
+def mcp_spec_key(spec: "MCPToolSpec") -> str:
+    """Key of the server a spec runs: the spec string plus its cwd and env."""
+    extras = {k: spec.config.get(k) for k in ("cwd", "env") if spec.config.get(k)}
+    if not extras:
+        return spec.spec_string
+    return f"{spec.spec_string} {json.dumps(extras, sort_keys=True)}"
+
+
+class MCPToolSchemaCache:
+    """Cache of MCP tool definitions and their adapters, keyed by server.
+
+    Keys are `mcp_spec_key(spec)`, the key of the server's MCPSessionPool
+    connection, so specs that differ only in `cwd` or `env` (and so may run
+    different servers) do not share entries.
+
+    Entries expire after `ttl` seconds (None: never) or when a live server
+    session reports `notifications/tools/list_changed`. Adapters built from an
+    entry are kept with it, so registering the tools of a cached server in a
+    new session is a dictionary lookup. With `path`, the definitions (not the
+    adapters) are persisted to disk as JSON.
+    """
+
+    def __init__(self, ttl: float | None = 600.0, path: str | None = None):
+        self.ttl = ttl
+        self.path = path
+        # server key -> {"tools": [...], "fetched_at": epoch seconds}
+        self._entries: dict[str, dict] = {}
+        self._adapters: dict[str, dict[str, Any]] = {}
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def _is_fresh(self, entry: dict) -> bool:
+        return self.ttl is None or time.time() - entry["fetched_at"] < self.ttl
+
+    def get(self, key: str) -> list[dict] | None:
+        """Return the cached tool definitions of a server, if still fresh."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not self._is_fresh(entry):
+            self.invalidate(key)
+            return None
+        return entry["tools"]
+
+    def get_adapters(self, key: str, server_params: Any) -> dict[str, Any] | None:
+        """Return (building once) the cached connection-less tool adapters."""
+        tools = self.get(key)
+        if tools is None:
+            return None
+        adapters = self._adapters.get(key)
+        if adapters is None:
+            adapters = mcp_tools_from_schemas(server_params, tools)
+            self._adapters[key] = adapters
+        return adapters
+
+    def put(
+        self,
+        key: str,
+        tools: list[dict],
+        adapters: dict[str, Any] | None = None,
+    ) -> None:
+        self._entries[key] = {"tools": tools, "fetched_at": time.time()}
+        self._adapters.pop(key, None)
+        if adapters is not None:
+            self._adapters[key] = adapters
+        self._save()
+
+    def invalidate(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            logger.debug(f"Invalidated cached MCP tool schemas of {key}")
+            self._save()
+        self._adapters.pop(key, None)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable MCP schema cache: {e}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write MCP schema cache {self.path}: {e}")
+
+
 async def validate_mcp_tool(mcp_spec: MCPToolSpec) -> bool:
     """Validate that an MCP tool specification is reachable/valid.
 
@@ -211,6 +476,32 @@ async def validate_mcp_tool(mcp_spec: MCPToolSpec) -> bool:
     Returns:
         True if the MCP server appears to be valid/reachable
     """
+    return (await probe_mcp_tool(mcp_spec)).valid
+
+
+async def probe_mcp_tool(
+    mcp_spec: MCPToolSpec,
+    session_pool: "MCPSessionPool | None" = None,
+    cache: MCPValidationCache | None = None,
+) -> MCPValidation:
+    """Validate an MCP server and keep what was learned doing so.
+
+    Args:
+        mcp_spec: MCP tool specification to validate
+        session_pool: When given, stdio servers are started in the pool and
+            their live session is kept for the first conversation
+        cache: On-disk validation cache to consult and update
+
+    Returns:
+        MCPValidation with the verdict and the server's tool definitions
+    """
+    if cache is not None:
+        cached = cache.get(mcp_spec)
+        if cached is not None:
+            logger.debug(f"MCP validation cache hit for {mcp_spec}")
+            return cached
+
+    invalid = MCPValidation(mcp_spec.spec_string, False)
     try:
         # Import MCP functionality
         try:
@@ -221,7 +512,7 @@ async def validate_mcp_tool(mcp_spec: MCPToolSpec) -> bool:
             )
         except ImportError:
             logger.warning("autogen_ext.tools.mcp not available for MCP validation")
-            return False
+            return invalid
 
         # Create appropriate server params based on type
         if mcp_spec.type == "web":
@@ -231,17 +522,15 @@ async def validate_mcp_tool(mcp_spec: MCPToolSpec) -> bool:
             )
         elif mcp_spec.type == "stdio":
             # For stdio MCP, first check if the command exists and is executable
-            import shutil
-
             command = mcp_spec.connection_info["command"]
 
             # Check if command exists in PATH or is an absolute path
             if os.path.isabs(command):
                 if not (os.path.isfile(command) and os.access(command, os.X_OK)):
-                    return False
+                    return invalid
             else:
                 if shutil.which(command) is None:
-                    return False
+                    return invalid
 
             server_params = StdioServerParams(
                 command=command,
@@ -251,29 +540,614 @@ async def validate_mcp_tool(mcp_spec: MCPToolSpec) -> bool:
             )
         else:
             logger.warning(f"Unknown MCP type: {mcp_spec.type}")
-            return False
+            return invalid
 
         # Actually try to query the MCP server for its tools
         # This is the proper way to validate - use the MCP protocol
         try:
-            tools = await mcp_server_tools(server_params)
-            # If we can get tools without error, the server is valid
-            return len(tools) >= 0  # Even 0 tools is valid
+            if session_pool is not None and mcp_spec.type == "stdio":
+                # keep the live session for the first conversation
+                tools = list(
+                    (await session_pool.load_tools(mcp_spec, server_params)).values()
+                )
+            else:
+                tools = await mcp_server_tools(server_params)
         except Exception as e:
             logger.debug(f"MCP validation failed for {mcp_spec}: {e}")
-            return False
+            return invalid
+
+        # If we can get tools without error, the server is valid (even 0 tools)
+        validation = MCPValidation(
+            mcp_spec.spec_string, True, [_mcp_tool_schema(t) for t in tools]
+        )
+        if cache is not None:
+            cache.put(mcp_spec, validation)
+        return validation
 
     except Exception as e:
         logger.warning(f"Error validating MCP tool {mcp_spec}: {e}")
-        return False
+        return invalid
+
+
+class PooledMCPTool(AutogenBaseTool):
+    """An MCP tool whose calls go through a pooled server connection.
+
+    The tool keeps the adapter's name, description and schema but resolves the
+    adapter on every call, so it keeps working after the server restarts.
+    """
+
+    def __init__(self, connection: "MCPServerConnection", adapter: AutogenBaseTool):
+        super().__init__(
+            args_type=adapter.args_type(),
+            return_type=adapter.return_type(),
+            name=adapter.name,
+            description=adapter.description,
+        )
+        self.connection = connection
+        self._adapter = adapter
+
+    @property
+    def schema(self):
+        return self._adapter.schema
+
+    def return_value_as_string(self, value: Any) -> str:
+        return self._adapter.return_value_as_string(value)
+
+    async def run(self, args: BaseModel, cancellation_token: CancellationToken) -> Any:
+        return await self.connection.call_tool(self.name, args, cancellation_token)
+
+
+# Ids of the requests the current task sent on an MCP session (see
+# _RequestIdRecorder); set by a caller that needs them, e.g. to cancel a call
+_sent_request_ids: contextvars.ContextVar[list | None] = contextvars.ContextVar(
+    "mchat_mcp_request_ids", default=None
+)
+
+
+class _RequestIdRecorder:
+    """Wraps an MCP session's write stream to record the ids of the requests
+    each task sends, so a cancelled call can name its request."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def send(self, message) -> None:
+        sent = _sent_request_ids.get()
+        if sent is not None:
+            request_id = getattr(message.message.root, "id", None)
+            if request_id is not None:
+                sent.append(request_id)
+        await self._stream.send(message)
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self._stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextlib.asynccontextmanager
+async def open_mcp_session(server_params: Any, message_handler: Any = None):
+    """Open an MCP ClientSession for autogen server params.
+
+    Like autogen's `create_mcp_server_session`, but registers a
+    `message_handler` for server notifications (e.g. tools/list_changed) and
+    records the ids of the requests sent (see `_RequestIdRecorder`).
+    """
+    from datetime import timedelta
+
+    from autogen_ext.tools.mcp import (
+        SseServerParams,
+        StdioServerParams,
+        StreamableHttpServerParams,
+    )
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+    from mcp.client.stdio import stdio_client
+    from mcp.client.streamable_http import streamablehttp_client
+
+    if isinstance(server_params, StdioServerParams):
+        transport = stdio_client(server_params)
+        read_timeout = server_params.read_timeout_seconds
+    elif isinstance(server_params, SseServerParams):
+        transport = sse_client(**server_params.model_dump(exclude={"type"}))
+        read_timeout = server_params.sse_read_timeout
+    elif isinstance(server_params, StreamableHttpServerParams):
+        params = server_params.model_dump(exclude={"type"})
+        params["timeout"] = timedelta(seconds=server_params.timeout)
+        params["sse_read_timeout"] = timedelta(seconds=server_params.sse_read_timeout)
+        transport = streamablehttp_client(**params)
+        read_timeout = server_params.sse_read_timeout
+    else:
+        raise ValueError(f"Unsupported MCP server params: {type(server_params)}")
+
+    async with transport as streams:
+        async with ClientSession(
+            read_stream=streams[0],
+            write_stream=_RequestIdRecorder(streams[1]),
+            read_timeout_seconds=timedelta(seconds=read_timeout),
+            message_handler=message_handler,
+        ) as session:
+            yield session
+
+
+# Longest wait before restarting an unhealthy MCP server, in seconds
+_MAX_RESTART_BACKOFF = 60.0
+
+
+class MCPServerConnection:
+    """A live MCP session for one server, shared by all conversations.
+
+    The session is opened and closed inside a dedicated background task, since
+    the MCP transports are context managers that must exit in the task that
+    entered them. Tool calls are limited to `max_concurrency` in flight.
+
+    The same task checks the server's health: it pings the server every
+    `health_check_interval` seconds and, when a ping fails or a call finds the
+    connection broken, restarts the server after a backoff (`restart_backoff`
+    seconds, doubling with each restart) at most `max_restarts` times. Calls
+    made while it restarts wait for the new session.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        server_params: Any,
+        max_concurrency: int = 4,
+        health_check_interval: float = 30.0,
+        start_timeout: float = 30.0,
+        max_restarts: int = 3,
+        schema_cache: MCPToolSchemaCache | None = None,
+        restart_backoff: float = 1.0,
+    ):
+        self.key = key
+        self.server_params = server_params
+        self.schema_cache = schema_cache
+        self.health_check_interval = health_check_interval
+        self.start_timeout = start_timeout
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.restarts = 0
+        self._started = False
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping: asyncio.Event | None = None
+        # set while a session is open; cleared by a broken call to restart it
+        self._connected = asyncio.Event()
+        self._broken = asyncio.Event()
+        self._session = None
+        self._adapters: dict[str, AutogenBaseTool] = {}
+        self._tools: dict[str, PooledMCPTool] = {}
+        self._refresh_task: asyncio.Task | None = None
+        # cancellation notices being sent for abandoned requests
+        self._notifications: set[asyncio.Task] = set()
+
+    @property
+    def is_running(self) -> bool:
+        return (
+            self._task is not None
+            and not self._task.done()
+            and self._session is not None
+        )
+
+    @property
+    def tools(self) -> dict[str, PooledMCPTool]:
+        """Pooled tools exposed by the server, keyed by tool name."""
+        return dict(self._tools)
+
+    async def ensure_started(self) -> None:
+        """Start the server session, restarting it if it has died."""
+        if self.is_running:
+            return
+        async with self._lock:
+            if self.is_running:
+                return
+            if self._task is not None and not self._task.done():
+                # the health check task is restarting the server
+                await self._wait_for_restart()
+                return
+            if self._started:
+                if self.restarts >= self.max_restarts:
+                    raise RuntimeError(
+                        f"MCP server {self.key} failed {self.restarts} restarts"
+                    )
+                self.restarts += 1
+                logger.warning(
+                    f"Restarting MCP server {self.key} "
+                    f"(restart {self.restarts}/{self.max_restarts})"
+                )
+                await self._stop_task()
+            await self._start()
+
+    async def _wait_for_restart(self) -> None:
+        task = self._task
+        connected = asyncio.ensure_future(self._connected.wait())
+        try:
+            await asyncio.wait(
+                {connected, task},
+                timeout=self.start_timeout + self._backoff(self.restarts + 1),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            connected.cancel()
+        if not self.is_running:
+            raise RuntimeError(f"MCP server {self.key} could not be restarted")
+
+    def _backoff(self, restart: int) -> float:
+        return min(self.restart_backoff * 2 ** (restart - 1), _MAX_RESTART_BACKOFF)
+
+    async def _start(self) -> None:
+        ready = asyncio.get_running_loop().create_future()
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._serve(ready), name=f"mcp:{self.key}")
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), self.start_timeout)
+        except BaseException:
+            await self._stop_task()
+            raise
+        self._started = True
+        self._sync_tools()
+        logger.info(f"Started MCP server {self.key} with {len(self._tools)} tools")
+
+    def _sync_tools(self) -> None:
+        """Expose the current adapters, keeping tool objects of unchanged names."""
+        self._tools = {
+            name: self._tools[name]
+            if name in self._tools
+            else PooledMCPTool(self, adapter)
+            for name, adapter in self._adapters.items()
+        }
+
+    async def _list_adapters(self, session: Any) -> dict[str, AutogenBaseTool]:
+        """The session's tool adapters, from the schema cache when fresh."""
+        from autogen_ext.tools.mcp import mcp_server_tools
+
+        cache = self.schema_cache
+        tools = cache.get(self.key) if cache is not None else None
+        if tools is not None:
+            return mcp_tools_from_schemas(self.server_params, tools, session)
+        adapters = await mcp_server_tools(self.server_params, session=session)
+        if cache is not None:
+            cache.put(self.key, [_mcp_tool_schema(a) for a in adapters])
+        return {adapter.name: adapter for adapter in adapters}
+
+    async def _handle_server_message(self, message: Any) -> None:
+        from mcp.types import ServerNotification, ToolListChangedNotification
+
+        if isinstance(message, ServerNotification) and isinstance(
+            message.root, ToolListChangedNotification
+        ):
+            logger.info(f"MCP server {self.key} changed its tool list")
+            if self.schema_cache is not None:
+                self.schema_cache.invalidate(self.key)
+            # list from a separate task: the handler runs in the receive loop
+            self._refresh_task = asyncio.create_task(self.refresh_tools())
+
+    async def refresh_tools(self) -> None:
+        """Re-list the tools of the running server."""
+        session = self._session
+        if session is None:
+            return
+        try:
+            self._adapters = await self._list_adapters(session)
+        except Exception as e:
+            logger.warning(f"Refreshing tools of MCP server {self.key} failed: {e}")
+            return
+        self._sync_tools()
+
+    async def _serve(self, ready: asyncio.Future) -> None:
+        """Hold the session open until stopped, restarting it when unhealthy."""
+        while True:
+            try:
+                await self._run_session(ready)
+                return
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+                    return
+                if self._stopping.is_set():
+                    return
+                # report the error a transport task group wraps
+                while len(getattr(e, "exceptions", ())) == 1:
+                    e = e.exceptions[0]
+                if self.restarts >= self.max_restarts:
+                    logger.warning(
+                        f"MCP server {self.key} stopped after {self.restarts} "
+                        f"restarts: {e}"
+                    )
+                    return
+                self.restarts += 1
+                delay = self._backoff(self.restarts)
+                logger.warning(
+                    f"MCP server {self.key} is unhealthy ({e}); restarting in "
+                    f"{delay:.1f}s (restart {self.restarts}/{self.max_restarts})"
+                )
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_session(self, ready: asyncio.Future) -> None:
+        """Open a session and ping it periodically until stopped or broken."""
+        async with open_mcp_session(
+            self.server_params, message_handler=self._handle_server_message
+        ) as session:
+            await session.initialize()
+            self._adapters = await self._list_adapters(session)
+            self._broken.clear()
+            self._session = session
+            if ready.done():
+                self._sync_tools()
+                logger.info(f"Restarted MCP server {self.key}")
+            else:
+                ready.set_result(None)
+            self._connected.set()
+            try:
+                while not self._stopping.is_set():
+                    wake = asyncio.ensure_future(self._broken.wait())
+                    stop = asyncio.ensure_future(self._stopping.wait())
+                    try:
+                        await asyncio.wait(
+                            {wake, stop},
+                            timeout=self.health_check_interval,
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                    finally:
+                        wake.cancel()
+                        stop.cancel()
+                    if self._stopping.is_set():
+                        break
+                    if self._broken.is_set():
+                        raise ConnectionError("a tool call found the connection broken")
+                    await asyncio.wait_for(
+                        session.send_ping(), min(10.0, self.health_check_interval)
+                    )
+            finally:
+                self._connected.clear()
+                self._session = None
+
+    async def _stop_task(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        if self._stopping is not None:
+            self._stopping.set()
+        try:
+            await asyncio.wait_for(task, 5.0)
+        except asyncio.TimeoutError:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        except (asyncio.CancelledError, Exception) as e:
+            logger.debug(f"Error stopping MCP server {self.key}: {e}")
+
+    async def call_tool(
+        self, name: str, args: BaseModel, cancellation_token: CancellationToken
+    ) -> Any:
+        """Call a tool on the server, restarting it once if the connection broke."""
+        import anyio
+
+        connection_errors = (
+            anyio.ClosedResourceError,
+            anyio.BrokenResourceError,
+            anyio.EndOfStream,
+            ConnectionError,
+        )
+        async with self._semaphore:
+            await self.ensure_started()
+            if name not in self._adapters:
+                raise ValueError(f"MCP server {self.key} no longer has tool '{name}'")
+            session = self._session
+            try:
+                return await self._call(name, args, cancellation_token)
+            except connection_errors as e:
+                logger.warning(f"MCP server {self.key} connection lost: {e}")
+                if self._session is session:
+                    # have the health check task restart it
+                    self._connected.clear()
+                    self._session = None
+                    self._broken.set()
+            await self.ensure_started()
+            return await self._call(name, args, cancellation_token)
+
+    async def _call(
+        self, name: str, args: BaseModel, cancellation_token: CancellationToken
+    ) -> Any:
+        """Run one tools/call request; a cancelled call is cancelled on the
+        server too (notifications/cancelled), so it stops working on it."""
+        adapter = self._adapters[name]
+        session = self._session
+        if session is None:
+            return await adapter.run(args, cancellation_token)
+        if cancellation_token.is_cancelled():
+            raise asyncio.CancelledError("Operation cancelled")
+
+        sent: list = []
+
+        async def request():
+            # the session's write stream records the id of the request it sends
+            _sent_request_ids.set(sent)
+            return await session.call_tool(
+                name=name, arguments=args.model_dump(exclude_unset=True)
+            )
+
+        call = asyncio.ensure_future(request())
+        cancellation_token.link_future(call)
+        try:
+            result = await call
+        except asyncio.CancelledError:
+            call.cancel()
+            if sent:
+                task = asyncio.create_task(self._notify_cancelled(session, sent[0]))
+                self._notifications.add(task)
+                task.add_done_callback(self._notifications.discard)
+            raise
+        content = list(result.content)
+        if result.isError:
+            raise Exception(adapter.return_value_as_string(content))
+        return content
+
+    async def _notify_cancelled(self, session, request_id: int) -> None:
+        from mcp.types import (
+            CancelledNotification,
+            CancelledNotificationParams,
+            ClientNotification,
+        )
+
+        try:
+            await session.send_notification(
+                ClientNotification(
+                    CancelledNotification(
+                        method="notifications/cancelled",
+                        params=CancelledNotificationParams(
+                            requestId=request_id, reason="cancelled by the client"
+                        ),
+                    )
+                )
+            )
+            logger.debug(f"Cancelled request {request_id} on MCP server {self.key}")
+        except Exception as e:
+            logger.debug(f"Could not cancel MCP request {request_id}: {e}")
+
+    async def close(self) -> None:
+        await self._stop_task()
+        logger.debug(f"Closed MCP server {self.key}")
+
+
+class MCPSessionPool:
+    """Manager-wide pool of live MCP server sessions, one per MCP spec.
+
+    Servers are started on first use and shared by all conversations, so a new
+    conversation does not pay for process spawn, handshake and tool listing.
+    Per-spec config can override the pool defaults with `max_concurrency`,
+    `health_check_interval`, `max_restarts` and `restart_backoff`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        health_check_interval: float = 30.0,
+        start_timeout: float = 30.0,
+        max_restarts: int = 3,
+        schema_cache: MCPToolSchemaCache | None = None,
+        restart_backoff: float = 1.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.health_check_interval = health_check_interval
+        self.start_timeout = start_timeout
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.schema_cache = schema_cache
+        self._connections: dict[str, MCPServerConnection] = {}
+
+    @staticmethod
+    def key_for(spec: MCPToolSpec) -> str:
+        """Pool key: the spec string plus the config that affects the server."""
+        return mcp_spec_key(spec)
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def get_connection(
+        self, spec: MCPToolSpec, server_params: Any
+    ) -> MCPServerConnection:
+        """Return the (possibly not yet started) connection for a spec."""
+        key = self.key_for(spec)
+        connection = self._connections.get(key)
+        if connection is None:
+            connection = MCPServerConnection(
+                key,
+                server_params,
+                max_concurrency=int(
+                    spec.get_config_value("max_concurrency", self.max_concurrency)
+                ),
+                health_check_interval=float(
+                    spec.get_config_value(
+                        "health_check_interval", self.health_check_interval
+                    )
+                ),
+                start_timeout=float(
+                    spec.get_config_value("timeout", self.start_timeout)
+                ),
+                max_restarts=int(
+                    spec.get_config_value("max_restarts", self.max_restarts)
+                ),
+                schema_cache=self.schema_cache,
+                restart_backoff=float(
+                    spec.get_config_value("restart_backoff", self.restart_backoff)
+                ),
+            )
+            self._connections[key] = connection
+        return connection
+
+    async def load_tools(
+        self, spec: MCPToolSpec, server_params: Any
+    ) -> dict[str, PooledMCPTool]:
+        """Start the spec's server if needed and return its pooled tools."""
+        connection = self.get_connection(spec, server_params)
+        await connection.ensure_started()
+        return connection.tools
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            key: {
+                "running": conn.is_running,
+                "restarts": conn.restarts,
+                "tools": len(conn.tools),
+            }
+            for key, conn in self._connections.items()
+        }
+
+    async def close(self) -> None:
+        """Shut down all pooled servers."""
+        connections = list(self._connections.values())
+        self._connections.clear()
+        await asyncio.gather(
+            *(conn.close() for conn in connections), return_exceptions=True
+        )
 
 
 class MCPToolManager:
-    """Manages MCP tool connections and lifecycle."""
+    """Manages MCP tool connections and lifecycle.
 
-    def __init__(self):
+    With a `session_pool`, conversations share live server sessions from the
+    pool; without one, tools open a new server session per call.
+
+    Servers are loaded concurrently, each bounded by its `load_timeout`. A
+    server that misses its timeout keeps loading in the background under
+    `pending_loads`, so a session can attach its tools on a later turn.
+    """
+
+    def __init__(
+        self,
+        session_pool: MCPSessionPool | None = None,
+        load_timeout: float = 30.0,
+        validation_cache: MCPValidationCache | None = None,
+        schema_cache: MCPToolSchemaCache | None = None,
+    ):
         self.active_connections = {}
         self.validated_tools = {}
+        self.validations: dict[str, MCPValidation] = {}
+        self.session_pool = session_pool
+        self.validation_cache = validation_cache
+        if schema_cache is None:
+            # share the pool's cache so both paths see list_changed invalidations
+            if session_pool is not None and session_pool.schema_cache is not None:
+                schema_cache = session_pool.schema_cache
+            else:
+                schema_cache = MCPToolSchemaCache()
+        self.schema_cache = schema_cache
+        self.load_timeout = load_timeout
+        self.pending_loads: dict[str, asyncio.Task] = {}
+        self.load_timings: dict[str, float] = {}
 
     async def validate_tools(self, mcp_specs: list[MCPToolSpec]) -> dict[str, bool]:
         """Validate multiple MCP tools concurrently.
@@ -304,13 +1178,18 @@ class MCPToolManager:
 
     async def _validate_and_store(self, spec: MCPToolSpec) -> bool:
         """Validate a single MCP tool and store the result."""
-        is_valid = await validate_mcp_tool(spec)
-        self.validated_tools[spec.spec_string] = is_valid
-        return is_valid
+        validation = await probe_mcp_tool(
+            spec, self.session_pool, self.validation_cache
+        )
+        self.validations[spec.spec_string] = validation
+        self.validated_tools[spec.spec_string] = validation.valid
+        if validation.valid and mcp_spec_key(spec) not in self.schema_cache:
+            self.schema_cache.put(mcp_spec_key(spec), validation.tools)
+        return validation.valid
 
     async def load_mcp_tools_for_conversation(
         self, mcp_specs: list[MCPToolSpec]
-    ) -> dict[str, any]:
+    ) -> dict[str, Any]:
         """Load MCP tools for a conversation session.
 
         This is where we'll actually connect to MCP servers and get their tools.
@@ -322,24 +1201,72 @@ class MCPToolManager:
         Returns:
             Dictionary of tool name -> tool function mappings
         """
-        tools = {}
-
+        valid_specs = []
         for spec in mcp_specs:
             # Skip if not validated
             if not self.validated_tools.get(spec.spec_string, False):
                 logger.warning(f"Skipping unvalidated MCP tool: {spec.spec_string}")
                 continue
+            valid_specs.append(spec)
 
-            try:
-                spec_tools = await self._load_mcp_server_tools(spec)
-                tools.update(spec_tools)
-                logger.info(f"Loaded {len(spec_tools)} tools from {spec.spec_string}")
-            except Exception as e:
-                logger.error(f"Failed to load tools from {spec.spec_string}: {e}")
-
+        # Load all servers concurrently: start time is the slowest, not the sum
+        results = await asyncio.gather(
+            *(self._load_with_timeout(spec) for spec in valid_specs)
+        )
+        tools = {}
+        for spec_tools in results:
+            tools.update(spec_tools)
         return tools
 
-    async def _load_mcp_server_tools(self, spec: MCPToolSpec) -> dict[str, any]:
+    async def _load_with_timeout(self, spec: MCPToolSpec) -> dict[str, Any]:
+        """Load one server's tools, leaving it loading in the background on timeout."""
+        key = spec.spec_string
+        task = self.pending_loads.get(key)
+        if task is None:
+            task = asyncio.create_task(self._timed_load(spec))
+            self.pending_loads[key] = task
+            task.add_done_callback(lambda t: self._load_done(key, t))
+
+        timeout = float(spec.get_config_value("load_timeout", self.load_timeout))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"MCP server {key} not loaded after {timeout}s; "
+                "its tools will be attached when ready"
+            )
+        except Exception as e:
+            logger.error(f"Failed to load tools from {key}: {e}")
+        return {}
+
+    async def _timed_load(self, spec: MCPToolSpec) -> dict[str, Any]:
+        start = time.perf_counter()
+        spec_tools = await self._load_mcp_server_tools(spec)
+        elapsed = time.perf_counter() - start
+        self.load_timings[spec.spec_string] = elapsed
+        logger.info(
+            f"Loaded {len(spec_tools)} tools from {spec.spec_string} in {elapsed:.2f}s"
+        )
+        return spec_tools
+
+    def _load_done(self, key: str, task: asyncio.Task) -> None:
+        if self.pending_loads.get(key) is task:
+            del self.pending_loads[key]
+        # mark late failures as retrieved; they were logged or will be on attach
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"MCP load of {key} failed: {task.exception()}")
+
+    def get_pending_loads(
+        self, mcp_specs: list[MCPToolSpec]
+    ) -> dict[str, asyncio.Task]:
+        """Return the still-running loads of the given specs, keyed by spec."""
+        return {
+            spec.spec_string: self.pending_loads[spec.spec_string]
+            for spec in mcp_specs
+            if spec.spec_string in self.pending_loads
+        }
+
+    async def _load_mcp_server_tools(self, spec: MCPToolSpec) -> dict[str, Any]:
         """Load tools from a specific MCP server.
 
         Args:
@@ -374,8 +1301,23 @@ class MCPToolManager:
             logger.error(f"Unknown MCP type: {spec.type}")
             return {}
 
+        if self.session_pool is not None:
+            # Live sessions are shared and owned by the pool
+            return await self.session_pool.load_tools(spec, server_params)
+
+        # Reuse cached tools (seeded by validation) instead of listing again
+        cached = self.schema_cache.get_adapters(mcp_spec_key(spec), server_params)
+        if cached is not None:
+            self.active_connections[spec.spec_string] = server_params
+            return dict(cached)
+
         # Load tools from the MCP server
         mcp_tools = await mcp_server_tools(server_params)
+        self.schema_cache.put(
+            mcp_spec_key(spec),
+            [_mcp_tool_schema(tool) for tool in mcp_tools],
+            {tool.name: tool for tool in mcp_tools},
+        )
 
         # Convert to dictionary with proper naming
         tools_dict = {}
@@ -406,7 +1348,11 @@ class MCPToolManager:
         self.active_connections.clear()
 
 
-async def validate_and_load_mcp_tools(agents_config: dict) -> tuple[dict, dict]:
+async def validate_and_load_mcp_tools(
+    agents_config: dict,
+    session_pool: MCPSessionPool | None = None,
+    validation_cache: MCPValidationCache | None = None,
+) -> tuple[dict, dict]:
     """Validate and prepare MCP tools from agent configurations.
 
     This function should be called during agent manager initialization to
@@ -414,13 +1360,17 @@ async def validate_and_load_mcp_tools(agents_config: dict) -> tuple[dict, dict]:
 
     Args:
         agents_config: Dictionary of agent configurations
+        session_pool: Optional pool of live MCP sessions for the manager to use
+        validation_cache: Optional on-disk cache of earlier validations
 
     Returns:
         Tuple of (mcp_manager, validation_results) where:
         - mcp_manager: MCPToolManager instance with validated tools
         - validation_results: Dict mapping spec strings to validation results
     """
-    mcp_manager = MCPToolManager()
+    mcp_manager = MCPToolManager(
+        session_pool=session_pool, validation_cache=validation_cache
+    )
     all_mcp_specs = []
 
     # Collect all MCP tools from all agents
@@ -451,7 +1401,7 @@ async def validate_and_load_mcp_tools(agents_config: dict) -> tuple[dict, dict]:
     return mcp_manager, validation_results
 
 
-async def load_agent_mcp_tools(agent_config: dict, mcp_manager) -> dict[str, any]:
+async def load_agent_mcp_tools(agent_config: dict, mcp_manager) -> dict[str, Any]:
     """Load MCP tools for a specific agent.
 
     This is called when starting a conversation to load MCP tools.
@@ -475,7 +1425,27 @@ async def load_agent_mcp_tools(agent_config: dict, mcp_manager) -> dict[str, any
     return mcp_tools
 
 
-async def run_mcp_validation(agents_config: dict) -> tuple["MCPToolManager", dict]:
+def pending_agent_mcp_loads(agent_config: dict, mcp_manager) -> dict[str, asyncio.Task]:
+    """Return the MCP loads of an agent that missed their load timeout.
+
+    Args:
+        agent_config: Configuration for the specific agent
+        mcp_manager: MCPToolManager instance used to load the agent's tools
+
+    Returns:
+        Dictionary of MCP spec string -> task resolving to the server's tools
+    """
+    if mcp_manager is None:
+        return {}
+    mcp_specs = parse_mcp_tools(agent_config.get("tools", []), agent_config)
+    return mcp_manager.get_pending_loads(mcp_specs)
+
+
+async def run_mcp_validation(
+    agents_config: dict,
+    session_pool: MCPSessionPool | None = None,
+    validation_cache: MCPValidationCache | None = None,
+) -> tuple["MCPToolManager", dict]:
     """Run MCP validation flow and return (manager, results).
 
     Centralized entry point used by higher-level managers to validate all
@@ -483,14 +1453,22 @@ async def run_mcp_validation(agents_config: dict) -> tuple["MCPToolManager", dic
 
     Args:
         agents_config: mapping of agent name -> agent configuration
+        session_pool: Optional pool of live MCP sessions for the manager to use
+        validation_cache: Optional on-disk cache of earlier validations
 
     Returns:
         (MCPToolManager, validation_results)
     """
-    return await validate_and_load_mcp_tools(agents_config)
+    return await validate_and_load_mcp_tools(
+        agents_config, session_pool, validation_cache
+    )
 
 
-def create_mcp_validation_task(agents_config: dict) -> asyncio.Task | None:
+def create_mcp_validation_task(
+    agents_config: dict,
+    session_pool: MCPSessionPool | None = None,
+    validation_cache: MCPValidationCache | None = None,
+) -> asyncio.Task | None:
     """Create a background task to validate MCP tools.
 
     This utility schedules MCP validation without blocking initialization. If no
@@ -503,7 +1481,9 @@ def create_mcp_validation_task(agents_config: dict) -> asyncio.Task | None:
         # Only schedule if there's an active running loop in this thread.
         # Avoid deprecated get_event_loop() behavior when no loop is set.
         loop = asyncio.get_running_loop()
-        return loop.create_task(run_mcp_validation(agents_config))
+        return loop.create_task(
+            run_mcp_validation(agents_config, session_pool, validation_cache)
+        )
     except RuntimeError:
         # No running loop available; let caller defer validation explicitly.
         return None
@@ -512,7 +1492,101 @@ def create_mcp_validation_task(agents_config: dict) -> asyncio.Task | None:
         return None
 
 
-def load_tools(tools_directory: str | None = None) -> dict[str, FunctionTool]:
+def _default_tools_directory() -> str:
+    current_directory = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(current_directory, "tools")
+
+
+def _import_tool_module(file_path: str, mod_name: str):
+    """Import a tool module from its file; returns None (logged) on failure."""
+    try:
+        spec = importlib.util.spec_from_file_location(mod_name, file_path)
+        if spec is None or spec.loader is None:
+            logger.warning(f"Failed to create spec for tool module {mod_name}")
+            return None
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except Exception as e:
+        logger.warning(f"Failed to load tool module {mod_name}: {e}")
+        return None
+    return module
+
+
+def _function_tool_from_class(
+    item: type, item_name: str, mod_name: str, file_path: str | None = None
+) -> tuple[str, FunctionTool] | None:
+    """Instantiate a BaseTool subclass and wrap it; None if not callable.
+
+    Returns:
+        (tool name, FunctionTool)
+    """
+    try:
+        tool_instance: BaseTool = item()  # type: ignore[call-arg]
+    except Exception as e:
+        logger.warning(f"Failed to instantiate tool {item_name}: {e}")
+        return None
+
+    if not tool_instance.is_callable:
+        logger.warning(
+            f"Tool {getattr(tool_instance, 'name', item_name)} "
+            f"not loaded: not callable or failed setup "
+            f"({getattr(tool_instance, 'load_error', 'unknown')})"
+        )
+        return None
+
+    run_fn = getattr(tool_instance, "run", None)
+    if not callable(run_fn):
+        logger.warning(
+            f"Tool {getattr(tool_instance, 'name', item_name)} "
+            f"marked callable but has no callable 'run'"
+        )
+        return None
+    name = getattr(tool_instance, "name", mod_name)
+    desc = getattr(tool_instance, "description", "")
+    try:
+        run_fn = tool_instance.as_coroutine_function(file_path)
+    except ValueError as e:
+        logger.warning(f"Tool {name} not loaded: {e}")
+        return None
+    try:
+        # Prefer explicit kwargs for broader compatibility
+        # across versions
+        return name, FunctionTool(func=run_fn, description=desc, name=name)
+    except TypeError:
+        # Fallback for older/newer signatures
+        return name, FunctionTool(run_fn, description=desc, name=name)
+
+
+def _load_module_tools(file_path: str, mod_name: str) -> dict[str, FunctionTool]:
+    """Import a tool module and wrap every callable BaseTool subclass in it."""
+    tools: dict[str, FunctionTool] = {}
+    module = _import_tool_module(file_path, mod_name)
+    if module is None:
+        return tools
+
+    for item_name in dir(module):
+        try:
+            item = getattr(module, item_name)
+        except Exception:
+            continue
+
+        if (
+            isinstance(item, type)
+            and issubclass(item, BaseTool)
+            and item is not BaseTool
+        ):
+            loaded = _function_tool_from_class(item, item_name, mod_name, file_path)
+            if loaded is not None:
+                name, tool = loaded
+                tools[name] = tool
+    return tools
+
+
+def load_tools(
+    tools_directory: str | None = None,
+    lazy: bool = False,
+    manifest_cache: str | None = None,
+) -> dict[str, FunctionTool]:
     """Discover and load tools from a directory.
 
     - Scans the tools directory for .py modules.
@@ -521,18 +1595,22 @@ def load_tools(tools_directory: str | None = None) -> dict[str, FunctionTool]:
     - Instantiates each tool; if tool_instance.is_callable is True and a callable
       'run' method exists, wraps it in a FunctionTool and returns it in a dict.
 
+    With `lazy=True` nothing is imported: tools are discovered through a
+    ToolManifest and returned as LazyTool stand-ins, which import the module
+    and run `verify_setup` only when `load()`ed.
+
     Args:
         tools_directory: Optional explicit path to scan. Defaults to the package's
             'tools' subdirectory.
+        lazy: Return LazyTool stand-ins instead of importing every module.
+        manifest_cache: Path of the manifest cache file used when lazy
+            (defaults to the user cache directory).
 
     Returns:
-        dict mapping tool name -> FunctionTool
+        dict mapping tool name -> FunctionTool (or LazyTool when lazy)
     """
-    from .tool_utils import BaseTool  # local import to avoid cycles
-
     if tools_directory is None:
-        current_directory = os.path.dirname(os.path.abspath(__file__))
-        tools_directory = os.path.join(current_directory, "tools")
+        tools_directory = _default_tools_directory()
 
     tools: dict[str, FunctionTool] = {}
 
@@ -540,73 +1618,374 @@ def load_tools(tools_directory: str | None = None) -> dict[str, FunctionTool]:
         logger.warning(f"Tools directory not found: {tools_directory}")
         return tools
 
+    if lazy:
+        manifest = ToolManifest(tools_directory, manifest_cache)
+        lazy_tools = {name: LazyTool(entry, manifest) for name, entry in manifest}
+        # modules that could not be inspected statically are imported now
+        for file_path in manifest.uninspectable:
+            mod_name = os.path.basename(file_path)[:-3]
+            lazy_tools.update(_load_module_tools(file_path, mod_name))
+        return lazy_tools
+
     for filename in os.listdir(tools_directory):
         if not filename.endswith(".py"):
             continue
-
         file_path = os.path.join(tools_directory, filename)
-        mod_name = filename[:-3]
+        tools.update(_load_module_tools(file_path, filename[:-3]))
 
-        try:
-            spec = importlib.util.spec_from_file_location(mod_name, file_path)
-            if spec is None or spec.loader is None:
-                logger.warning(f"Failed to create spec for tool module {mod_name}")
+    return tools
+
+
+@dataclass
+class ToolManifestEntry:
+    """What is known about a tool without importing it."""
+
+    name: str
+    file_path: str
+    class_name: str
+    description: str
+    # input schema, cached from the last time the tool was imported
+    schema: dict | None = None
+
+
+def _inspect_tool_module(file_path: str) -> list[ToolManifestEntry] | None:
+    """Find the BaseTool subclasses of a module by parsing it.
+
+    Returns None when the module cannot be described statically (syntax
+    errors, or a tool whose name or description is not a literal).
+    """
+    import ast
+
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=file_path)
+    except (OSError, SyntaxError, ValueError) as e:
+        logger.debug(f"Cannot inspect tool module {file_path}: {e}")
+        return None
+
+    entries = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        bases = {
+            base.id if isinstance(base, ast.Name) else getattr(base, "attr", None)
+            for base in node.bases
+        }
+        if "BaseTool" not in bases:
+            continue
+        attrs = {}
+        for stmt in node.body:
+            if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+                target, value = stmt.targets[0], stmt.value
+            elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+                target, value = stmt.target, stmt.value
+            else:
                 continue
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-        except Exception as e:
-            logger.warning(f"Failed to load tool module {mod_name}: {e}")
+            if isinstance(target, ast.Name) and target.id in (
+                "name",
+                "description",
+                "is_callable",
+            ):
+                try:
+                    attrs[target.id] = ast.literal_eval(value)
+                except ValueError:
+                    return None
+        if attrs.get("is_callable", True) is False:
             continue
+        if not isinstance(attrs.get("name"), str):
+            return None
+        entries.append(
+            ToolManifestEntry(
+                name=attrs["name"],
+                file_path=file_path,
+                class_name=node.name,
+                description=attrs.get("description", ""),
+            )
+        )
+    return entries
 
-        for item_name in dir(module):
-            try:
-                item = getattr(module, item_name)
-            except Exception:
+
+class ToolManifest:
+    """Discovery manifest of the tools in a directory: name -> entry.
+
+    Modules are inspected statically (they are parsed, not imported), and the
+    results are cached on disk per file, invalidated by the file's mtime and
+    size. Modules that cannot be inspected are listed in `uninspectable`.
+    """
+
+    def __init__(self, tools_directory: str, cache_path: str | None = None):
+        self.tools_directory = os.path.abspath(tools_directory)
+        self.cache_path = (
+            os.path.expanduser(cache_path)
+            if cache_path
+            else default_cache_path("tool_manifest.json")
+        )
+        self.entries: dict[str, ToolManifestEntry] = {}
+        self.uninspectable: list[str] = []
+        self._modules: dict[str, Any] = {}
+        self._cache = self._read_cache()
+        self._build()
+
+    def __iter__(self):
+        return iter(self.entries.items())
+
+    def _read_cache(self) -> dict:
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable tool manifest cache: {e}")
+            return {}
+
+    def _write_cache(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.debug(f"Could not write tool manifest cache: {e}")
+
+    def _build(self) -> None:
+        changed = False
+        for filename in sorted(os.listdir(self.tools_directory)):
+            if not filename.endswith(".py"):
                 continue
+            file_path = os.path.join(self.tools_directory, filename)
+            stat = os.stat(file_path)
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            cached = self._cache.get(file_path)
+            if cached is not None and cached["stamp"] == stamp:
+                raw = cached["tools"]
+            else:
+                inspected = _inspect_tool_module(file_path)
+                raw = None if inspected is None else [e.__dict__ for e in inspected]
+                self._cache[file_path] = {"stamp": stamp, "tools": raw}
+                changed = True
+            if raw is None:
+                self.uninspectable.append(file_path)
+                continue
+            for entry in raw:
+                self.entries[entry["name"]] = ToolManifestEntry(**entry)
+        if changed:
+            self._write_cache()
+
+    def import_module(self, file_path: str):
+        """Import a tool module once, for all the tools it defines."""
+        if file_path not in self._modules:
+            mod_name = os.path.basename(file_path)[:-3]
+            self._modules[file_path] = _import_tool_module(file_path, mod_name)
+        return self._modules[file_path]
+
+    def record_schema(self, entry: ToolManifestEntry, schema: dict) -> None:
+        """Remember a tool's schema, learned when it was imported."""
+        if entry.schema == schema:
+            return
+        entry.schema = schema
+        cached = self._cache.get(entry.file_path)
+        if cached and cached["tools"] is not None:
+            for raw in cached["tools"]:
+                if raw["name"] == entry.name:
+                    raw["schema"] = schema
+            self._write_cache()
+
+
+class LazyTool:
+    """Registry stand-in for a discovered tool that is not imported yet.
+
+    `load()` imports the tool's module, instantiates the tool (running its
+    `verify_setup`) and returns the FunctionTool, or None when the tool turns
+    out not to be callable.
+    """
 
-            if (
-                isinstance(item, type)
-                and issubclass(item, BaseTool)
-                and item is not BaseTool
-            ):
-                try:
-                    tool_instance: BaseTool = item()  # type: ignore[call-arg]
-                except Exception as e:
-                    logger.warning(f"Failed to instantiate tool {item_name}: {e}")
-                    continue
-
-                if tool_instance.is_callable:
-                    run_fn = getattr(tool_instance, "run", None)
-                    if not callable(run_fn):
-                        logger.warning(
-                            f"Tool {getattr(tool_instance, 'name', item_name)} "
-                            f"marked callable but has no callable 'run'"
-                        )
-                        continue
-                    name = getattr(tool_instance, "name", mod_name)
-                    desc = getattr(tool_instance, "description", "")
-                    try:
-                        # Prefer explicit kwargs for broader compatibility
-                        # across versions
-                        tools[name] = FunctionTool(
-                            func=run_fn, description=desc, name=name
-                        )
-                    except TypeError:
-                        # Fallback for older/newer signatures
-                        tools[name] = FunctionTool(run_fn, description=desc, name=name)
-                else:
-                    logger.warning(
-                        f"Tool {getattr(tool_instance, 'name', item_name)} "
-                        f"not loaded: not callable or failed setup "
-                        f"({getattr(tool_instance, 'load_error', 'unknown')})"
-                    )
+    def __init__(self, entry: ToolManifestEntry, manifest: ToolManifest | None = None):
+        self.entry = entry
+        self.manifest = manifest
+        self._tool: FunctionTool | None = None
 
-    return tools
+    @property
+    def name(self) -> str:
+        return self.entry.name
+
+    @property
+    def description(self) -> str:
+        return self.entry.description
+
+    @property
+    def schema(self) -> dict | None:
+        return self._tool.schema if self._tool is not None else self.entry.schema
+
+    def __repr__(self):
+        return f"LazyTool(name={self.name!r}, module={self.entry.file_path!r})"
+
+    def load(self) -> FunctionTool | None:
+        if self._tool is not None:
+            return self._tool
+        entry = self.entry
+        mod_name = os.path.basename(entry.file_path)[:-3]
+        if self.manifest is not None:
+            module = self.manifest.import_module(entry.file_path)
+        else:
+            module = _import_tool_module(entry.file_path, mod_name)
+        item = getattr(module, entry.class_name, None) if module else None
+        if not (isinstance(item, type) and issubclass(item, BaseTool)):
+            logger.warning(f"Tool {entry.name} not found in {entry.file_path}")
+            return None
+        loaded = _function_tool_from_class(
+            item, entry.class_name, mod_name, entry.file_path
+        )
+        tool = loaded[1] if loaded is not None else None
+        if tool is not None:
+            self._tool = tool
+            if self.manifest is not None:
+                self.manifest.record_schema(entry, dict(tool.schema))
+            logger.debug(f"Loaded tool {entry.name} on first use")
+        return tool
+
+
+# Bounded executors for synchronous tool runs, created on first use
+_TOOL_EXECUTOR_LIMITS = {"thread": 8, "process": 2}
+_tool_executors: dict[str, Executor] = {}
+# Tool instances created inside process-pool workers, keyed by (file, class)
+_process_tools: dict[tuple[str, str], "BaseTool"] = {}
+# Cancelled calls still running in an executor, per executor
+_abandoned: dict[Executor, set] = {}
+# Executors retired by _abandon; work still queued in them moves to a new one
+_retired_executors: "weakref.WeakSet[Executor]" = weakref.WeakSet()
+# Set when the call running a synchronous tool is cancelled (see BaseTool); a
+# manager Event for process-pool calls, which workers read across processes
+_cancel_flag: contextvars.ContextVar[Any] = contextvars.ContextVar(
+    "mchat_tool_cancel", default=None
+)
+# Serves the cancel flags of process-pool calls, started on first use
+_cancel_manager: Any = None
+
+
+def configure_tool_executors(
+    threads: int | None = None, processes: int | None = None
+) -> None:
+    """Set the worker limits of the tool executors.
+
+    Executors that already exist are shut down (without waiting) and are
+    recreated with the new limits on their next use.
+    """
+    for kind, limit in (("thread", threads), ("process", processes)):
+        if limit is None:
+            continue
+        if limit < 1:
+            raise ValueError(f"{kind} executor needs at least one worker")
+        _TOOL_EXECUTOR_LIMITS[kind] = limit
+        executor = _tool_executors.pop(kind, None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def tool_executor(kind: str) -> Executor:
+    """Return the shared bounded executor ("thread" or "process") for tools."""
+    if kind not in _TOOL_EXECUTOR_LIMITS:
+        raise ValueError(
+            f"Unknown tool executor '{kind}' "
+            f"(expected one of {sorted(_TOOL_EXECUTOR_LIMITS)})"
+        )
+    executor = _tool_executors.get(kind)
+    if executor is None:
+        limit = _TOOL_EXECUTOR_LIMITS[kind]
+        if kind == "process":
+            executor = ProcessPoolExecutor(max_workers=limit)
+        else:
+            executor = ThreadPoolExecutor(
+                max_workers=limit, thread_name_prefix="mchat-tool"
+            )
+        _tool_executors[kind] = executor
+    return executor
+
+
+def _process_cancel_flag():
+    """A cancel flag process-pool workers can read (a manager Event)."""
+    global _cancel_manager
+    if _cancel_manager is None:
+        _cancel_manager = multiprocessing.Manager()
+    return _cancel_manager.Event()
+
+
+def _abandon(kind: str, executor: Executor, future) -> None:
+    """Track a cancelled call that is still running in `executor`.
+
+    Running work cannot be interrupted, so once abandoned calls occupy every
+    worker the executor is retired: it finishes them in the background while
+    new calls go to a fresh executor instead of queueing behind them. Calls
+    still queued in it are dropped there and resubmitted to the new one.
+    """
+    abandoned = _abandoned.setdefault(executor, set())
+    abandoned.add(future)
+    future.add_done_callback(abandoned.discard)
+    if len(abandoned) < _TOOL_EXECUTOR_LIMITS[kind]:
+        return
+    if _tool_executors.get(kind) is executor:
+        logger.warning(
+            f"{len(abandoned)} cancelled tool calls still occupy the {kind} "
+            f"executor; starting a new one"
+        )
+        del _tool_executors[kind]
+        _retired_executors.add(executor)
+        executor.shutdown(wait=False, cancel_futures=True)
+    _abandoned.pop(executor, None)
+
+
+def shutdown_tool_executors(wait: bool = False) -> None:
+    """Shut down the tool executors; they are recreated on next use."""
+    while _tool_executors:
+        _, executor = _tool_executors.popitem()
+        executor.shutdown(wait=wait, cancel_futures=True)
+    _abandoned.clear()
+    global _cancel_manager
+    if _cancel_manager is not None:
+        _cancel_manager.shutdown()
+        _cancel_manager = None
+
+
+def _run_in_tool_process(
+    file_path: str, class_name: str, kwargs: dict, cancel: Any = None
+) -> Any:
+    """Process-pool entry point: import the tool (once per worker) and run it.
+
+    Tool modules are loaded from their files rather than pickled, so tools in
+    any directory can run in the pool whatever the process start method.
+    `cancel` is the call's cancel flag, read by `BaseTool.cancel_requested`.
+    """
+    key = (file_path, class_name)
+    tool = _process_tools.get(key)
+    if tool is None:
+        module = _import_tool_module(file_path, os.path.basename(file_path)[:-3])
+        if module is None:
+            raise RuntimeError(f"Failed to import tool module {file_path}")
+        tool = getattr(module, class_name)()
+        if not tool.is_callable:
+            raise RuntimeError(f"Tool {tool.name} failed setup: {tool.load_error}")
+        _process_tools[key] = tool
+    token = _cancel_flag.set(cancel)
+    try:
+        return tool.run(**kwargs)
+    finally:
+        _cancel_flag.reset(token)
 
 
 class BaseTool:
     name = "Base Tool"
     description = "Description of the base tool"
+    # Results of identical calls may be reused for cache_ttl seconds (None: the
+    # agent's tool_cache ttl); only set for tools whose results are idempotent
+    cacheable = False
+    cache_ttl: float | None = None
+    # Where a synchronous run() executes: the shared "thread" pool (I/O-bound
+    # tools) or "process" pool (CPU-bound tools). Tools that define
+    # `async def arun` instead run on the event loop and ignore this.
+    executor = "thread"
+    # Seconds before a call is abandoned with a TimeoutError (None: no limit)
+    timeout: float | None = None
 
     def __init__(self):
         self.load_error = None
@@ -627,3 +2006,104 @@ class BaseTool:
 
     def run(self, *args, **kwargs):
         raise NotImplementedError("Subclasses should implement this method")
+
+    @staticmethod
+    def cancel_requested() -> bool:
+        """True once the call running this (synchronous) `run` was cancelled.
+
+        Long-running tools should check it between steps and return early;
+        `arun` coroutines are cancelled directly instead.
+        """
+        cancel = _cancel_flag.get()
+        return cancel is not None and cancel.is_set()
+
+    @staticmethod
+    def wait_cancelled(seconds: float) -> bool:
+        """Sleep up to `seconds`, waking early (and returning True) on cancel."""
+        cancel = _cancel_flag.get()
+        if cancel is None:
+            time.sleep(seconds)
+            return False
+        return cancel.wait(seconds)
+
+    def as_coroutine_function(self, file_path: str | None = None):
+        """Return the coroutine function the tool is registered with.
+
+        `arun` is awaited directly when the tool defines it; otherwise `run` is
+        dispatched to the tool's executor so it never blocks the event loop.
+        Either way the call is bounded by `timeout`. Cancelling the call
+        cancels `arun`, drops a `run` still queued, and sets the flag read by
+        `cancel_requested` for a `run` already running. The result keeps the
+        signature of the wrapped method, which FunctionTool uses for the schema.
+
+        Args:
+            file_path: The tool's module file, required for the process
+                executor (workers import the tool from it).
+        """
+        timeout = self.timeout
+        name = getattr(self, "name", type(self).__name__)
+        arun = getattr(self, "arun", None)
+        if arun is not None:
+            if not asyncio.iscoroutinefunction(arun):
+                raise ValueError("'arun' must be an async method")
+            target = arun
+
+            def start(kwargs):
+                return arun(**kwargs)
+
+        else:
+            kind = self.executor
+            if kind not in _TOOL_EXECUTOR_LIMITS:
+                raise ValueError(f"unknown executor '{kind}'")
+            if kind == "process" and file_path is None:
+                raise ValueError("the process executor needs the tool module file")
+            target = self.run
+            class_name = type(self).__name__
+
+            async def start(kwargs):
+                if kind == "process":
+                    loop = asyncio.get_running_loop()
+                    cancel = await loop.run_in_executor(
+                        tool_executor("thread"), _process_cancel_flag
+                    )
+                    fn = functools.partial(
+                        _run_in_tool_process, file_path, class_name, kwargs, cancel
+                    )
+                else:
+                    # run() sees the cancel flag through its context
+                    cancel = threading.Event()
+                    context = contextvars.copy_context()
+                    context.run(_cancel_flag.set, cancel)
+                    fn = functools.partial(context.run, target, **kwargs)
+                while True:
+                    executor = tool_executor(kind)
+                    future = executor.submit(fn)
+                    try:
+                        return await asyncio.wrap_future(future)
+                    except asyncio.CancelledError:
+                        if (
+                            future.cancelled()
+                            and executor in _retired_executors
+                            and not asyncio.current_task().cancelling()
+                        ):
+                            # dropped from a retired executor's queue
+                            continue
+                        # queued work never starts; running work is asked to stop
+                        cancel.set()
+                        if not future.cancel():
+                            _abandon(kind, executor, future)
+                        raise
+
+        async def call(**kwargs):
+            try:
+                with track(f"tool:{name}"):
+                    return await asyncio.wait_for(start(kwargs), timeout)
+            except TimeoutError:
+                if timeout is None:
+                    raise
+                raise TimeoutError(
+                    f"Tool {name} timed out after {timeout} seconds"
+                ) from None
+
+        functools.update_wrapper(call, target)
+        return call
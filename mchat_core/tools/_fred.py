@@ -1,45 +1,152 @@
+import asyncio
+import json
 from typing import Annotated
 
+import pandas as pd
 from fredapi import Fred
 
 from mchat_core.config import get_settings
 from mchat_core.logging_utils import get_logger, trace  # noqa: F401
-from mchat_core.tool_utils import BaseTool
+from mchat_core.tool_utils import BaseTool, tool_executor
+from mchat_core.tools.fred_cache import FredCache, resample
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+_cache: FredCache | None = None
+
+
+def shared_cache(api_key: str) -> FredCache:
+    """The FredCache shared by the FRED tools."""
+    global _cache
+    if _cache is None:
+        _cache = FredCache(
+            Fred(api_key=api_key),
+            path=settings.get("fred_cache_path", None),
+            check_interval=settings.get("fred_check_interval", 21600),
+            revision_days=settings.get("fred_revision_days", None),
+        )
+    return _cache
+
+
+def _series(
+    cache: FredCache,
+    series: str,
+    start_date: str,
+    end_date: str,
+    frequency: str,
+    aggregation: str,
+    last_n: int,
+) -> pd.Series:
+    data = cache.get_series(series, start_date or None, end_date or None)
+    return resample(data, frequency or None, aggregation, last_n or None)
+
 
 class FetchFREDDataTool(BaseTool):
     name = "fetch_fred_data"
+    cacheable = True
+    cache_ttl = 3600
+    timeout = 60
     description = (
         "Fetches data from the Federal Reserve Economic Data (FRED) "
         "using a series ID and date range. FRED has a lot of data "
-        "available, search for a series ID at https://fred.stlouisfed.org/"
+        "available, search for a series ID at https://fred.stlouisfed.org/. "
+        "Use frequency/aggregation or last_n to keep long series short."
     )
 
     def verify_setup(self):
         api_key = settings.get("fred_api_key", None)
         if not api_key:
             raise ValueError("FRED API key not found.")
-        self.fred = Fred(api_key=api_key)
+        self.cache = shared_cache(api_key)
 
     def run(
         self,
         series: Annotated[str, "FRED series ID"],
-        start_date: Annotated[str, "Start date in 'YYYY-MM-DD' format"],
-        end_date: Annotated[str, "End date in 'YYYY-MM-DD' format"],
-    ) -> dict:
+        start_date: Annotated[str, "Start date in 'YYYY-MM-DD' format"] = "",
+        end_date: Annotated[str, "End date in 'YYYY-MM-DD' format"] = "",
+        frequency: Annotated[
+            str, "Resample to 'monthly', 'quarterly' or 'yearly' (empty: as is)"
+        ] = "",
+        aggregation: Annotated[
+            str, "How to resample: 'mean', 'sum', 'min', 'max', 'first' or 'last'"
+        ] = "mean",
+        last_n: Annotated[int, "Return only the last N observations (0: all)"] = 0,
+    ) -> str:
         """
         Fetch data from the Federal Reserve Economic Data (FRED) API.
 
+        Observations are served from a local cache of the series; only date
+        ranges not fetched before are requested from FRED.
+
         Args:
             series (str): FRED series ID.
+            start_date (str): Start date in "YYYY-MM-DD" format (default: the
+                first observation).
+            end_date (str): End date in "YYYY-MM-DD" format (default: today).
+            frequency (str): "monthly", "quarterly" or "yearly" to resample.
+            aggregation (str): How observations in a period are combined.
+            last_n (int): Return only the last N observations.
+
+        Returns:
+            str: The observations as a JSON table.
+        """
+        if not self.is_callable:
+            raise RuntimeError(
+                f"Tool '{self.name}' is not callable due to setup failure: "
+                f"{self.load_error}"
+            )
+
+        data = _series(
+            self.cache, series, start_date, end_date, frequency, aggregation, last_n
+        )
+        return data.to_json(orient="table")
+
+
+class FetchFREDManyTool(BaseTool):
+    name = "fetch_fred_many"
+    cacheable = True
+    cache_ttl = 3600
+    timeout = 120
+    description = (
+        "Fetches several Federal Reserve Economic Data (FRED) series at once "
+        "and returns them as one table with a column per series. Use "
+        "frequency/aggregation to align series of different frequencies."
+    )
+
+    def verify_setup(self):
+        api_key = settings.get("fred_api_key", None)
+        if not api_key:
+            raise ValueError("FRED API key not found.")
+        self.cache = shared_cache(api_key)
+
+    async def arun(
+        self,
+        series: Annotated[list[str], "FRED series IDs"],
+        start_date: Annotated[str, "Start date in 'YYYY-MM-DD' format"] = "",
+        end_date: Annotated[str, "End date in 'YYYY-MM-DD' format"] = "",
+        frequency: Annotated[
+            str, "Resample to 'monthly', 'quarterly' or 'yearly' (empty: as is)"
+        ] = "",
+        aggregation: Annotated[
+            str, "How to resample: 'mean', 'sum', 'min', 'max', 'first' or 'last'"
+        ] = "mean",
+        last_n: Annotated[int, "Return only the last N observations (0: all)"] = 0,
+    ) -> str:
+        """
+        Fetch several FRED series concurrently.
+
+        Args:
+            series (list[str]): FRED series IDs.
             start_date (str): Start date in "YYYY-MM-DD" format.
             end_date (str): End date in "YYYY-MM-DD" format.
+            frequency (str): "monthly", "quarterly" or "yearly" to resample.
+            aggregation (str): How observations in a period are combined.
+            last_n (int): Return only the last N observations of each series.
 
         Returns:
-            dict: FRED data as a JSON-serializable dictionary.
+            str: JSON with `data`, a table with a column per series, and
+            `errors`, the error of each series that could not be fetched.
         """
         if not self.is_callable:
             raise RuntimeError(
@@ -47,7 +154,34 @@ class FetchFREDDataTool(BaseTool):
                 f"{self.load_error}"
             )
 
-        data = self.fred.get_series(
-            series, observation_start=start_date, observation_end=end_date
+        series = list(dict.fromkeys(s.strip().upper() for s in series))
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    tool_executor("thread"),
+                    _series,
+                    self.cache,
+                    series_id,
+                    start_date,
+                    end_date,
+                    frequency,
+                    aggregation,
+                    last_n,
+                )
+                for series_id in series
+            ),
+            return_exceptions=True,
+        )
+        columns = {}
+        errors = {}
+        for series_id, result in zip(series, results, strict=True):
+            if isinstance(result, BaseException):
+                errors[series_id] = str(result)
+            else:
+                columns[series_id] = result
+        table = pd.DataFrame(columns)
+        table.index.name = "date"
+        return json.dumps(
+            {"data": json.loads(table.to_json(orient="table")), "errors": errors}
         )
-        return data.to_json(orient="table")
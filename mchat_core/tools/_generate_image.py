@@ -1,9 +1,9 @@
-import asyncio
 from typing import Annotated, Literal
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from mchat_core.config import get_settings
+from mchat_core.images import ImageGenerator, ImageStore
 from mchat_core.logging_utils import get_logger, trace  # noqa: F401
 from mchat_core.tool_utils import BaseTool
 
@@ -13,11 +13,12 @@ settings = get_settings()
 
 class OpenAIImageTool(BaseTool):
     name = "generate_image"
+    timeout = 180
     description = (
-        "Generates an image using OpenAI's DALL-E API. it will return "
-        "a url and a revised_prompt if the tool decided to enhance the "
-        "prompt. Do not alter the url in any way, and provide information "
-        "back to the user if the prompt was changed"
+        "Generates images using OpenAI's DALL-E API. For each image it returns "
+        "the local path, a url and a revised_prompt if the tool decided to "
+        "enhance the prompt. Do not alter the url in any way, and provide "
+        "information back to the user if the prompt was changed"
     )
 
     def verify_setup(self):
@@ -26,7 +27,7 @@ class OpenAIImageTool(BaseTool):
             raise ValueError(f"{self.name} OpenAI API key not found.")
         self.wrapper = OpenAIImageAPIWrapper(api_key=api_key)
 
-    def run(
+    async def arun(
         self,
         prompt: Annotated[str, "Prompt for image generation."],
         model: Annotated[Literal["dall-e-2", "dall-e-3"], "Model to use."] = "dall-e-2",
@@ -39,9 +40,12 @@ class OpenAIImageTool(BaseTool):
             ),
         ] = "1024x1024",
         quality: Annotated[Literal["standard", "hd"], "Quality of images"] = "standard",
-    ) -> dict:
+    ) -> list[dict] | str:
         """
-        Generate an image using OpenAI's DALL-E API.
+        Generate images using OpenAI's DALL-E API.
+
+        Images are generated concurrently and downloaded into a local store;
+        a prompt generated before is served from the store.
 
         Args:
             prompt (str): Prompt for image generation.
@@ -51,7 +55,7 @@ class OpenAIImageTool(BaseTool):
             quality (str): Quality of images.
 
         Returns:
-            dict: Image data containing the revised prompt and URL.
+            list[dict]: The path, URL and revised prompt of each image.
         """
         if not self.is_callable:
             raise RuntimeError(
@@ -59,20 +63,25 @@ class OpenAIImageTool(BaseTool):
                 f"{self.load_error}"
             )
 
-        image_data = self.wrapper.generate_image(
+        return await self.wrapper.generate_image(
             prompt=prompt,
             model=model,
             num_images=num_images,
             size=size,
             quality=quality,
         )
-        return image_data
 
 
 class OpenAIImageAPIWrapper:
     """Wrapper for OpenAI's DALL-E Image Generator."""
 
-    def __init__(self, api_key: str, log_file: str | None = None):
+    def __init__(
+        self,
+        api_key: str,
+        log_file: str | None = None,
+        store: ImageStore | None = None,
+        max_concurrency: int | None = None,
+    ):
         self.api_key = api_key
 
         self.log_file = (
@@ -80,67 +89,55 @@ class OpenAIImageAPIWrapper:
             if log_file is None
             else log_file
         )
+        if store is None:
+            store = ImageStore(settings.get("generate_image_store_path", None))
+        if max_concurrency is None:
+            max_concurrency = settings.get("generate_image_max_concurrency", 4)
+
+        self.client = AsyncOpenAI(api_key=self.api_key)
+        self.generator = ImageGenerator(
+            self.client,
+            store=store,
+            max_concurrency=max_concurrency,
+            log_file=self.log_file,
+        )
 
-        # Set the API key for OpenAI
-        self.client = OpenAI(api_key=self.api_key)
-
-    # below is the async version of the function, not yet integrated
-    async def arun(self, query: str) -> str:
-        """Run query through OpenAI and parse result asynchronously."""
-        # loop = asyncio.get_running_loop()
-        try:
-            response = await asyncio.to_thread(
-                lambda: self.client.images.generate(
-                    prompt=query,
-                    n=self.num_images,
-                    size=self.size,
-                    model=self.model,
-                    quality=self.quality,
-                    response_format="url",
-                )
-            )
-            image_urls = self.separator.join([item.url for item in response.data])
-            return image_urls if image_urls else "No image was generated"
-        except Exception as e:
-            return f"Image Generatiom Error: {str(e)}"
-
-    def generate_image(
+    async def arun(
         self,
-        prompt: Annotated[str, "Prompt for image generation."],
-        model: Annotated[Literal["dall-e-2", "dall-e-3"], "Model to use."] = "dall-e-2",
-        num_images: Annotated[int, "Number of images to generate."] = 1,
-        size: Annotated[
-            Literal["1024x1024", "1024x1792", "1792x1024", "256x256", "512x512"],
-            (
-                "Size of images. dall-e-2 supports 1024x1024, 256x256, 512x512, "
-                "dall-e-3 supports 1024x1024, 1024x1792, 1792x1024"
-            ),
-        ] = "1024x1024",
-        quality: Annotated[Literal["standard", "hd"], "Quality of images"] = "standard",
-    ):
-        """Generate an image using OpenAI's DALL-E API."""
-        response_format = "url"
-
-        kwargs = {
-            "prompt": prompt,
-            "model": model,
-            "n": num_images,
-            "size": size,
-            "quality": quality,
-            "response_format": response_format,
-        }
-
+        query: str,
+        model: str = "dall-e-2",
+        num_images: int = 1,
+        size: str = "1024x1024",
+        quality: str = "standard",
+        separator: str = "\n",
+    ) -> str:
+        """Run query through OpenAI and return the image URLs asynchronously."""
+        images = await self.generate_image(query, model, num_images, size, quality)
+        if isinstance(images, str):
+            return images
+        return separator.join(image["url"] for image in images)
+
+    async def generate_image(
+        self,
+        prompt: str,
+        model: str = "dall-e-2",
+        num_images: int = 1,
+        size: str = "1024x1024",
+        quality: str = "standard",
+    ) -> list[dict] | str:
+        """Generate images using OpenAI's DALL-E API."""
         try:
-            response = self.client.images.generate(**kwargs)
-
-            if self.log_file:
-                with open(self.log_file, "a") as f:
-                    f.write(f"Request: {repr(kwargs)}\n")
-                    f.write(f"Response: {repr(response)}\n\n")
-            image_data = [
-                {"revised_prompt": image.revised_prompt, "url": image.url}
-                for image in response.data
-            ]
-            return image_data if image_data else "No image was generated"
+            images = await self.generator.generate(
+                prompt, model=model, num_images=num_images, size=size, quality=quality
+            )
         except Exception as e:
-            return f"Image Generatiom Error: {str(e)}"
+            return f"Image Generation Error: {str(e)}"
+        image_data = [
+            {
+                "revised_prompt": image["revised_prompt"],
+                "url": image["url"],
+                "path": image["path"],
+            }
+            for image in images
+        ]
+        return image_data if image_data else "No image was generated"
@@ -1,58 +1,257 @@
-from typing import Annotated
-
-import chromadb
+import asyncio
+import functools
+import importlib.util
+import threading
+from typing import Annotated, Any
 
+from mchat_core.config import get_settings
 from mchat_core.logging_utils import get_logger, trace  # noqa: F401
-from mchat_core.tool_utils import BaseTool
+from mchat_core.tool_execution import count_text_tokens
+from mchat_core.tool_utils import BaseTool, tool_executor
+from mchat_core.tools.rag_index import (
+    LexicalIndex,
+    dedupe,
+    lexical_index_path,
+    pack_to_budget,
+    reciprocal_rank_fusion,
+)
 
 logger = get_logger(__name__)
+settings = get_settings()
 
-client = chromadb.PersistentClient(
-    path="./chroma_persist",
-)
+# Chroma clients by path and collection handles by (path, name, embedding
+# function); opened on first use, in a tool executor thread
+_clients: dict[str, Any] = {}
+_collections: dict[tuple[str, str, str | None], Any] = {}
+_batchers: dict[tuple[str, str, str | None], "QueryBatcher"] = {}
+_lexical_indexes: dict[str, LexicalIndex] = {}
+# Candidates taken from each ranking before fusing, deduplicating and packing
+_MIN_CANDIDATES = 20
+_lock = threading.Lock()
+
+
+def chroma_client(path: str):
+    """The persistent Chroma client of `path`, shared by all RAG tools."""
+    with _lock:
+        client = _clients.get(path)
+        if client is None:
+            import chromadb
+
+            logger.debug(f"Opening Chroma store at {path}")
+            client = _clients[path] = chromadb.PersistentClient(path=path)
+        return client
+
+
+def embedding_function(name: str | None, options: dict | None = None):
+    """A chromadb embedding function by class name (None: the collection's own)."""
+    if not name:
+        return None
+    from chromadb.utils import embedding_functions
+
+    return getattr(embedding_functions, name)(**(options or {}))
+
+
+def get_collection(
+    path: str,
+    name: str,
+    embedding: str | None = None,
+    embedding_options: dict | None = None,
+):
+    """A cached handle on collection `name` of the store at `path`."""
+    key = (path, name, embedding)
+    collection = _collections.get(key)
+    if collection is None:
+        kwargs = {}
+        ef = embedding_function(embedding, embedding_options)
+        if ef is not None:
+            kwargs["embedding_function"] = ef
+        collection = chroma_client(path).get_collection(name=name, **kwargs)
+        with _lock:
+            collection = _collections.setdefault(key, collection)
+    return collection
+
+
+class QueryBatcher:
+    """Coalesce concurrent queries of a collection into one `collection.query`.
+
+    Queries arriving while a batch is being queried (or in the same loop
+    iteration) are sent together as the next batch, with `n_results` set to
+    the largest asked for; each caller gets its own results back, trimmed.
+    The query itself runs in the shared tool thread pool.
+
+    Args:
+        open_collection: Returns the collection; called in the thread pool.
+        max_batch: Most query texts sent in one call.
+        embed: Async function embedding a batch of query texts, for
+            collections whose documents were embedded outside Chroma (None:
+            Chroma embeds the texts with the collection's function).
+    """
+
+    def __init__(self, open_collection, max_batch: int = 32, embed=None):
+        self.open_collection = open_collection
+        self.max_batch = max_batch
+        self.embed = embed
+        self.calls = 0
+        self._pending: list[tuple[str, int, asyncio.Future]] = []
+        self._runner: asyncio.Task | None = None
+
+    async def query(self, text: str, n_results: int) -> dict[str, list]:
+        """Ids, documents and metadatas of the `n_results` chunks nearest `text`."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, n_results, future))
+        if (
+            self._runner is None
+            or self._runner.done()
+            or self._runner.get_loop() is not loop
+        ):
+            self._runner = loop.create_task(self._drain())
+        return await future
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+            self.calls += 1
+            texts = [text for text, _, _ in batch]
+            try:
+                embeddings = await self.embed(texts) if self.embed else None
+                results = await loop.run_in_executor(
+                    tool_executor("thread"),
+                    functools.partial(
+                        self._query, texts, max(n for _, n, _ in batch), embeddings
+                    ),
+                )
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for i, (_, n, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(
+                        {
+                            "ids": results["ids"][i][:n],
+                            "documents": results["documents"][i][:n],
+                            "metadatas": results["metadatas"][i][:n],
+                        }
+                    )
+
+    def _query(
+        self, texts: list[str], n_results: int, embeddings: list | None = None
+    ) -> dict:
+        if embeddings is not None:
+            query = {"query_embeddings": embeddings}
+        else:
+            query = {"query_texts": texts}
+        return self.open_collection().query(
+            **query, n_results=n_results, include=["documents", "metadatas"]
+        )
 
 
 class Rag(BaseTool):
     name = "ragtest"
     description = "Get information about Pokémon card game rules"
+    timeout = 60
 
-    def run(
+    def verify_setup(self):
+        if importlib.util.find_spec("chromadb") is None:
+            raise ValueError("chromadb is not installed")
+        path = settings.get("rag_path", "./chroma_persist")
+        collection = settings.get("rag_collection", "docs")
+        embedding = settings.get("rag_embedding_function", None)
+        options = settings.get("rag_embedding_options", None)
+        # ModelManager embedding model the documents were ingested with
+        embedding_model = settings.get("rag_embedding_model", None)
+        key = (path, collection, embedding_model or embedding)
+        with _lock:
+            if key not in _batchers:
+                embed = None
+                if embedding_model:
+                    from mchat_core.tools.rag_ingest import model_embedder
+
+                    embed = model_embedder(embedding_model)
+                _batchers[key] = QueryBatcher(
+                    functools.partial(
+                        get_collection, path, collection, embedding, options
+                    ),
+                    embed=embed,
+                )
+            self.batcher = _batchers[key]
+            # BM25 index kept by RagIngestor; without one, search is vector-only
+            index_path = settings.get(
+                "rag_lexical_index", lexical_index_path(path, collection)
+            )
+            if index_path not in _lexical_indexes:
+                _lexical_indexes[index_path] = LexicalIndex(index_path)
+            self.lexical = _lexical_indexes[index_path]
+
+    async def arun(
         self,
         query: Annotated[str, "Search query"],
         num_results: Annotated[
             int, "Number of results to fetch", "Default(value=5)"
         ] = 5,
+        max_tokens: Annotated[
+            int | None,
+            "Token budget for the results; when set, as many of the best "
+            "results as fit are returned instead of num_results",
+        ] = None,
     ) -> Annotated[list[dict], "A list of results from the search query"]:
         """
         Search the pokemon card game rules using the provided query.
 
+        Vector and keyword (BM25) matches are fused by reciprocal rank, near
+        duplicates are dropped, and the best excerpts are returned.
+
         Returns:
             list[dict] : A list of excerpts from various Pokémon card game rules
         """
         logger.debug("Running RAG tool with query: %s", query)
-        collection = client.get_collection(name="docs")
-
-        results = collection.query(
-            query_texts=query,
-            n_results=num_results,
-            include=["documents", "metadatas"],
+        candidates = max(num_results * 4, _MIN_CANDIDATES)
+        loop = asyncio.get_running_loop()
+        vector, lexical = await asyncio.gather(
+            self.batcher.query(query, candidates),
+            loop.run_in_executor(
+                tool_executor("thread"), self._lexical_search, query, candidates
+            ),
         )
 
         logger.debug(
             "Query results: %s",
-            results,
+            vector,
         )
 
-        # Extract the documents from the results
-        documents = results["documents"][0]
+        chunks = {
+            id: (doc, metadata)
+            for id, doc, metadata in zip(
+                vector["ids"], vector["documents"], vector["metadatas"], strict=True
+            )
+        }
+        for id, doc in lexical:
+            chunks.setdefault(id, (doc["text"], doc["metadata"]))
+        ranked = reciprocal_rank_fusion([vector["ids"], [id for id, _ in lexical]])
 
         # Format the documents into a list of dictionaries
-        formatted_results = [
-            {
-                "content": doc,
-                "source": f"Document {results['metadatas'][0][i]['filename']}",
-            }
-            for i, doc in enumerate(documents)
-        ]
-
-        return formatted_results
+        formatted_results = dedupe(
+            [
+                {
+                    "content": chunks[id][0],
+                    "source": f"Document {chunks[id][1].get('filename')}",
+                }
+                for id in ranked
+            ]
+        )
+        if max_tokens is not None:
+            return pack_to_budget(formatted_results, max_tokens, count_text_tokens)
+        return formatted_results[:num_results]
+
+    def _lexical_search(self, query: str, n: int) -> list[tuple[str, dict]]:
+        """(id, document) of the best BM25 matches; picks up a re-ingested index."""
+        self.lexical.reload()
+        docs = self.lexical.docs
+        return [(id, docs[id]) for id, _ in self.lexical.search(query, n) if id in docs]
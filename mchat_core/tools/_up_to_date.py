@@ -25,6 +25,7 @@ class Today(BaseTool):
 class Location(BaseTool):
     name = "get_location"
     description = "Get IP-based geolocation data."
+    timeout = 15
 
     def run(self) -> Annotated[dict[str, Any], "IP-based geolocation data"]:
         """
@@ -34,7 +35,7 @@ class Location(BaseTool):
             dict: JSON response containing location information.
         """
         # Use ipinfo.io to get the IP-based location
-        response = requests.get("https://ipinfo.io")
+        response = requests.get("https://ipinfo.io", timeout=10)
         data = response.json()
 
         return data
@@ -1,47 +1,93 @@
-import time
-from io import BytesIO
+import asyncio
 from typing import Annotated
 
-import requests
-from bs4 import BeautifulSoup
-from pypdf import PdfReader
+import aiohttp
 
 from mchat_core.config import get_settings
 from mchat_core.logging_utils import get_logger, trace  # noqa: F401
-from mchat_core.tool_utils import BaseTool
+from mchat_core.tool_utils import BaseTool, tool_executor
+from mchat_core.web_fetch import PageFetcher, WebCache
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+# Characters of page text fetch_page returns, and prefetches, by default
+DEFAULT_PAGE_CHARS = 2000
+
+_fetcher: PageFetcher | None = None
+
+
+def shared_fetcher() -> PageFetcher:
+    """The PageFetcher shared by the search tools, so prefetches are reused."""
+    global _fetcher
+    if _fetcher is None:
+        # Page text and API responses are cached on disk unless disabled
+        cache = None
+        if settings.get("google_search_cache", True):
+            cache = WebCache(
+                path=settings.get("google_search_cache_path", None),
+                ttl=settings.get("google_search_cache_ttl", 3600),
+                api_ttl=settings.get("google_search_api_cache_ttl", 300),
+                max_bytes=int(settings.get("google_search_cache_mb", 100) * 1_000_000),
+            )
+        _fetcher = PageFetcher(
+            max_concurrency=settings.get("google_search_max_concurrency", 8),
+            per_host=settings.get("google_search_per_host", 2),
+            cache=cache,
+        )
+    return _fetcher
+
 
 class GoogleSearchTool(BaseTool):
     name = "google_search"
-    description = "Performs a Google Custom Search and fetches enriched results."
+    cacheable = True
+    cache_ttl = 900
+    timeout = 30
+    description = (
+        "Performs a Google Custom Search and returns the title, link and snippet "
+        "of each result. Use fetch_page to read the pages of the results you need."
+    )
+    # Google Custom Search API endpoint
+    api_url = "https://www.googleapis.com/customsearch/v1"
 
     def verify_setup(self):
         self.api_key = settings.get("google_api_key", None)
         self.search_engine_id = settings.get("google_search_engine_id", None)
         if not self.api_key or not self.search_engine_id:
             raise ValueError("google_search API key or Search Engine ID not found")
-
-    def run(
+        # Number of top results whose pages are fetched in the background, ready
+        # for fetch_page
+        self.prefetch = settings.get("google_search_prefetch", 3)
+        # Seconds a search waits for the pages it includes the text of
+        self.fetch_deadline = settings.get("google_search_fetch_deadline", 15)
+        self.fetcher = shared_fetcher()
+
+    async def arun(
         self,
         query: Annotated[str, "Search query"],
-        num_results: Annotated[int, "Number of results to fetch"] = 5,
-        max_chars: Annotated[int, "Maximum characters to extract from content"] = 1000,
+        num_results: Annotated[int, "Number of results to return"] = 5,
         log_file: Annotated[str | None, "File to log search results"] = None,
-    ) -> Annotated[list[dict], "A list of enriched search results"]:
+        include_text: Annotated[
+            int, "Number of top results to include the page text of (0: none)"
+        ] = 0,
+    ) -> Annotated[list[dict], "A list of search results"]:
         """
-        Perform a Google Custom Search and fetch enriched results.
+        Perform a Google Custom Search.
+
+        Results are returned as soon as the search API answers; the pages of
+        the top results are prefetched in the background for fetch_page.
+        With `include_text`, the text of the top pages is fetched concurrently
+        and returned with them.
 
         Args:
             query (str): Search query.
-            num_results (int): Number of results to fetch (default: 5).
-            max_chars (int): Maximum characters to extract from the content of each URL.
+            num_results (int): Number of results to return (default: 5).
             log_file (str): File to log the results (default: "google_search.log").
+            include_text (int): Number of top results that get a `text` key
+                with their page text (default: 0).
 
         Returns:
-            list[dict]: A list of enriched search results.
+            list[dict]: The title, link and snippet (and text) of each result.
         """
         log_file = (
             settings.get("google_search_log_file", None)
@@ -49,8 +95,6 @@ class GoogleSearchTool(BaseTool):
             else log_file
         )
 
-        # Google Custom Search API endpoint
-        url = "https://www.googleapis.com/customsearch/v1"
         params = {
             "key": self.api_key,
             "cx": self.search_engine_id,
@@ -61,94 +105,82 @@ class GoogleSearchTool(BaseTool):
         try:
             # Perform the API request
             logger.debug(f"Performing Google Custom Search for query: {query}")
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            results = response.json().get("items", [])
-
-            # Helper function to extract content from a URL
-            def get_page_content(page_url: str) -> str:
-                try:
-                    # Check if the URL points to a PDF
-                    head_response = requests.head(
-                        page_url, timeout=10, allow_redirects=True
-                    )
-                    content_type = head_response.headers.get("Content-Type", "")
-
-                    if "application/pdf" in content_type:
-                        # Fetch the PDF content
-                        pdf_response = requests.get(page_url, timeout=10)
-                        pdf_response.raise_for_status()
-                        pdf_content = BytesIO(pdf_response.content)
-
-                        # Extract text from the PDF
-                        reader = PdfReader(pdf_content)
-                        pdf_text = ""
-                        for i, page in enumerate(reader.pages):
-                            if i >= 2:  # Limit to the first 2 pages for performance
-                                break
-                            pdf_text += page.extract_text()
-
-                        pdf_text = pdf_text[:max_chars].strip()
-
-                        # Log PDF content
-                        if log_file:
-                            with open(log_file, "a") as f:
-                                f.write(f"PDF URL: {page_url}\n")
-                                f.write(f"PDF Content: {pdf_text}\n\n")
-
-                        return pdf_text
-
-                    # If not a PDF, fetch the webpage content
-                    page_response = requests.get(page_url, timeout=10)
-                    page_response.raise_for_status()
-                    soup = BeautifulSoup(page_response.content, "html.parser")
-
-                    # Remove unwanted elements
-                    for script_or_style in soup(["script", "style"]):
-                        script_or_style.decompose()
-
-                    # Extract text with a character limit
-                    text = soup.get_text(separator=" ", strip=True)
-                    out = text[:max_chars].strip()
-
-                    # Log webpage content
-                    if log_file:
-                        with open(log_file, "a") as f:
-                            f.write(f"URL: {page_url}\n")
-                            f.write(f"Content: {out}\n\n")
-
-                    return out
-
-                except requests.RequestException as req_error:
-                    logger.warning(
-                        f"Error fetching page content from {page_url}: {req_error}"
-                    )
-                    return "Error fetching content."
-                except Exception as ex:
-                    logger.warning(
-                        f"Unexpected error fetching content from {page_url}: {ex}"
-                    )
-                    return "Error fetching content."
-
-            # Enrich results with page content
-            enriched_results = []
-            for item in results:
-                body = get_page_content(item["link"])
-                enriched_results.append(
-                    {
-                        "title": item.get("title"),
-                        "link": item.get("link"),
-                        "snippet": item.get("snippet"),
-                        "body": body,
-                    }
-                )
-                time.sleep(1)  # Be respectful to the servers (rate limiting)
-
-            return enriched_results
-
-        except requests.RequestException as e:
+            items = (await self.fetcher.get_json(self.api_url, params)).get("items", [])
+        except (aiohttp.ClientError, TimeoutError) as e:
             logger.error(f"API request error: {e}")
             raise RuntimeError(f"Error in Google Custom Search API request: {e}") from e
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-            raise RuntimeError(f"An unexpected error occurred: {e}") from e
+
+        results = [
+            {
+                "title": item.get("title"),
+                "link": item.get("link"),
+                "snippet": item.get("snippet"),
+            }
+            for item in items
+        ]
+        if self.prefetch:
+            self.fetcher.prefetch(
+                [r["link"] for r in results[: self.prefetch] if r["link"]],
+                DEFAULT_PAGE_CHARS,
+            )
+        if include_text > 0:
+            top = [r for r in results[:include_text] if r["link"]]
+            texts = await self.fetcher.fetch_many(
+                [r["link"] for r in top], DEFAULT_PAGE_CHARS, self.fetch_deadline
+            )
+            for result in top:
+                result["text"] = texts[result["link"]]
+
+        if log_file:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                tool_executor("thread"), self._log_results, log_file, results
+            )
+        return results
+
+    @staticmethod
+    def _log_results(log_file: str, results: list[dict]) -> None:
+        with open(log_file, "a") as f:
+            for result in results:
+                f.write(f"URL: {result['link']}\n")
+                f.write(f"Snippet: {result['snippet']}\n\n")
+
+
+class FetchPageTool(BaseTool):
+    name = "fetch_page"
+    cacheable = True
+    cache_ttl = 900
+    timeout = 30
+    description = (
+        "Fetches a web page or PDF (such as a google_search result) and returns "
+        "its main text."
+    )
+
+    def verify_setup(self):
+        self.fetcher = shared_fetcher()
+
+    async def arun(
+        self,
+        url: Annotated[str, "URL of the page"],
+        max_chars: Annotated[
+            int, "Maximum characters of text to return"
+        ] = DEFAULT_PAGE_CHARS,
+    ) -> Annotated[str, "The main text of the page"]:
+        """
+        Fetch a page and extract its main text.
+
+        Pages prefetched by google_search, or cached on disk, are returned
+        without fetching them again.
+
+        Args:
+            url (str): URL of the page.
+            max_chars (int): Maximum characters of text to return.
+
+        Returns:
+            str: The main text of the page, truncated to max_chars.
+        """
+        try:
+            return await self.fetcher.fetch_text(url, max_chars)
+        except (aiohttp.ClientError, TimeoutError, ValueError) as e:
+            logger.warning(f"Error fetching page content from {url}: {e}")
+            raise RuntimeError(f"Error fetching {url}: {e}") from e
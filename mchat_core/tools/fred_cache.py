@@ -0,0 +1,312 @@
+"""
+Local cache of FRED series for the fetch_fred_data tools.
+
+    cache = FredCache(Fred(api_key=...))
+    data = cache.get_series("CPIAUCSL", "2015-01-01", "2020-12-31")
+    yearly = resample(data, "yearly", "mean")
+
+- each series is kept in its own file (`~/.cache/mchat_core/fred/<id>.json`)
+  as a column of dates and a column of values, with the date ranges fetched
+  so far; a request fetches only the parts of its range not yet covered
+- a series is only checked for new data once its next release is due (its
+  last update plus one period of its frequency, at most 30 days); after that
+  it is checked at most every `check_interval` seconds until FRED reports a
+  new update, which drops the cached observations of a recent revision
+  window (a few periods back from the last date covered), since a release
+  may revise them
+- resample reduces a series to monthly, quarterly or yearly observations
+  and/or to its last N, before it is sent to the model
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from mchat_core.logging_utils import get_logger
+from mchat_core.tool_utils import default_cache_path
+
+logger = get_logger(__name__)
+
+# Days between releases, by FRED frequency code
+_RELEASE_DAYS = {"D": 1, "W": 7, "BW": 14, "M": 30, "Q": 30, "SA": 30, "A": 30}
+_DEFAULT_RELEASE_DAYS = 1
+# Days back from the last date covered that a release may revise, by FRED
+# frequency code
+_REVISION_DAYS = {"D": 30, "W": 90, "BW": 90, "M": 400, "Q": 800, "SA": 800, "A": 1100}
+_DEFAULT_REVISION_DAYS = 400
+
+FREQUENCIES = {"monthly": "MS", "quarterly": "QS", "yearly": "YS"}
+AGGREGATIONS = ("mean", "sum", "min", "max", "first", "last")
+
+
+def _parse_date(value: str | date | None) -> date | None:
+    if value is None or value == "":
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _parse_updated(value: str) -> float:
+    """Epoch time of a FRED `last_updated` ("2024-06-12 07:38:02-05")."""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def missing_ranges(
+    coverage: list[tuple[date, date]], start: date, end: date
+) -> list[tuple[date, date]]:
+    """The parts of [start, end] not covered by the sorted, merged `coverage`."""
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in coverage:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - timedelta(days=1)))
+        cursor = covered_end + timedelta(days=1)
+        if cursor > end:
+            return gaps
+    gaps.append((cursor, end))
+    return gaps
+
+
+def merge_ranges(ranges: list[tuple[date, date]]) -> list[tuple[date, date]]:
+    """Sorted ranges with overlapping and adjacent ones joined."""
+    merged: list[tuple[date, date]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def resample(
+    data: pd.Series,
+    frequency: str | None = None,
+    aggregation: str = "mean",
+    last_n: int | None = None,
+) -> pd.Series:
+    """Reduce a series to a lower frequency and/or its last `last_n` values.
+
+    Args:
+        data: Series indexed by date.
+        frequency: "monthly", "quarterly" or "yearly" (None: unchanged).
+        aggregation: How the observations of a period are combined: "mean",
+            "sum", "min", "max", "first" or "last".
+        last_n: Keep only the last N observations.
+    """
+    if frequency:
+        if frequency not in FREQUENCIES:
+            raise ValueError(
+                f"Unknown frequency {frequency!r}; use one of {', '.join(FREQUENCIES)}"
+            )
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(
+                f"Unknown aggregation {aggregation!r}; "
+                f"use one of {', '.join(AGGREGATIONS)}"
+            )
+        periods = data.dropna().resample(FREQUENCIES[frequency])
+        counts = periods.count()
+        # periods without observations are dropped, not reported as 0 or NaN
+        data = periods.agg(aggregation)[counts > 0]
+    if last_n:
+        data = data.iloc[-last_n:]
+    return data
+
+
+class _Entry:
+    """The cached observations and metadata of one series."""
+
+    def __init__(self, series_id: str):
+        self.series_id = series_id
+        self.data = pd.Series(dtype="float64", index=pd.DatetimeIndex([]))
+        self.coverage: list[tuple[date, date]] = []
+        self.frequency = ""
+        self.last_updated = ""
+        self.observation_start: date | None = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    def to_json(self) -> dict:
+        return {
+            "series": self.series_id,
+            "frequency": self.frequency,
+            "last_updated": self.last_updated,
+            "observation_start": (
+                self.observation_start.isoformat() if self.observation_start else None
+            ),
+            "checked": self.checked,
+            "coverage": [[s.isoformat(), e.isoformat()] for s, e in self.coverage],
+            "dates": [d.strftime("%Y-%m-%d") for d in self.data.index],
+            "values": [None if math.isnan(v) else v for v in self.data.tolist()],
+        }
+
+    def load(self, record: dict) -> None:
+        self.frequency = record["frequency"]
+        self.last_updated = record["last_updated"]
+        self.observation_start = _parse_date(record["observation_start"])
+        self.checked = record["checked"]
+        self.coverage = [
+            (_parse_date(s), _parse_date(e)) for s, e in record["coverage"]
+        ]
+        self.data = pd.Series(
+            [float("nan") if v is None else v for v in record["values"]],
+            index=pd.DatetimeIndex(record["dates"]),
+            dtype="float64",
+        )
+
+    def clear(self) -> None:
+        self.data = self.data.iloc[:0]
+        self.coverage = []
+
+    def drop_since(self, cut: date) -> None:
+        """Drop the observations (and coverage) from `cut` on."""
+        self.data = self.data[self.data.index < pd.Timestamp(cut)]
+        before = cut - timedelta(days=1)
+        self.coverage = [(s, min(e, before)) for s, e in self.coverage if s < cut]
+
+
+class FredCache:
+    """FRED series served from local files, fetching only what is missing.
+
+    Methods are blocking (fredapi is synchronous); the tools call them in the
+    tool thread pool. Concurrent calls for the same series wait for each
+    other, so a range is never fetched twice.
+
+    Args:
+        fred: A `fredapi.Fred` client.
+        path: Directory of the series files (default:
+            `~/.cache/mchat_core/fred`).
+        check_interval: Seconds between checks for a release once one is due.
+        revision_days: Days back from the last date covered that are
+            fetched again after a release (default: by the series frequency).
+    """
+
+    def __init__(
+        self,
+        fred,
+        path: str | None = None,
+        check_interval: float = 21600,
+        revision_days: int | None = None,
+    ):
+        self.fred = fred
+        self.path = path or default_cache_path("fred")
+        self.check_interval = check_interval
+        self.revision_days = revision_days
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        # FRED requests made, for logging and tests
+        self.requests = 0
+
+    def get_series(
+        self,
+        series_id: str,
+        start: str | date | None = None,
+        end: str | date | None = None,
+    ) -> pd.Series:
+        """Observations of `series_id` from `start` to `end` (inclusive).
+
+        Without `start` the series is read from its first observation, and
+        without `end` up to today.
+        """
+        series_id = series_id.strip().upper()
+        entry = self._entry(series_id)
+        with entry.lock:
+            self._refresh(entry)
+            today = date.today()
+            # FRED's own default start is 1776-07-04
+            start = _parse_date(start) or entry.observation_start or date(1776, 7, 4)
+            end = min(_parse_date(end) or today, today)
+            if start > end:
+                return entry.data.iloc[:0]
+            gaps = missing_ranges(entry.coverage, start, end)
+            for gap_start, gap_end in gaps:
+                self.requests += 1
+                fetched = self.fred.get_series(
+                    series_id,
+                    observation_start=gap_start.isoformat(),
+                    observation_end=gap_end.isoformat(),
+                ).astype("float64")
+                fetched.index = pd.DatetimeIndex(fetched.index)
+                combined = pd.concat([entry.data, fetched])
+                entry.data = combined[
+                    ~combined.index.duplicated(keep="last")
+                ].sort_index()
+                entry.coverage = merge_ranges([*entry.coverage, (gap_start, gap_end)])
+            if gaps:
+                logger.debug(f"FRED {series_id}: fetched {len(gaps)} missing ranges")
+                self._save(entry)
+            return entry.data.loc[pd.Timestamp(start) : pd.Timestamp(end)]
+
+    def _entry(self, series_id: str) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(series_id)
+            if entry is None:
+                entry = self._entries[series_id] = self._load(series_id)
+            return entry
+
+    def _refresh(self, entry: _Entry) -> None:
+        """Drop the recently cached observations if FRED released new data."""
+        now = time.time()
+        if entry.last_updated:
+            days = _RELEASE_DAYS.get(entry.frequency, _DEFAULT_RELEASE_DAYS)
+            due = _parse_updated(entry.last_updated) + days * 86400
+            if now < due or now - entry.checked < self.check_interval:
+                return
+        self.requests += 1
+        info = self.fred.get_series_info(entry.series_id)
+        entry.checked = now
+        if info["last_updated"] != entry.last_updated:
+            frequency = info.get("frequency_short", "")
+            if entry.coverage and frequency == entry.frequency:
+                days = self.revision_days or _REVISION_DAYS.get(
+                    frequency, _DEFAULT_REVISION_DAYS
+                )
+                cut = max(e for _, e in entry.coverage) - timedelta(days=days)
+                logger.info(
+                    f"FRED {entry.series_id}: new release, refetching from {cut}"
+                )
+                entry.drop_since(cut)
+            else:
+                entry.clear()
+            entry.last_updated = info["last_updated"]
+            entry.frequency = frequency
+            entry.observation_start = _parse_date(info.get("observation_start"))
+        self._save(entry)
+
+    def _file(self, series_id: str) -> str:
+        return os.path.join(self.path, f"{series_id}.json")
+
+    def _load(self, series_id: str) -> _Entry:
+        entry = _Entry(series_id)
+        try:
+            with open(self._file(series_id), encoding="utf-8") as f:
+                entry.load(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable FRED cache of {series_id}: {e}")
+            entry = _Entry(series_id)
+        return entry
+
+    def _save(self, entry: _Entry) -> None:
+        path = self._file(entry.series_id)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry.to_json(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write FRED cache {path}: {e}")
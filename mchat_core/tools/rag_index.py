@@ -0,0 +1,202 @@
+"""
+Lexical retrieval and result selection for the RAG tool.
+
+Vector search misses exact terms (card names, rule numbers), so the RAG tool
+also searches a local BM25 index of the same chunks and fuses both rankings:
+
+- LexicalIndex: an inverted index with BM25 scoring, persisted as JSON next
+  to the Chroma store and kept in sync by RagIngestor
+- reciprocal_rank_fusion: merges rankings by summing 1 / (k + rank)
+- dedupe: drops chunks whose word shingles mostly repeat a better one
+- pack_to_budget: keeps the best chunks that fit a token budget
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from collections.abc import Callable, Iterable
+
+from mchat_core.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# words, keeping dotted and hyphenated terms ("4.2.1", "pikachu-ex") whole
+_TOKEN = re.compile(r"\w+(?:[.\-']\w+)*")
+_TOKEN_PARTS = re.compile(r"[.\-']")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased terms of `text`; compound terms also yield their parts."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        parts = _TOKEN_PARTS.split(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def lexical_index_path(path: str, collection: str) -> str:
+    """Where the lexical index of a collection is kept, next to its store."""
+    return os.path.join(path, f"{collection}.lexical.json")
+
+
+class LexicalIndex:
+    """BM25 inverted index over chunk texts, persisted to `path`.
+
+    Args:
+        path: JSON file the index is loaded from and saved to (None: in
+            memory only).
+        k1: BM25 term frequency saturation.
+        b: BM25 document length normalisation.
+    """
+
+    def __init__(self, path: str | None = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        # id -> {"text", "metadata", "tf": {term: count}, "length"}
+        self.docs: dict[str, dict] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._total_length = 0
+        self._mtime: int | None = None
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, id: str, text: str, metadata: dict | None = None) -> None:
+        self.remove([id])
+        tf = Counter(tokenize(text))
+        self._insert(id, {"text": text, "metadata": metadata or {}, "tf": tf})
+
+    def remove(self, ids: Iterable[str]) -> None:
+        for id in ids:
+            doc = self.docs.pop(id, None)
+            if doc is None:
+                continue
+            self._total_length -= doc["length"]
+            for term in doc["tf"]:
+                postings = self._postings[term]
+                del postings[id]
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, n: int) -> list[tuple[str, float]]:
+        """The `n` best (id, score) pairs for `query`, best first."""
+        # a reload swaps these; a search in a worker thread keeps its snapshot
+        docs, index, total_length = self.docs, self._postings, self._total_length
+        if not docs:
+            return []
+        count = len(docs)
+        avg_length = total_length / count or 1.0
+        scores: dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = index.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for id, tf in postings.items():
+                norm = 1 - self.b + self.b * docs[id]["length"] / avg_length
+                scores[id] = scores.get(id, 0.0) + idf * tf * (self.k1 + 1) / (
+                    tf + self.k1 * norm
+                )
+        return heapq.nlargest(n, scores.items(), key=lambda item: item[1])
+
+    def _insert(self, id: str, doc: dict) -> None:
+        doc["length"] = sum(doc["tf"].values())
+        self.docs[id] = doc
+        self._total_length += doc["length"]
+        for term, tf in doc["tf"].items():
+            self._postings.setdefault(term, {})[id] = tf
+
+    def reload(self) -> None:
+        """Load the index from `path` if the file changed since last loaded."""
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                docs = json.load(f)["docs"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable lexical index {self.path}: {e}")
+            return
+        fresh = LexicalIndex(None, self.k1, self.b)
+        for id, doc in docs.items():
+            fresh._insert(id, doc)
+        self.docs, self._postings = fresh.docs, fresh._postings
+        self._total_length = fresh._total_length
+        self._mtime = mtime
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        docs = {
+            id: {"text": d["text"], "metadata": d["metadata"], "tf": d["tf"]}
+            for id, d in self.docs.items()
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"docs": docs}, f)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Could not write lexical index {self.path}: {e}")
+
+
+def reciprocal_rank_fusion(rankings: Iterable[list[str]], k: int = 60) -> list[str]:
+    """Ids of several best-first rankings, ordered by fused score."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, 1):
+            scores[id] = scores.get(id, 0.0) + 1 / (k + rank)
+    return sorted(scores, key=lambda id: -scores[id])
+
+
+def _shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    words = tokenize(text)
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def dedupe(results: list[dict], threshold: float = 0.8) -> list[dict]:
+    """Drop results whose `content` mostly repeats an earlier (better) one."""
+    kept: list[tuple[dict, set]] = []
+    for result in results:
+        shingles = _shingles(result["content"])
+        if any(
+            len(shingles & other) / (len(shingles | other) or 1) >= threshold
+            for _, other in kept
+        ):
+            continue
+        kept.append((result, shingles))
+    return [result for result, _ in kept]
+
+
+def pack_to_budget(
+    results: list[dict], max_tokens: int, count_tokens: Callable[[str], int]
+) -> list[dict]:
+    """The best results whose `content` fits in `max_tokens`, in rank order.
+
+    A result too large for the space left is skipped, so smaller results
+    ranked after it can still fill the budget.
+    """
+    packed = []
+    left = max_tokens
+    for result in results:
+        tokens = count_tokens(result["content"])
+        if tokens <= left:
+            packed.append(result)
+            left -= tokens
+    return packed
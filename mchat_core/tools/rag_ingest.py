@@ -0,0 +1,349 @@
+"""
+Incremental ingestion of documents into the Chroma collection of the RAG tool.
+
+    ingestor = RagIngestor(open_collection("./chroma_persist", "docs"),
+                           model_embedder("text-embedding-3-small"),
+                           manifest_path="./chroma_persist/docs.ingest.json",
+                           lexical_index=LexicalIndex(lexical_index_path(
+                               "./chroma_persist", "docs")))
+    report = await ingestor.ingest("./corpus")
+
+- text, markdown and PDF files (via pypdf) are split into overlapping chunks
+  of `chunk_size` characters, broken at paragraph, line or word boundaries
+- a chunk's id is derived from its source and a hash of its content, so
+  unchanged chunks are never embedded again, even when they move within a
+  file; chunks no longer in a file, and files no longer in the corpus, are
+  deleted from the collection
+- files whose size and modification time are unchanged since the last run
+  (recorded in the manifest) are not even read
+- new chunks are embedded in batches of `batch_size`, `max_concurrency`
+  batches at a time, and upserted as each batch comes back
+- with a LexicalIndex, the chunks are also kept in the BM25 index the RAG
+  tool searches alongside the collection
+
+Documents and queries must be embedded by the same model: set the
+`rag_embedding_model` setting of the RAG tool to the model used here.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import os
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+
+from mchat_core.logging_utils import get_logger
+from mchat_core.tool_utils import tool_executor
+from mchat_core.tools.rag_index import LexicalIndex
+
+logger = get_logger(__name__)
+
+# Embeds a batch of texts: an EmbeddingClient or any such async function
+Embed = Callable[[list[str]], Awaitable[Sequence[Sequence[float]]]]
+
+DEFAULT_SUFFIXES = (".txt", ".md", ".markdown", ".rst", ".pdf")
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
+    """Split text into chunks of at most `chunk_size` characters.
+
+    Consecutive chunks share about `overlap` characters. Chunks end at the
+    last paragraph, line or word boundary in their second half when there is
+    one.
+    """
+    if chunk_size <= 0 or not 0 <= overlap < chunk_size:
+        raise ValueError("chunk_size must be positive and overlap below it")
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            for sep in ("\n\n", "\n", " "):
+                cut = text.rfind(sep, start + chunk_size // 2, end)
+                if cut != -1:
+                    end = cut
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        next_start = max(end - overlap, start + 1)
+        if overlap:
+            # start the overlap on a word boundary
+            space = text.find(" ", next_start, end)
+            if space != -1:
+                next_start = space + 1
+        start = next_start
+    return chunks
+
+
+def read_document(path: str) -> str:
+    """Text of a text, markdown or PDF file."""
+    if path.lower().endswith(".pdf"):
+        from pypdf import PdfReader
+
+        reader = PdfReader(path)
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+@dataclass
+class Chunk:
+    id: str
+    text: str
+    source: str
+    index: int
+
+    @property
+    def metadata(self) -> dict:
+        return {
+            "source": self.source,
+            "filename": os.path.basename(self.source),
+            "chunk": self.index,
+        }
+
+
+def document_chunks(
+    source: str, text: str, chunk_size: int = 1000, overlap: int = 200
+) -> list[Chunk]:
+    """The chunks of a document, with content-derived ids."""
+    chunks = []
+    seen: dict[str, int] = {}
+    for index, piece in enumerate(chunk_text(text, chunk_size, overlap)):
+        digest = hashlib.sha256(piece.encode("utf-8")).hexdigest()[:32]
+        # repeated passages of a document get distinct ids
+        n = seen[digest] = seen.get(digest, -1) + 1
+        chunks.append(Chunk(f"{source}:{digest}:{n}", piece, source, index))
+    return chunks
+
+
+@dataclass
+class IngestReport:
+    files: int = 0
+    changed_files: list[str] = field(default_factory=list)
+    removed_files: list[str] = field(default_factory=list)
+    embedded: int = 0
+    kept: int = 0
+    deleted: int = 0
+
+
+def open_collection(path: str, name: str):
+    """Collection `name` of the Chroma store at `path`, created if missing."""
+    import chromadb
+
+    return chromadb.PersistentClient(path=path).get_or_create_collection(name=name)
+
+
+def model_embedder(model_id: str | None = None, manager=None) -> Embed:
+    """The embedding client of a model configured in ModelManager.
+
+    Args:
+        model_id: Model id (default: the `defaults.embedding_model` setting).
+        manager: ModelManager to open the model with (default: one built
+            from the settings).
+    """
+    from mchat_core.model_manager import ModelManager
+
+    manager = manager or ModelManager()
+    model_id = model_id or manager.default_embedding_model
+    if not model_id:
+        raise ValueError("No embedding model configured")
+    if manager.config[model_id].model_type != "embedding":
+        raise ValueError(f"Model {model_id} is not an embedding model")
+    return manager.open_model(model_id)
+
+
+class RagIngestor:
+    """Keep a Chroma collection in sync with a directory of documents.
+
+    Args:
+        collection: The Chroma collection to fill.
+        embed: Async function embedding a list of texts.
+        chunk_size: Most characters in a chunk.
+        overlap: Characters shared by consecutive chunks.
+        batch_size: Texts embedded per embedding request.
+        max_concurrency: Embedding requests in flight at once.
+        manifest_path: JSON file recording the files ingested; without one,
+            every file is read (but still only changed chunks embedded).
+        suffixes: File suffixes ingested.
+        lexical_index: BM25 index kept in sync with the collection; when it
+            is empty every file is read once to fill it (nothing is embedded
+            again).
+    """
+
+    def __init__(
+        self,
+        collection,
+        embed: Embed,
+        chunk_size: int = 1000,
+        overlap: int = 200,
+        batch_size: int = 64,
+        max_concurrency: int = 4,
+        manifest_path: str | None = None,
+        suffixes: Iterable[str] = DEFAULT_SUFFIXES,
+        lexical_index: LexicalIndex | None = None,
+    ):
+        if batch_size <= 0 or max_concurrency <= 0:
+            raise ValueError("batch_size and max_concurrency must be positive")
+        self.collection = collection
+        self.embed = embed
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.manifest_path = manifest_path
+        self.suffixes = tuple(s.lower() for s in suffixes)
+        self.lexical_index = lexical_index
+        # serialises calls into the collection, which run in worker threads
+        self._store_lock = asyncio.Lock()
+
+    async def ingest(self, root: str) -> IngestReport:
+        """Bring the collection up to date with the documents under `root`."""
+        report = IngestReport()
+        manifest = self._load_manifest()
+        lexical = self.lexical_index
+        # the manifest still names the files removed since; only the
+        # unchanged files are read again
+        read_all = lexical is not None and not len(lexical) and bool(manifest)
+        if read_all:
+            logger.info("Lexical index is empty; reading every file to fill it")
+        files = self._discover(root)
+        report.files = len(files)
+
+        changed = {}
+        for source, path in files.items():
+            stat = os.stat(path)
+            signature = [stat.st_size, stat.st_mtime_ns]
+            if read_all or manifest.get(source) != signature:
+                changed[source] = (path, signature)
+        report.changed_files = sorted(changed)
+
+        loop = asyncio.get_running_loop()
+        documents = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    tool_executor("thread"), self._chunk_file, source, path
+                )
+                for source, (path, _) in changed.items()
+            )
+        )
+
+        new_chunks: list[Chunk] = []
+        stale_ids: list[str] = []
+        for source, chunks in zip(changed, documents, strict=True):
+            existing = set(await self._existing_ids(source))
+            ids = {chunk.id for chunk in chunks}
+            new_chunks.extend(chunk for chunk in chunks if chunk.id not in existing)
+            stale_ids.extend(existing - ids)
+            report.kept += len(ids & existing)
+
+        await self._embed_and_upsert(new_chunks)
+        report.embedded = len(new_chunks)
+
+        report.removed_files = sorted(set(manifest) - set(files))
+        for source in report.removed_files:
+            stale_ids.extend(await self._existing_ids(source))
+        if stale_ids:
+            await self._store(self.collection.delete, ids=stale_ids)
+        report.deleted = len(stale_ids)
+
+        if lexical is not None:
+            lexical.remove(stale_ids)
+            for chunks in documents:
+                for chunk in chunks:
+                    lexical.add(chunk.id, chunk.text, chunk.metadata)
+            lexical.save()
+
+        for source, (_, signature) in changed.items():
+            manifest[source] = signature
+        for source in report.removed_files:
+            del manifest[source]
+        self._save_manifest(manifest)
+        logger.info(
+            f"Ingested {root}: {len(changed)} of {len(files)} files changed, "
+            f"{report.embedded} chunks embedded, {report.kept} kept, "
+            f"{report.deleted} deleted"
+        )
+        return report
+
+    def _discover(self, root: str) -> dict[str, str]:
+        """source (path relative to root) -> path of the documents under root."""
+        if os.path.isfile(root):
+            return {os.path.basename(root): root}
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(filenames):
+                if filename.lower().endswith(self.suffixes):
+                    path = os.path.join(dirpath, filename)
+                    source = os.path.relpath(path, root).replace(os.sep, "/")
+                    files[source] = path
+        return files
+
+    def _chunk_file(self, source: str, path: str) -> list[Chunk]:
+        return document_chunks(
+            source, read_document(path), self.chunk_size, self.overlap
+        )
+
+    async def _store(self, method, **kwargs):
+        async with self._store_lock:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                tool_executor("thread"), functools.partial(method, **kwargs)
+            )
+
+    async def _existing_ids(self, source: str) -> list[str]:
+        result = await self._store(
+            self.collection.get, where={"source": source}, include=[]
+        )
+        return result["ids"]
+
+    async def _embed_and_upsert(self, chunks: list[Chunk]) -> None:
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def process(batch: list[Chunk]) -> None:
+            async with slots:
+                embeddings = await self.embed([chunk.text for chunk in batch])
+            await self._store(
+                self.collection.upsert,
+                ids=[chunk.id for chunk in batch],
+                documents=[chunk.text for chunk in batch],
+                metadatas=[chunk.metadata for chunk in batch],
+                embeddings=embeddings,
+            )
+
+        batches = [
+            chunks[i : i + self.batch_size]
+            for i in range(0, len(chunks), self.batch_size)
+        ]
+        await asyncio.gather(*(process(batch) for batch in batches))
+
+    def _load_manifest(self) -> dict[str, list[int]]:
+        if not self.manifest_path:
+            return {}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable ingestion manifest: {e}")
+            return {}
+
+    def _save_manifest(self, manifest: dict[str, list[int]]) -> None:
+        if not self.manifest_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+            tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.warning(
+                f"Could not write ingestion manifest {self.manifest_path}: {e}"
+            )
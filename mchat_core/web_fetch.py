@@ -0,0 +1,718 @@
+"""
+Concurrent fetching of web pages for tools.
+
+PageFetcher keeps one pooled aiohttp session and fetches many pages at once:
+
+- a global cap on requests in flight, and per-host politeness (at most
+  `per_host` connections to a host, with request starts at least
+  `host_interval` seconds apart) in place of a blanket sleep between pages
+- one GET per page; PDFs are recognised from the Content-Type or by sniffing
+  the first bytes, so no separate HEAD request is needed
+- an overall deadline for a batch: pages that finished in time are returned,
+  the rest are cancelled and marked as not fetched
+- prefetching: pages likely to be asked for are fetched in the background,
+  and asking for one of them waits for that fetch instead of starting another
+
+Extraction work is proportional to the text wanted, not to the document:
+
+- HTML is decoded and parsed incrementally as it streams in, keeping the text
+  of the main content (`<main>`/`<article>` when the page has them) and
+  skipping scripts, navigation, headers, footers and forms; reading stops as
+  soon as enough text is collected or `max_bytes` have been read
+- PDFs (which need their trailer) are read up to `max_pdf_bytes` and parsed
+  with pypdf in the shared tool thread pool, one page at a time, stopping at
+  the page that completes `max_chars`
+
+With a WebCache, extracted text and JSON responses are kept on disk:
+
+- page text is stored (not the raw page) in content-addressed blobs, keyed by
+  URL, so a hit skips both the download and the parsing
+- stale pages are revalidated with If-None-Match/If-Modified-Since; a 304
+  renews the entry without a body
+- JSON API responses are keyed by URL and parameters and kept for a shorter
+  TTL; entries are evicted least recently used beyond the size limit
+- cache reads and writes run in the shared tool thread pool; changes to the
+  index are batched and written `save_delay` seconds after the first one
+"""
+
+import asyncio
+import codecs
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from io import BytesIO
+from typing import Any
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .logging_utils import get_logger
+from .tool_utils import default_cache_path, tool_executor
+
+logger = get_logger(__name__)
+
+DEFAULT_USER_AGENT = "mchat-core (+https://github.com/jspv/mchat_core)"
+
+# Bodies reported for pages that could not be fetched
+FETCH_ERROR = "Error fetching content."
+FETCH_TIMEOUT = "Content not fetched in time."
+# Prefetched pages remembered by a fetcher; the oldest are dropped beyond it
+_PREFETCH_LIMIT = 32
+
+
+def is_pdf(content_type: str, head: bytes) -> bool:
+    """Whether a response is a PDF, by its Content-Type or its magic bytes."""
+    return "application/pdf" in content_type.lower() or head.lstrip().startswith(
+        b"%PDF-"
+    )
+
+
+# Elements whose text is never page content
+_SKIP_TAGS = frozenset(
+    {
+        "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+        "nav", "header", "footer", "aside", "form", "button", "select", "dialog",
+    }
+)  # fmt: skip
+_SKIP_ROLES = frozenset({"navigation", "banner", "contentinfo", "search", "menu"})
+# Elements holding the main content, when a page marks it up
+_MAIN_TAGS = frozenset({"main", "article"})
+_VOID_TAGS = frozenset(
+    {
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+        "meta", "param", "source", "track", "wbr",
+    }
+)  # fmt: skip
+# Text collected beyond max_chars before giving up on finding main content
+_FALLBACK_FACTOR = 4
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Incremental extraction of the main text of an HTML page.
+
+    Feed it the page as it arrives; `done` turns True once enough text has
+    been collected, so the rest of the page need not be read.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        # open elements: (tag, skipped, main)
+        self._stack: list[tuple[str, bool, bool]] = []
+        self._skip = 0
+        self._main = 0
+        self._main_text: list[str] = []
+        self._main_len = 0
+        self._text: list[str] = []
+        self._len = 0
+
+    @property
+    def done(self) -> bool:
+        return (
+            self._main_len >= self.max_chars
+            or self._len >= self.max_chars * _FALLBACK_FACTOR
+        )
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            return
+        attrs = dict(attrs)
+        skipped = (
+            tag in _SKIP_TAGS
+            or attrs.get("role") in _SKIP_ROLES
+            or "hidden" in attrs
+            or attrs.get("aria-hidden") == "true"
+        )
+        main = tag in _MAIN_TAGS or attrs.get("role") == "main"
+        self._stack.append((tag, skipped, main))
+        self._skip += skipped
+        self._main += main
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        # tolerate unclosed elements: close everything up to the match
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                for _, skipped, main in self._stack[i:]:
+                    self._skip -= skipped
+                    self._main -= main
+                del self._stack[i:]
+                return
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        text = " ".join(data.split())
+        if not text:
+            return
+        self._text.append(text)
+        self._len += len(text) + 1
+        if self._main:
+            self._main_text.append(text)
+            self._main_len += len(text) + 1
+
+    def text(self) -> str:
+        parts = self._main_text or self._text
+        return " ".join(parts)[: self.max_chars].strip()
+
+
+def extract_html_text(data: bytes | str, max_chars: int) -> str:
+    """Main text of an HTML page, truncated to `max_chars`."""
+    extractor = HTMLTextExtractor(max_chars)
+    if isinstance(data, bytes):
+        data = data.decode("utf-8", errors="replace")
+    extractor.feed(data)
+    extractor.close()
+    return extractor.text()
+
+
+def extract_pdf_text(data: bytes, max_chars: int) -> str:
+    """Text of a PDF, truncated to `max_chars`; only the pages needed are read."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(BytesIO(data))
+    parts = []
+    size = 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        size += len(text)
+        if size >= max_chars:
+            break
+    return "".join(parts)[:max_chars].strip()
+
+
+@dataclass
+class CachedPage:
+    """Cached text of a page; `fresh` is False once it must be revalidated."""
+
+    text: str
+    fresh: bool
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class WebCache:
+    """On-disk cache of extracted page text and JSON API responses.
+
+    An index (`index.json`) maps each URL, or the hash of an API request, to
+    its validators and timestamps; the bodies are blobs named by the SHA-256
+    of their content, so identical pages share one blob. A page's text
+    serves any request for at most as many characters as were extracted,
+    and any request at all when the page had less text than was asked for.
+
+    Args:
+        path: Cache directory (default: `~/.cache/mchat_core/web`).
+        ttl: Seconds a page is used without revalidation.
+        api_ttl: Seconds an API response is used.
+        max_bytes: Total size of the blobs before the least recently used
+            entries are evicted.
+        save_delay: Seconds a PageFetcher lets index changes collect before
+            writing them (see `flush`).
+
+    The methods block on file I/O and are safe to call from several threads;
+    changes to the index are kept in memory until `flush()`.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttl: float = 3600,
+        api_ttl: float = 300,
+        max_bytes: int = 100_000_000,
+        save_delay: float = 1.0,
+    ):
+        self.path = path or default_cache_path("web")
+        self.ttl = ttl
+        self.api_ttl = api_ttl
+        self.max_bytes = max_bytes
+        self.save_delay = save_delay
+        self.hits = 0
+        self.revalidations = 0
+        self._lock = threading.RLock()
+        self._entries: dict[str, dict] | None = None
+        # index changes not written yet
+        self.dirty = False
+
+    @staticmethod
+    def api_key(url: str, params: Mapping[str, Any] | None = None) -> str:
+        """Index key of an API request (hashed: params may hold credentials)."""
+        encoded = json.dumps([url, dict(params or {})], sort_keys=True, default=str)
+        return "api:" + hashlib.sha256(encoded.encode()).hexdigest()
+
+    # -- pages ---------------------------------------------------------------
+
+    def get_page(self, url: str, max_chars: int) -> CachedPage | None:
+        """The cached text of `url` for `max_chars`, fresh or not; None if absent."""
+        with self._lock:
+            entry = self._load().get(url)
+            if entry is None or not (
+                entry["complete"] or entry["max_chars"] >= max_chars
+            ):
+                return None
+            text = self._read_blob(entry["blob"])
+            if text is None:
+                return None
+            entry["accessed"] = time.time()
+            self.dirty = True
+            fresh = time.time() - entry["fetched_at"] < self.ttl
+            if fresh:
+                self.hits += 1
+        return CachedPage(
+            text=text[:max_chars].strip(),
+            fresh=fresh,
+            etag=entry.get("etag"),
+            last_modified=entry.get("last_modified"),
+        )
+
+    def put_page(
+        self, url: str, text: str, max_chars: int, headers: Mapping[str, str]
+    ) -> None:
+        """Store the text extracted from a response with `headers`."""
+        if "no-store" in headers.get("Cache-Control", "").lower():
+            return
+        self._put(
+            url,
+            text,
+            max_chars=max_chars,
+            complete=len(text) < max_chars,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        )
+
+    def revalidated(self, url: str) -> None:
+        """Mark the entry of `url` fresh again (the server answered 304)."""
+        with self._lock:
+            entry = self._load().get(url)
+            if entry is not None:
+                entry["fetched_at"] = entry["accessed"] = time.time()
+                self.revalidations += 1
+                self.dirty = True
+
+    # -- API responses -------------------------------------------------------
+
+    def get_json(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None or time.time() - entry["fetched_at"] >= self.api_ttl:
+                return None
+            data = self._read_blob(entry["blob"])
+            if data is None:
+                return None
+            entry["accessed"] = time.time()
+            self.dirty = True
+            self.hits += 1
+        return json.loads(data)
+
+    def put_json(self, key: str, data: Any) -> None:
+        self._put(key, json.dumps(data))
+
+    # -- storage -------------------------------------------------------------
+
+    def _blob_path(self, blob: str) -> str:
+        return os.path.join(self.path, "blobs", blob[:2], blob)
+
+    def _read_blob(self, blob: str) -> str | None:
+        try:
+            with open(self._blob_path(blob), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _put(self, key: str, body: str, **fields) -> None:
+        data = body.encode("utf-8")
+        blob = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(blob)
+        try:
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                tmp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, blob_path)
+        except OSError as e:
+            logger.warning(f"Could not write web cache blob {blob_path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            entries[key] = {
+                "blob": blob,
+                "size": len(data),
+                "fetched_at": now,
+                "accessed": now,
+                **fields,
+            }
+            self._evict(entries)
+            self.dirty = True
+
+    def _evict(self, entries: dict[str, dict]) -> None:
+        sizes = {entry["blob"]: entry["size"] for entry in entries.values()}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(entries, key=lambda k: entries[k]["accessed"]):
+            blob = entries.pop(key)["blob"]
+            if any(entry["blob"] == blob for entry in entries.values()):
+                continue
+            total -= sizes[blob]
+            try:
+                os.remove(self._blob_path(blob))
+            except OSError:
+                pass
+            if total <= self.max_bytes:
+                break
+
+    def _load(self) -> dict[str, dict]:
+        if self._entries is None:
+            try:
+                with open(os.path.join(self.path, "index.json"), encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable web cache index: {e}")
+                self._entries = {}
+        return self._entries
+
+    def flush(self) -> None:
+        """Write the index if it has changed since it was last written."""
+        with self._lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            index_path = os.path.join(self.path, "index.json")
+            try:
+                os.makedirs(self.path, exist_ok=True)
+                tmp_path = f"{index_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp_path, index_path)
+            except OSError as e:
+                logger.warning(f"Could not write web cache index {index_path}: {e}")
+
+
+class PageFetcher:
+    """Pooled, polite, concurrent page fetcher.
+
+    The aiohttp session is created on first use and belongs to the event loop
+    that created it; a fetcher used from a new loop starts a new session.
+
+    Args:
+        max_concurrency: Requests in flight at once, across all hosts.
+        per_host: Connections open to a single host at once.
+        host_interval: Minimum seconds between request starts to one host.
+        timeout: Seconds allowed for a single request.
+        max_bytes: Most bytes of an HTML page read before extracting what
+            was collected.
+        max_pdf_bytes: Largest PDF downloaded, in bytes.
+        user_agent: User-Agent header sent with every request.
+        cache: WebCache for page text and JSON responses (none by default).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        per_host: int = 2,
+        host_interval: float = 0.25,
+        timeout: float = 10.0,
+        max_bytes: int = 2_000_000,
+        max_pdf_bytes: int = 20_000_000,
+        user_agent: str = DEFAULT_USER_AGENT,
+        cache: WebCache | None = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.host_interval = host_interval
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_pdf_bytes = max_pdf_bytes
+        self.user_agent = user_agent
+        self.cache = cache
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._host_locks: dict[str, asyncio.Lock] = {}
+        self._host_last_start: dict[str, float] = {}
+        # url -> (max_chars, task) of pages fetched ahead of being asked for
+        self._prefetched: dict[str, tuple[int, asyncio.Task]] = {}
+        # (loop, timer) of the pending write of the cache index
+        self._cache_save: (
+            tuple[asyncio.AbstractEventLoop, asyncio.TimerHandle] | None
+        ) = None
+
+    async def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.per_host,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": self.user_agent},
+            )
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._host_locks.clear()
+            self._host_last_start.clear()
+        return self._session
+
+    async def close(self) -> None:
+        for _, task in self._prefetched.values():
+            task.cancel()
+        self._prefetched.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        await self.save_cache()
+
+    async def save_cache(self) -> None:
+        """Write pending changes to the cache index now."""
+        if self._cache_save is not None:
+            self._cache_save[1].cancel()
+            self._cache_save = None
+        if self.cache is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(tool_executor("thread"), self.cache.flush)
+
+    async def _cache_call(self, method, *args):
+        """Run a WebCache method in the tool thread pool.
+
+        Index changes are written once, `save_delay` seconds after the first.
+        """
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(tool_executor("thread"), method, *args)
+        if self.cache.dirty and (
+            self._cache_save is None or self._cache_save[0] is not loop
+        ):
+            timer = loop.call_later(self.cache.save_delay, self._flush_cache)
+            self._cache_save = (loop, timer)
+        return result
+
+    def _flush_cache(self) -> None:
+        self._cache_save = None
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(tool_executor("thread"), self.cache.flush)
+
+    async def _polite(self, host: str) -> None:
+        """Wait until a request to `host` may start."""
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._host_last_start.get(host, 0.0) + self.host_interval
+            delay = wait - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._host_last_start[host] = time.monotonic()
+
+    async def get_json(self, url: str, params: Mapping[str, Any] | None = None) -> Any:
+        """GET a JSON document (raises aiohttp.ClientError on failure)."""
+        key = self.cache.api_key(url, params) if self.cache is not None else None
+        if key is not None:
+            data = await self._cache_call(self.cache.get_json, key)
+            if data is not None:
+                return data
+        session = await self.session()
+        async with session.get(url, params=params) as response:
+            response.raise_for_status()
+            data = await response.json()
+        if key is not None:
+            await self._cache_call(self.cache.put_json, key, data)
+        return data
+
+    def prefetch(self, urls: Iterable[str], max_chars: int) -> None:
+        """Start fetching pages in the background (from the running loop).
+
+        A later `fetch_text` of one of them for at most `max_chars` waits
+        for the prefetch instead of fetching the page again. A prefetch that
+        has finished (or failed) is replaced by a new one.
+        """
+        loop = asyncio.get_running_loop()
+        for url in dict.fromkeys(urls):
+            current = self._prefetched.get(url)
+            if current is not None and current[0] >= max_chars:
+                task = current[1]
+                if task.get_loop() is loop and not task.done():
+                    continue
+            task = loop.create_task(
+                self._fetch_text(url, max_chars), name=f"prefetch {url}"
+            )
+            task.add_done_callback(_log_prefetch_error)
+            self._prefetched[url] = (max_chars, task)
+        while len(self._prefetched) > _PREFETCH_LIMIT:
+            _, task = self._prefetched.pop(next(iter(self._prefetched)))
+            task.cancel()
+
+    async def fetch_text(self, url: str, max_chars: int) -> str:
+        """Fetch a page or PDF and return its text, truncated to `max_chars`.
+
+        A page being prefetched is not fetched again, unless the prefetch
+        fails. With a cache, fresh text is returned without a request, and
+        stale text is revalidated with a conditional request.
+
+        Raises:
+            aiohttp.ClientError: If the request fails.
+            ValueError: If a PDF is larger than `max_pdf_bytes`.
+        """
+        prefetched = self._prefetched.get(url)
+        if prefetched is not None and prefetched[0] >= max_chars:
+            task = prefetched[1]
+            if task.get_loop() is asyncio.get_running_loop():
+                try:
+                    # shielded: the prefetch stays shared if this caller gives up
+                    text = await asyncio.shield(task)
+                except asyncio.CancelledError:
+                    if not task.cancelled():
+                        raise
+                except Exception:
+                    pass  # already logged; fetched again below
+                else:
+                    return text[:max_chars].strip()
+                finally:
+                    # a finished prefetch is used once
+                    if task.done() and self._prefetched.get(url) is prefetched:
+                        del self._prefetched[url]
+        return await self._fetch_text(url, max_chars)
+
+    async def _fetch_text(self, url: str, max_chars: int) -> str:
+        cached = None
+        if self.cache is not None:
+            cached = await self._cache_call(self.cache.get_page, url, max_chars)
+        if cached is not None and cached.fresh:
+            return cached.text
+        headers = cached.conditional_headers() if cached is not None else {}
+        session = await self.session()
+        assert self._slots is not None
+        async with self._slots:
+            await self._polite(urlparse(url).hostname or "")
+            async with session.get(
+                url, headers=headers, allow_redirects=True
+            ) as response:
+                if response.status == 304 and cached is not None:
+                    await self._cache_call(self.cache.revalidated, url)
+                    return cached.text
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                chunks = response.content.iter_chunked(64 * 1024)
+                first = await anext(chunks, b"")
+                if not is_pdf(content_type, first[:1024]):
+                    text = await self._stream_html(
+                        response.charset, first, chunks, max_chars
+                    )
+                else:
+                    text = None
+                    data = await self._read_pdf(first, chunks)
+                response_headers = response.headers
+        if text is None:
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(
+                tool_executor("thread"), extract_pdf_text, data, max_chars
+            )
+        if self.cache is not None:
+            await self._cache_call(
+                self.cache.put_page, url, text, max_chars, response_headers
+            )
+        return text
+
+    async def _stream_html(self, charset, first, chunks, max_chars: int) -> str:
+        """Parse HTML as it arrives, stopping once enough text is collected."""
+        try:
+            decoder = codecs.getincrementaldecoder(charset or "utf-8")("replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        extractor = HTMLTextExtractor(max_chars)
+        extractor.feed(decoder.decode(first))
+        read = len(first)
+        while not extractor.done and read < self.max_bytes:
+            chunk = await anext(chunks, None)
+            if chunk is None:
+                extractor.feed(decoder.decode(b"", final=True))
+                break
+            extractor.feed(decoder.decode(chunk[: self.max_bytes - read]))
+            read += len(chunk)
+        extractor.close()
+        return extractor.text()
+
+    async def _read_pdf(self, first: bytes, chunks) -> bytes:
+        data = bytearray(first)
+        async for chunk in chunks:
+            data += chunk
+            if len(data) > self.max_pdf_bytes:
+                raise ValueError(f"PDF larger than {self.max_pdf_bytes} bytes")
+        return bytes(data)
+
+    async def fetch_bytes(self, url: str, max_bytes: int | None = None) -> bytes:
+        """GET the raw body of `url` (an image, say), bypassing the cache.
+
+        Raises:
+            aiohttp.ClientError: If the request fails.
+            ValueError: If the body is larger than `max_bytes`.
+        """
+        session = await self.session()
+        assert self._slots is not None
+        async with self._slots:
+            await self._polite(urlparse(url).hostname or "")
+            async with session.get(url, allow_redirects=True) as response:
+                response.raise_for_status()
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    data += chunk
+                    if max_bytes is not None and len(data) > max_bytes:
+                        raise ValueError(f"Body of {url} larger than {max_bytes} bytes")
+        return bytes(data)
+
+    async def fetch_many(
+        self, urls: Iterable[str], max_chars: int, deadline: float | None = None
+    ) -> dict[str, str]:
+        """Fetch pages concurrently; returns url -> text.
+
+        Pages that fail get FETCH_ERROR; pages not finished within `deadline`
+        seconds are cancelled and get FETCH_TIMEOUT.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        tasks = {
+            asyncio.ensure_future(self.fetch_text(url, max_chars)): url for url in urls
+        }
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=deadline)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.debug(f"{len(pending)} page(s) not fetched within {deadline}s")
+        texts = dict.fromkeys(urls, FETCH_TIMEOUT)
+        for task in done:
+            url = tasks[task]
+            try:
+                texts[url] = task.result()
+            except Exception as e:
+                logger.warning(f"Error fetching page content from {url}: {e}")
+                texts[url] = FETCH_ERROR
+        return texts
+
+
+def _log_prefetch_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"Prefetch {task.get_name()} failed: {task.exception()}")
@@ -580,3 +580,167 @@ async def test_text_message_suppressed_when_streaming(dynaconf_test_settings):
     await s._handle_text_message(msg, oneshot=False)
 
     assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_prompt_prefix_shared_across_sessions(dynaconf_test_settings, patch_tools):
+    from autogen_core.models import UserMessage
+
+    from mchat_core.agent_manager import AutogenManager
+
+    agents = {
+        "fewshot": {
+            "type": "agent",
+            "description": "desc",
+            "prompt": "You answer in haiku.",
+            "extra_context": [["human", "hi"], ["ai", "soft hello returns"]],
+        }
+    }
+    manager = AutogenManager(message_callback=lambda *a, **kw: None, agents=agents)
+    s1 = await manager.new_conversation(agent="fewshot")
+    s2 = await manager.new_conversation(agent="fewshot")
+
+    # built once, shared by reference, with stable ordering
+    assert s1.prompt_prefix is s2.prompt_prefix
+    assert s1.prompt_prefix.token_count > 0
+    assert s1.prompt_prefix.system_message == "You answer in haiku."
+    m1 = await s1.agent._model_context.get_messages()
+    m2 = await s2.agent._model_context.get_messages()
+    assert [m.content for m in m1] == ["hi", "soft hello returns"]
+    assert all(a is b for a, b in zip(m1, m2, strict=True))
+
+    # copy-on-write: a session-specific variant leaves the shared prefix alone
+    shared = s1.prompt_prefix
+    await s1.agent.model_context.add_message(UserMessage(content="q", source="user"))
+    variant = await s1.evolve_prompt(prompt="You answer in limericks.")
+    assert variant.system_message == "You answer in limericks."
+    assert s1.prompt_prefix is variant
+    assert s1.agent._system_messages[0].content == "You answer in limericks."
+    m1 = await s1.agent.model_context.get_messages()
+    assert [m.content for m in m1] == ["hi", "soft hello returns", "q"]
+    assert s2.prompt_prefix is shared
+    assert s2.agent._system_messages[0].content == "You answer in haiku."
+
+    # editing the agent definition produces a new prefix for new sessions
+    manager._agents["fewshot"]["prompt"] = "You answer in prose."
+    s3 = await manager.new_conversation(agent="fewshot")
+    assert s3.prompt_prefix is not s1.prompt_prefix
+    assert s3.agent._system_messages[0].content == "You answer in prose."
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("context_type", ["buffered", "summarizing"])
+async def test_evolve_prompt_keeps_overflowed_context(
+    dynaconf_test_settings, patch_tools, context_type
+):
+    from autogen_core.models import AssistantMessage, UserMessage
+
+    from mchat_core.agent_manager import AutogenManager
+
+    context = {
+        "buffered": {"type": "buffered", "buffer_size": 3},
+        "summarizing": {"type": "summarizing", "token_threshold": 10_000, "tail_size": 2},
+    }[context_type]
+    agents = {
+        "fewshot": {
+            "type": "agent",
+            "description": "desc",
+            "prompt": "You answer in haiku.",
+            "extra_context": [["human", "hi"], ["ai", "soft hello returns"]],
+            "context": context,
+        }
+    }
+    manager = AutogenManager(message_callback=lambda *a, **kw: None, agents=agents)
+    session = await manager.new_conversation(agent="fewshot")
+    agent = session.agent
+    ctx = agent.model_context
+    history = []
+    for i in range(4):
+        history.append(UserMessage(content=f"question {i}", source="user"))
+        history.append(AssistantMessage(content=f"answer {i}", source="fewshot"))
+    for message in history:
+        await ctx.add_message(message)
+    if context_type == "summarizing":
+        # as if the few-shot messages and two turns had been compacted
+        state = dict(await ctx.save_state())
+        state["summary"] = "two questions were answered"
+        state["summarized_upto"] = 6
+        await ctx.load_state(state)
+    before = [m.content for m in await ctx.get_messages()]
+    assert len(before) < 2 + len(history)
+
+    await session.evolve_prompt(
+        prompt="You answer in limericks.",
+        extra_context=[["human", "hey"], ["ai", "a limerick"], ["human", "more"]],
+    )
+
+    # the agent and its context are kept, only the prefix is swapped
+    assert session.agent is agent and agent.model_context is ctx
+    assert agent._system_messages[0].content == "You answer in limericks."
+    state = await ctx.save_state()
+    assert [m["content"] for m in state["messages"]] == [
+        "hey",
+        "a limerick",
+        "more",
+    ] + [m.content for m in history]
+    assert [m.content for m in await ctx.get_messages()] == before
+    if context_type == "summarizing":
+        assert state["summary"] == "two questions were answered"
+        assert state["summarized_upto"] == 7
+
+
+@pytest.mark.asyncio
+async def test_tools_imported_when_first_session_uses_them(
+    dynaconf_test_settings, tmp_path, monkeypatch
+):
+    from mchat_core.agent_manager import AutogenManager
+    from mchat_core.tool_utils import LazyTool
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    tools_dir = tmp_path / "tools"
+    tools_dir.mkdir()
+    (tools_dir / "text_tools.py").write_text(
+        "from mchat_core.tool_utils import BaseTool\n"
+        "class Echo(BaseTool):\n"
+        "    name = 'echo'\n"
+        "    description = 'echo'\n"
+        "    def run(self, text: str) -> str:\n"
+        "        return text\n"
+    )
+    (tools_dir / "broken_tools.py").write_text(
+        "from mchat_core.tool_utils import BaseTool\n"
+        "class Broken(BaseTool):\n"
+        "    name = 'broken'\n"
+        "    description = 'needs an API key'\n"
+        "    def verify_setup(self):\n"
+        "        raise ValueError('no key')\n"
+    )
+    agents = {
+        "echoer": {
+            "type": "agent",
+            "description": "desc",
+            "prompt": "p",
+            "tools": ["echo", "broken"],
+        }
+    }
+    m = AutogenManager(agents=agents, tools_directory=str(tools_dir))
+    assert all(isinstance(t, LazyTool) for t in m.tools.values())
+
+    session = await m.new_conversation(agent="echoer")
+    names = [t.name for t in session.agent._workbench[0]._tools]
+    assert names == ["echo"]
+    assert not isinstance(m.tools["echo"], LazyTool)
+    # tools that fail verify_setup are dropped, as with eager loading
+    assert "broken" not in m.tools
+
+    # the manifest path is a setting; listing tools imports none of them
+    manifest = tmp_path / "manifest.json"
+    dynaconf_test_settings.set("tool_manifest_path", str(manifest))
+    m = AutogenManager(agents=agents, tools_directory=str(tools_dir))
+    assert manifest.exists()
+    assert sorted(m.list_tools()) == ["broken", "echo"]
+    assert all(isinstance(t, LazyTool) for t in m.tools.values())
+    # a tool that is not callable is dropped on first use
+    with pytest.raises(ValueError):
+        m.get_tool_info("broken")
+    assert m.list_tools() == ["echo"]
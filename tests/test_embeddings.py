@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from mchat_core.embeddings import EmbeddingCache, EmbeddingClient
+
+
+class FakeOpenAI:
+    """Records embedding requests; a text's vector is [len(text), request no]."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self.embeddings = SimpleNamespace(create=self.create)
+
+    async def create(self, model, input, **kwargs):
+        self.requests.append(list(input))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(text)), 0.5])
+            for i, text in enumerate(input)
+        ]
+        # the API does not promise the order of the data
+        return SimpleNamespace(data=data[::-1])
+
+
+@pytest.mark.asyncio
+async def test_embed_batches_within_limits_concurrently(monkeypatch):
+    fake = FakeOpenAI()
+    client = EmbeddingClient(
+        fake, "text-embedding-3-small", max_concurrency=2, max_batch=3
+    )
+    texts = [f"text {i}" for i in range(10)] + ["text 0"]
+
+    vectors = await client.embed(texts)
+    assert vectors.dtype == np.float32
+    assert vectors.shape == (11, 2)
+    assert vectors[10].tolist() == vectors[0].tolist() == [6.0, 0.5]
+    # ten distinct texts, three per request, two requests at a time
+    assert [len(r) for r in fake.requests] == [3, 3, 3, 1]
+    assert fake.peak == 2
+
+    # a token limit splits requests too (estimated at 3 characters a token)
+    monkeypatch.setattr("mchat_core.embeddings.get_encoding", lambda model: None)
+    fake.requests.clear()
+    client = EmbeddingClient(fake, "text-embedding-3-small", max_batch_tokens=7)
+    await client.embed(["one two three", "four five six", "seven"])
+    assert [len(r) for r in fake.requests] == [1, 2]
+    assert (await client.embed([])).shape == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_avoids_reembedding(tmp_path):
+    fake = FakeOpenAI()
+    cache = EmbeddingCache(str(tmp_path / "vectors.sqlite"))
+    client = EmbeddingClient(fake, "text-embedding-3-small", cache=cache)
+    first = await client.embed(["alpha", "beta"])
+    assert fake.requests == [["alpha", "beta"]]
+
+    # a new cache on the same file: only the new text is embedded
+    client.cache = EmbeddingCache(str(tmp_path / "vectors.sqlite"))
+    again = await client.embed(["beta", "gamma", "alpha"])
+    assert fake.requests[1:] == [["gamma"]]
+    assert again[0].tolist() == first[1].tolist()
+    assert again[2].tolist() == first[0].tolist()
+
+    # vectors are per model
+    other = EmbeddingClient(fake, "text-embedding-3-large", cache=client.cache)
+    await other.embed_one("alpha")
+    assert fake.requests[2:] == [["alpha"]]
+    cache.close()
+    client.cache.close()
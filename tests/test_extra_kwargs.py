@@ -49,8 +49,9 @@ class FakeAssistantAgent:
         self,
         name,
         model_client,
-        tools,
         model_context,
+        tools=None,
+        workbench=None,
         system_message=None,
         model_client_stream=None,
         reflect_on_tool_use=None,
@@ -60,6 +61,7 @@ class FakeAssistantAgent:
         self.name = name
         self.model_client = model_client
         self.tools = tools
+        self.workbench = workbench
         self._model_context = model_context if model_context is not None else FakeContext()
         self.system_message = system_message
         self._model_client_stream = model_client_stream
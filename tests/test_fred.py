@@ -0,0 +1,137 @@
+from datetime import date
+
+import pytest
+
+from .conftest import require_pkgs
+
+
+class FakeFred:
+    """A daily series with a value per day (its day of the year)."""
+
+    def __init__(self, last_updated="2024-06-12 07:38:02-05"):
+        self.last_updated = last_updated
+        self.calls = []
+
+    def get_series_info(self, series_id):
+        import pandas as pd
+
+        if series_id == "MISSING":
+            raise ValueError("Bad Request.  The series does not exist.")
+        self.calls.append(("info", series_id))
+        return pd.Series(
+            {
+                "last_updated": self.last_updated,
+                "frequency_short": "D",
+                "observation_start": "2020-01-01",
+            }
+        )
+
+    def get_series(self, series_id, observation_start=None, observation_end=None):
+        import pandas as pd
+
+        self.calls.append((series_id, observation_start, observation_end))
+        index = pd.date_range(observation_start, observation_end, freq="D")
+        return pd.Series([float(d.dayofyear) for d in index], index=index)
+
+
+@pytest.mark.tools
+def test_fetches_only_missing_ranges(tmp_path):
+    require_pkgs(["pandas"])
+    from mchat_core.tools.fred_cache import FredCache, missing_ranges
+
+    d = date.fromisoformat
+    coverage = [(d("2024-01-10"), d("2024-01-20")), (d("2024-02-01"), d("2024-02-10"))]
+    assert missing_ranges(coverage, d("2024-01-01"), d("2024-02-05")) == [
+        (d("2024-01-01"), d("2024-01-09")),
+        (d("2024-01-21"), d("2024-01-31")),
+    ]
+    assert missing_ranges(coverage, d("2024-01-12"), d("2024-01-15")) == []
+
+    fred = FakeFred()
+    cache = FredCache(fred, path=str(tmp_path), check_interval=3600)
+    data = cache.get_series("dgs10", "2024-01-10", "2024-01-20")
+    assert len(data) == 11 and data.iloc[0] == 10.0
+    assert fred.calls == [("info", "DGS10"), ("DGS10", "2024-01-10", "2024-01-20")]
+
+    # an overlapping range fetches only its new parts
+    fred.calls.clear()
+    data = cache.get_series("DGS10", "2024-01-05", "2024-01-25")
+    assert len(data) == 21
+    assert fred.calls == [
+        ("DGS10", "2024-01-05", "2024-01-09"),
+        ("DGS10", "2024-01-21", "2024-01-25"),
+    ]
+
+    # a new cache serves the range from the file; the release is long past
+    # due, but FRED was asked about it less than check_interval ago
+    fred.calls.clear()
+    cache = FredCache(fred, path=str(tmp_path), check_interval=3600)
+    assert len(cache.get_series("DGS10", "2024-01-07", "2024-01-22")) == 16
+    assert fred.calls == []
+
+    # once check_interval has passed it is checked; a new release drops the
+    # observations of the revision window (30 days for a daily series) back
+    # from the last date covered
+    cache.check_interval = 0
+    cache.get_series("DGS10", "2024-01-07", "2024-01-22")
+    assert fred.calls == [("info", "DGS10")]
+    cache.get_series("DGS10", "2024-01-01", "2024-03-31")
+    fred.calls.clear()
+    fred.last_updated = "2024-06-13 07:38:02-05"
+    data = cache.get_series("DGS10", "2024-01-01", "2024-03-31")
+    assert fred.calls == [("info", "DGS10"), ("DGS10", "2024-03-01", "2024-03-31")]
+    assert len(data) == 91 and data.iloc[-1] == 91.0
+
+
+@pytest.mark.tools
+def test_resample_and_last_n():
+    require_pkgs(["pandas"])
+    import pandas as pd
+
+    from mchat_core.tools.fred_cache import resample
+
+    index = pd.date_range("2023-01-01", "2024-12-31", freq="D")
+    data = pd.Series(1.0, index=index)
+    data["2023-07"] = float("nan")
+
+    monthly = resample(data, "monthly", "sum")
+    # July 2023 has no observations and is dropped
+    assert len(monthly) == 23
+    assert monthly.iloc[0] == 31.0
+    yearly = resample(data, "yearly", "sum")
+    assert yearly.tolist() == [365.0 - 31, 366.0]
+    assert resample(data, "quarterly", "last", last_n=2).index[0] == pd.Timestamp(
+        "2024-07-01"
+    )
+    assert len(resample(data, last_n=5)) == 5
+    with pytest.raises(ValueError):
+        resample(data, "weekly")
+
+
+@pytest.mark.tools
+@pytest.mark.asyncio
+async def test_fetch_fred_many_returns_one_table(tmp_path, monkeypatch):
+    require_pkgs(["pandas", "fredapi"])
+    import json
+
+    from mchat_core.tools import _fred
+    from mchat_core.tools.fred_cache import FredCache
+
+    monkeypatch.setattr(_fred.settings, "fred_api_key", "key", raising=False)
+    monkeypatch.setattr(_fred, "_cache", FredCache(FakeFred(), path=str(tmp_path)))
+    tool = _fred.FetchFREDManyTool()
+    assert tool.is_callable
+
+    result = json.loads(
+        await tool.arun(
+            ["gdp", "GDP", "CPI", "MISSING"],
+            "2024-01-01",
+            "2024-03-31",
+            frequency="monthly",
+            aggregation="max",
+        )
+    )
+    rows = result["data"]["data"]
+    assert [row["GDP"] for row in rows] == [31.0, 60.0, 91.0]
+    assert [row["CPI"] for row in rows] == [31.0, 60.0, 91.0]
+    assert list(result["errors"]) == ["MISSING"]
@@ -0,0 +1,147 @@
+import asyncio
+import base64
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from mchat_core.images import ImageGenerator, ImageStore
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+class FakeImages:
+    """Records image requests; image i of a request is at url .../<prompt>/<i>."""
+
+    def __init__(self, delay=0.01, b64=False, fail_on=()):
+        self.delay = delay
+        self.b64 = b64
+        # numbers of the requests (from 1) that fail
+        self.fail_on = set(fail_on)
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+
+    async def generate(self, prompt, model, size, n, quality=None, **kwargs):
+        self.requests.append((model, n))
+        start = len(self.requests) * 100
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if start // 100 in self.fail_on:
+            raise RuntimeError("content policy violation")
+        data = [
+            SimpleNamespace(
+                url=None if self.b64 else f"https://img.test/{prompt}/{start + i}",
+                b64_json=(
+                    base64.b64encode(PNG + str(start + i).encode()).decode()
+                    if self.b64
+                    else None
+                ),
+                revised_prompt=f"{prompt}, revised",
+            )
+            for i in range(n)
+        ]
+        return SimpleNamespace(data=data)
+
+
+class FakeFetcher:
+    def __init__(self):
+        self.urls = []
+        # url -> url whose image it repeats
+        self.aliases = {}
+
+    async def fetch_bytes(self, url, max_bytes=None):
+        self.urls.append(url)
+        await asyncio.sleep(0.01)
+        return PNG + self.aliases.get(url, url).encode()
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_generate_concurrently_and_store_by_content(tmp_path):
+    images_api = FakeImages()
+    client = SimpleNamespace(images=images_api)
+    fetcher = FakeFetcher()
+    store = ImageStore(str(tmp_path / "images"))
+    log_file = tmp_path / "images.log"
+    generator = ImageGenerator(
+        client, store, max_concurrency=2, fetcher=fetcher, log_file=str(log_file)
+    )
+
+    # dall-e-3 makes one image per request; three requests, two at a time
+    images = await generator.generate("cat", model="dall-e-3", num_images=3)
+    assert images_api.requests == [("dall-e-3", 1)] * 3
+    assert images_api.peak == 2
+    assert len(fetcher.urls) == 3
+    assert len({image["path"] for image in images}) == 3
+    assert all(image["path"].endswith(".png") for image in images)
+    assert {image["revised_prompt"] for image in images} == {"cat, revised"}
+    assert not any(image["cached"] for image in images)
+
+    # identical downloads are stored once
+    fetcher.aliases["https://img.test/dog/400"] = "https://img.test/cat/100"
+    dogs = await generator.generate("dog", num_images=2)
+    assert images_api.requests[-1] == ("dall-e-2", 2)
+    assert dogs[0]["path"] == images[0]["path"]
+    assert dogs[1]["path"] not in {image["path"] for image in images}
+
+    # the same prompt again is served from the store; only missing images
+    # are generated
+    again = await generator.generate("cat", model="dall-e-3", num_images=4)
+    assert images_api.requests[4:] == [("dall-e-3", 1)]
+    assert [image["cached"] for image in again] == [True] * 3 + [False]
+    assert again[0]["url"].startswith("file://")
+    fresh = ImageStore(str(tmp_path / "images"))
+    assert (
+        len(
+            fresh.lookup(
+                fresh.request_key(
+                    prompt="cat", model="dall-e-3", size="1024x1024", quality="standard"
+                )
+            )
+        )
+        == 4
+    )
+
+    await generator.log.flush()
+    assert log_file.read_text().count("Request:") == 3 + 1 + 1
+
+
+@pytest.mark.asyncio
+async def test_base64_images_and_model_wrapper(tmp_path):
+    from mchat_core.model_manager import DallEAPIWrapper
+
+    client = SimpleNamespace(images=FakeImages(b64=True))
+    wrapper = DallEAPIWrapper(
+        num_images=2,
+        model="dall-e-2",
+        client=client,
+        store=ImageStore(str(tmp_path)),
+    )
+    urls = (await wrapper.arun("owl")).split("\n")
+    assert len(urls) == 2
+    assert all(url.startswith("file://") for url in urls)
+    path = Path(urls[0].removeprefix("file://"))
+    assert path.parent.parent == tmp_path and path.suffix == ".png"
+
+
+@pytest.mark.asyncio
+async def test_failed_request_keeps_the_other_images(tmp_path):
+    images_api = FakeImages(fail_on={2})
+    store = ImageStore(str(tmp_path))
+    generator = ImageGenerator(
+        SimpleNamespace(images=images_api), store, fetcher=FakeFetcher()
+    )
+
+    with pytest.raises(RuntimeError, match="content policy"):
+        await generator.generate("fox", model="dall-e-3", num_images=3)
+    assert len(images_api.requests) == 3
+
+    # the two images that were made are reused; only one is generated again
+    images = await generator.generate("fox", model="dall-e-3", num_images=3)
+    assert [image["cached"] for image in images] == [True, True, False]
+    assert len(images_api.requests) == 4
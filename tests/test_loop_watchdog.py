@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from mchat_core.loop_watchdog import LoopWatchdog, current_activity, track
+
+
+async def blocking_tool(seconds: float) -> None:
+    with track("tool:slow"):
+        await asyncio.sleep(0)
+        time.sleep(seconds)  # noqa: ASYNC251 - blocks the loop on purpose
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("debug", [False, True])
+async def test_watchdog_attributes_stall_with_stack_sample(debug):
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02)
+    watchdog.start(debug=debug)
+    try:
+        with track("session:researcher"):
+            await asyncio.create_task(blocking_tool(0.3))
+        await asyncio.sleep(0.05)
+    finally:
+        watchdog.stop()
+
+    stats = watchdog.stats()
+    assert stats["stalls"] == 1
+    # the heartbeat measures the stall from when it was due
+    assert stats["max_stall"] >= (0.3 if debug else 0.25)
+    assert stats["max_lag"] >= 0.2
+
+    report = watchdog.reports[0]
+    # the task inherits the session label; the tool label was sampled while blocking
+    assert report.activity == "session:researcher > tool:slow"
+    assert "blocking_tool" in report.callback
+    assert "time.sleep(seconds)" in report.stack
+    assert "base_events" not in report.stack
+
+
+@pytest.mark.asyncio
+async def test_watchdog_ignores_short_callbacks_and_restores_loop():
+    loop = asyncio.get_running_loop()
+    debug, slow_callback_duration = loop.get_debug(), loop.slow_callback_duration
+    for debug_mode in (False, True):
+        watchdog = LoopWatchdog(threshold=0.2, interval=0.01)
+        watchdog.start(debug=debug_mode)
+        with pytest.raises(RuntimeError):
+            LoopWatchdog().start()
+        if debug_mode:
+            assert loop.get_debug() and loop.slow_callback_duration == 0.2
+        else:
+            assert loop.get_debug() == debug
+        try:
+            await asyncio.gather(*(asyncio.sleep(0.01) for _ in range(20)))
+        finally:
+            watchdog.stop()
+        assert watchdog.stats()["stalls"] == 0
+        assert loop.get_debug() == debug
+        assert loop.slow_callback_duration == slow_callback_duration
+
+    # labels are only recorded while a watchdog is running
+    with track("session:idle"):
+        assert current_activity() == ""
+
+
+@pytest.mark.asyncio
+async def test_watchdog_reports_stalls_with_quiet_asyncio_logger():
+    asyncio_logger = logging.getLogger("asyncio")
+    level = asyncio_logger.level
+    asyncio_logger.setLevel(logging.ERROR)
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02)
+    watchdog.start()
+    try:
+        with track("session:quiet"):
+            await asyncio.create_task(blocking_tool(0.3))
+        await asyncio.sleep(0.05)
+    finally:
+        watchdog.stop()
+        asyncio_logger.setLevel(level)
+
+    assert watchdog.stats()["stalls"] == 1
+    report = watchdog.reports[0]
+    assert report.activity == "session:quiet > tool:slow"
+    assert "time.sleep(seconds)" in report.stack
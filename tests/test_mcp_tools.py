@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch, Mock
 
 from mchat_core.tool_utils import (
     MCPToolSpec,
+    MCPValidation,
     parse_mcp_tools,
     MCPToolManager,
     validate_and_load_mcp_tools,
@@ -164,13 +165,11 @@ class TestMCPToolManager:
             MCPToolSpec("mcp:echo test"),
         ]
         
-        # Mock the validate_mcp_tool function directly
-        async def mock_validate(spec):
-            if "python" in spec.spec_string:
-                return True
-            return False
+        # Mock the probe_mcp_tool function directly
+        async def mock_validate(spec, session_pool=None, cache=None):
+            return MCPValidation(spec.spec_string, "python" in spec.spec_string)
         
-        with patch("mchat_core.tool_utils.validate_mcp_tool", side_effect=mock_validate):
+        with patch("mchat_core.tool_utils.probe_mcp_tool", side_effect=mock_validate):
             results = await manager.validate_tools(specs)
         
         assert len(results) == 2
@@ -185,10 +184,10 @@ class TestMCPToolManager:
         manager = MCPToolManager()
         specs = [MCPToolSpec("mcp:python --version")]
         
-        async def mock_validate_error(spec):
+        async def mock_validate_error(spec, session_pool=None, cache=None):
             raise Exception("Test error")
         
-        with patch("mchat_core.tool_utils.validate_mcp_tool", side_effect=mock_validate_error), \
+        with patch("mchat_core.tool_utils.probe_mcp_tool", side_effect=mock_validate_error), \
              patch("mchat_core.tool_utils.logger") as mock_logger:
             results = await manager.validate_tools(specs)
         
@@ -594,4 +593,488 @@ class TestMCPValidationSimplified:
             result = await validate_mcp_tool(spec)
         
         assert result is False
-        mock_logger.warning.assert_called_once()
\ No newline at end of file
+        mock_logger.warning.assert_called_once()
+
+MCP_TEST_SERVER = '''
+import asyncio
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("pool-test")
+active = 0
+peak = 0
+
+
+@mcp.tool()
+def server_pid() -> int:
+    """Return the server process id."""
+    return os.getpid()
+
+
+@mcp.tool()
+async def slow(delay: float = 0.2) -> int:
+    """Sleep and return the peak number of concurrent calls."""
+    global active, peak
+    active += 1
+    peak = max(peak, active)
+    try:
+        await asyncio.sleep(delay)
+    finally:
+        active -= 1
+    return peak
+
+
+@mcp.tool()
+def active_calls() -> int:
+    """Return the number of slow calls in progress."""
+    return active
+
+
+mcp.run()
+'''
+
+
+class TestMCPSessionPool:
+    """Test the shared pool of live MCP server sessions with a real stdio server."""
+
+    @pytest.fixture
+    def server_spec(self, tmp_path):
+        import sys
+
+        script = tmp_path / "pool_server.py"
+        script.write_text(MCP_TEST_SERVER)
+        return MCPToolSpec(
+            f"mcp:{sys.executable} {script}", {"max_concurrency": 2, "timeout": 20}
+        )
+
+    @staticmethod
+    async def call(tool, **args):
+        import json
+
+        from autogen_core import CancellationToken
+
+        result = await tool.run_json(args, CancellationToken())
+        return int(json.loads(tool.return_value_as_string(result))[0]["text"])
+
+    @pytest.mark.asyncio
+    async def test_server_is_shared_across_conversations(self, server_spec):
+        from mchat_core.tool_utils import MCPSessionPool
+
+        pool = MCPSessionPool()
+        try:
+            manager = MCPToolManager(session_pool=pool)
+            manager.validated_tools[server_spec.spec_string] = True
+            first = await manager.load_mcp_tools_for_conversation([server_spec])
+            second = await manager.load_mcp_tools_for_conversation([server_spec])
+
+            assert set(first) == {"server_pid", "slow", "active_calls"}
+            assert len(pool) == 1
+            pid = await self.call(first["server_pid"])
+            assert await self.call(second["server_pid"]) == pid
+            assert manager.active_connections == {}
+        finally:
+            await pool.close()
+        assert len(pool) == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_and_restart(self, server_spec):
+        import os
+        import signal
+
+        from mchat_core.tool_utils import MCPSessionPool
+
+        pool = MCPSessionPool()
+        try:
+            manager = MCPToolManager(session_pool=pool)
+            tools = await manager._load_mcp_server_tools(server_spec)
+
+            peaks = await asyncio.gather(
+                *(self.call(tools["slow"], delay=0.2) for _ in range(5))
+            )
+            assert max(peaks) == 2
+
+            # a dead server is restarted transparently on the next call
+            pid = await self.call(tools["server_pid"])
+            os.kill(pid, signal.SIGKILL)
+            await asyncio.sleep(0.2)
+            new_pid = await self.call(tools["server_pid"])
+            assert new_pid != pid
+            stats = pool.stats()
+            assert list(stats.values())[0]["restarts"] == 1
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_health_check_restarts_dead_server(self, server_spec):
+        import os
+        import signal
+
+        from mchat_core.tool_utils import MCPSessionPool
+
+        server_spec.config.update(health_check_interval=0.2, restart_backoff=0.1)
+        pool = MCPSessionPool()
+        try:
+            manager = MCPToolManager(session_pool=pool)
+            tools = await manager._load_mcp_server_tools(server_spec)
+            pid = await self.call(tools["server_pid"])
+            os.kill(pid, signal.SIGKILL)
+
+            # restarted by the health check, without waiting for a call
+            for _ in range(100):
+                await asyncio.sleep(0.1)
+                stats = list(pool.stats().values())[0]
+                if stats["restarts"] and stats["running"]:
+                    break
+            assert stats == {"running": True, "restarts": 1, "tools": 3}
+            assert await self.call(tools["server_pid"]) != pid
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_is_cancelled_on_server(self, server_spec):
+        from autogen_core import CancellationToken
+
+        from mchat_core.tool_utils import MCPSessionPool
+
+        pool = MCPSessionPool()
+        try:
+            manager = MCPToolManager(session_pool=pool)
+            tools = await manager._load_mcp_server_tools(server_spec)
+            token = CancellationToken()
+            call = asyncio.create_task(tools["slow"].run_json({"delay": 30}, token))
+            await asyncio.sleep(0.3)
+            assert await self.call(tools["active_calls"]) == 1
+
+            token.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await call
+            await asyncio.sleep(0.3)
+            # the server stopped working on the request
+            assert await self.call(tools["active_calls"]) == 0
+        finally:
+            await pool.close()
+
+
+class TestConcurrentMCPLoading:
+    """Test concurrent per-conversation loading with per-server timeouts."""
+
+    @staticmethod
+    def slow_loader(delays):
+        async def load(self, spec):
+            await asyncio.sleep(delays[spec.spec_string])
+            return {f"{spec.connection_info['command']}_tool": Mock()}
+
+        return load
+
+    @pytest.mark.asyncio
+    async def test_servers_load_concurrently_with_timings(self):
+        import time
+
+        manager = MCPToolManager()
+        specs = [MCPToolSpec("mcp:alpha"), MCPToolSpec("mcp:beta")]
+        manager.validated_tools = {s.spec_string: True for s in specs}
+        delays = {"mcp:alpha": 0.3, "mcp:beta": 0.3}
+
+        with patch.object(
+            MCPToolManager, "_load_mcp_server_tools", self.slow_loader(delays)
+        ):
+            start = time.perf_counter()
+            tools = await manager.load_mcp_tools_for_conversation(specs)
+            elapsed = time.perf_counter() - start
+
+        assert set(tools) == {"alpha_tool", "beta_tool"}
+        assert elapsed < 0.55
+        assert set(manager.load_timings) == {"mcp:alpha", "mcp:beta"}
+        assert all(t >= 0.3 for t in manager.load_timings.values())
+        assert manager.pending_loads == {}
+
+    @pytest.mark.asyncio
+    async def test_slow_server_does_not_block_fast_one(self):
+        manager = MCPToolManager()
+        specs = [
+            MCPToolSpec("mcp:fast"),
+            MCPToolSpec("mcp:slow", {"load_timeout": 0.1}),
+        ]
+        manager.validated_tools = {s.spec_string: True for s in specs}
+        delays = {"mcp:fast": 0.0, "mcp:slow": 0.3}
+
+        with patch.object(
+            MCPToolManager, "_load_mcp_server_tools", self.slow_loader(delays)
+        ):
+            tools = await manager.load_mcp_tools_for_conversation(specs)
+            assert set(tools) == {"fast_tool"}
+            pending = manager.get_pending_loads(specs)
+            assert list(pending) == ["mcp:slow"]
+
+            late = await pending["mcp:slow"]
+        assert set(late) == {"slow_tool"}
+        assert manager.pending_loads == {}
+
+    @pytest.mark.asyncio
+    async def test_session_attaches_late_tools(
+        self, dynaconf_test_settings, patch_tools
+    ):
+        from autogen_core.tools import FunctionTool
+
+        from mchat_core.agent_manager import AutogenManager
+
+        def late_tool() -> str:
+            return "late"
+
+        async def load(self, spec):
+            await asyncio.sleep(0.2)
+            return {"late_tool": FunctionTool(late_tool, description="late tool")}
+
+        agents = {
+            "mcp_agent": {
+                "type": "agent",
+                "description": "desc",
+                "prompt": "hi",
+                "tools": [
+                    "google_search",
+                    {"mcp": "slowserver", "load_timeout": 0.05},
+                ],
+            }
+        }
+        m = AutogenManager(message_callback=lambda *a, **kw: None, agents=agents)
+        if m._mcp_validation_task:
+            await m._mcp_validation_task
+        m.mcp_manager = MCPToolManager()
+        m.mcp_manager.validated_tools = {"mcp:slowserver": True}
+
+        with patch.object(MCPToolManager, "_load_mcp_server_tools", load):
+            session = await m.new_conversation(agent="mcp_agent")
+            names = {t.name for t in session.agent._workbench[0]._tools}
+            assert "late_tool" not in names
+
+            await asyncio.gather(*session._pending_mcp_loads.values())
+            session._attach_late_mcp_tools()
+
+        names = {t.name for t in session.agent._workbench[0]._tools}
+        assert "late_tool" in names
+        assert session._pending_mcp_loads == {}
+
+
+class TestMCPValidationArtifacts:
+    """Test that validation results are reused for loading and cached on disk."""
+
+    @pytest.fixture
+    def server_spec(self, tmp_path):
+        import sys
+
+        script = tmp_path / "validation_server.py"
+        script.write_text(MCP_TEST_SERVER)
+        return MCPToolSpec(f"mcp:{sys.executable} {script}", {"timeout": 20})
+
+    @pytest.mark.asyncio
+    async def test_probe_keeps_tool_list_for_loading(self, server_spec):
+        from mchat_core.tool_utils import probe_mcp_tool
+
+        validation = await probe_mcp_tool(server_spec)
+        assert validation.valid and not validation.cached
+        assert set(validation.tool_names) == {"server_pid", "slow", "active_calls"}
+
+        manager = MCPToolManager()
+        await manager.validate_tools([server_spec])
+        assert manager.validations[server_spec.spec_string].tools == validation.tools
+        # loading must not list the tools again
+        with patch(
+            "autogen_ext.tools.mcp.mcp_server_tools", side_effect=AssertionError
+        ):
+            tools = await manager.load_mcp_tools_for_conversation([server_spec])
+        assert set(tools) == {"server_pid", "slow", "active_calls"}
+        assert tools["slow"].schema["parameters"]["properties"]["delay"]
+
+        from autogen_core import CancellationToken
+
+        result = await tools["server_pid"].run_json({}, CancellationToken())
+        assert int(result[0].text) > 0
+
+    @pytest.mark.asyncio
+    async def test_validation_cache_skips_unchanged_servers(
+        self, server_spec, tmp_path
+    ):
+        import os
+
+        from mchat_core.tool_utils import MCPValidationCache, probe_mcp_tool
+
+        cache_path = str(tmp_path / "cache" / "mcp_validation.json")
+        first = await probe_mcp_tool(server_spec, cache=MCPValidationCache(cache_path))
+        assert first.valid and not first.cached
+
+        # a fresh cache (as after a restart) answers without probing the server
+        with patch(
+            "autogen_ext.tools.mcp.mcp_server_tools", side_effect=AssertionError
+        ):
+            again = await probe_mcp_tool(
+                server_spec, cache=MCPValidationCache(cache_path)
+            )
+        assert again.cached and again.tools == first.tools
+
+        # a changed server script is probed again
+        script = server_spec.connection_info["args"][0]
+        stat = os.stat(script)
+        os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with patch("autogen_ext.tools.mcp.mcp_server_tools", return_value=[]):
+            changed = await probe_mcp_tool(
+                server_spec, cache=MCPValidationCache(cache_path)
+            )
+        assert not changed.cached and changed.tools == []
+
+        # web servers are never cached
+        cache = MCPValidationCache(cache_path)
+        assert cache.key_for(MCPToolSpec("mcp:http://localhost:3000")) is None
+
+        # without a path the cache is kept in memory only
+        memory = MCPValidationCache()
+        memory.put(server_spec, first)
+        assert memory.get(server_spec).tools == first.tools
+        assert memory.path is None
+
+    @pytest.mark.asyncio
+    async def test_probe_keeps_live_session_in_pool(self, server_spec):
+        from mchat_core.tool_utils import MCPSessionPool
+
+        pool = MCPSessionPool()
+        try:
+            manager = MCPToolManager(session_pool=pool)
+            results = await manager.validate_tools([server_spec])
+            assert results[server_spec.spec_string] is True
+            stats = list(pool.stats().values())
+            assert stats == [{"running": True, "restarts": 0, "tools": 3}]
+
+            tools = await manager.load_mcp_tools_for_conversation([server_spec])
+            assert set(tools) == {"server_pid", "slow", "active_calls"}
+            assert len(pool) == 1
+        finally:
+            await pool.close()
+
+
+MCP_CHANGING_SERVER = '''
+from mcp.server.fastmcp import Context, FastMCP
+
+mcp = FastMCP("changing-test")
+
+
+def extra() -> str:
+    """A tool added at runtime."""
+    return "extra"
+
+
+@mcp.tool()
+async def grow(ctx: Context) -> str:
+    """Add a tool and notify the client."""
+    mcp.add_tool(extra)
+    await ctx.session.send_tool_list_changed()
+    return "grown"
+
+
+mcp.run()
+'''
+
+
+class TestMCPToolSchemaCache:
+    """Test the MCP tool schema cache."""
+
+    SCHEMA = {
+        "name": "lookup",
+        "description": "Look something up",
+        "inputSchema": {"type": "object", "properties": {"q": {"type": "string"}}},
+    }
+
+    @staticmethod
+    def stdio_params():
+        from autogen_ext.tools.mcp import StdioServerParams
+
+        return StdioServerParams(command="python", args=["server.py"])
+
+    def test_ttl_and_adapter_reuse(self):
+        import time
+
+        from mchat_core.tool_utils import MCPToolSchemaCache
+
+        params = self.stdio_params()
+        cache = MCPToolSchemaCache(ttl=0.1)
+        cache.put("mcp:python server.py", [self.SCHEMA])
+        first = cache.get_adapters("mcp:python server.py", params)
+        again = cache.get_adapters("mcp:python server.py", params)
+        assert list(first) == ["lookup"]
+        assert again["lookup"] is first["lookup"]
+
+        time.sleep(0.15)
+        assert cache.get("mcp:python server.py") is None
+        assert len(cache) == 0
+
+    def test_persists_to_disk(self, tmp_path):
+        from mchat_core.tool_utils import MCPToolSchemaCache
+
+        path = str(tmp_path / "schemas.json")
+        MCPToolSchemaCache(path=path).put("mcp:python server.py", [self.SCHEMA])
+        assert MCPToolSchemaCache(path=path).get("mcp:python server.py") == [
+            self.SCHEMA
+        ]
+        # expired entries on disk are ignored
+        assert MCPToolSchemaCache(ttl=0, path=path).get("mcp:python server.py") is None
+
+    @pytest.mark.asyncio
+    async def test_manager_lists_tools_once(self):
+        from mchat_core.tool_utils import mcp_tools_from_schemas
+
+        manager = MCPToolManager()
+        spec = MCPToolSpec("mcp:python server.py")
+        manager.validated_tools = {spec.spec_string: True}
+        params = self.stdio_params()
+        listed = list(mcp_tools_from_schemas(params, [self.SCHEMA]).values())
+
+        with patch(
+            "autogen_ext.tools.mcp.mcp_server_tools", return_value=listed
+        ) as mock_mcp_tools:
+            first = await manager.load_mcp_tools_for_conversation([spec])
+            second = await manager.load_mcp_tools_for_conversation([spec])
+
+        mock_mcp_tools.assert_called_once()
+        assert second["lookup"] is first["lookup"]
+
+        # the same command in another cwd may be another server
+        elsewhere = MCPToolSpec("mcp:python server.py", {"cwd": "/srv/other"})
+        manager.validated_tools[elsewhere.spec_string] = True
+        with patch(
+            "autogen_ext.tools.mcp.mcp_server_tools", return_value=listed
+        ) as mock_mcp_tools:
+            await manager.load_mcp_tools_for_conversation([elsewhere])
+        mock_mcp_tools.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_list_changed_refreshes_pooled_tools(self, tmp_path):
+        import sys
+
+        from autogen_core import CancellationToken
+
+        from mchat_core.tool_utils import MCPSessionPool, MCPToolSchemaCache
+
+        script = tmp_path / "changing_server.py"
+        script.write_text(MCP_CHANGING_SERVER)
+        spec = MCPToolSpec(f"mcp:{sys.executable} {script}")
+        cache = MCPToolSchemaCache()
+        pool = MCPSessionPool(schema_cache=cache)
+        try:
+            manager = MCPToolManager(session_pool=pool)
+            assert manager.schema_cache is cache
+            tools = await manager._load_mcp_server_tools(spec)
+            assert set(tools) == {"grow"}
+            assert [t["name"] for t in cache.get(spec.spec_string)] == ["grow"]
+
+            await tools["grow"].run_json({}, CancellationToken())
+            connection = pool.get_connection(spec, None)
+            for _ in range(50):
+                if "extra" in connection.tools:
+                    break
+                await asyncio.sleep(0.05)
+
+            assert set(connection.tools) == {"grow", "extra"}
+            assert connection.tools["grow"] is tools["grow"]
+            names = {t["name"] for t in cache.get(spec.spec_string)}
+            assert names == {"grow", "extra"}
+        finally:
+            await pool.close()
@@ -453,3 +453,513 @@ async def test_head_tail_context_exact_behavior(dynaconf_test_settings, patch_to
     # Should NOT have middle messages
     assert not any("Message 4" in content for content in content_strings), "Should not have middle messages"
     assert not any("Message 5" in content for content in content_strings), "Should not have middle messages"
+
+
+def _word_counter(messages):
+    return sum(len(str(m.content).split()) for m in messages)
+
+
+class _FakeSummaryClient:
+    def __init__(self, reply="the user said hello a lot"):
+        self.reply = reply
+        self.calls = []
+
+    async def create(self, messages, **kwargs):
+        from types import SimpleNamespace
+
+        self.calls.append(messages)
+        return SimpleNamespace(content=self.reply)
+
+
+@pytest.mark.asyncio
+async def test_summarizing_context_for_agent(dynaconf_test_settings, patch_tools):
+    from mchat_core.agent_manager import AutogenManager
+    from mchat_core.model_context import SummarizingChatCompletionContext
+
+    agents = {
+        "sum": {
+            "type": "agent",
+            "description": "desc",
+            "prompt": "hi",
+            "context": {"type": "summarizing", "token_threshold": 500, "tail_size": 4},
+        }
+    }
+    m = AutogenManager(message_callback=lambda *a, **kw: None, agents=agents)
+    session = await m.new_conversation(agent="sum")
+    ctx = session.agent._model_context
+    assert isinstance(ctx, SummarizingChatCompletionContext)
+    assert ctx._token_threshold == 500
+    assert ctx._tail_size == 4
+
+
+@pytest.mark.asyncio
+async def test_summarizing_context_compacts_in_background():
+    from autogen_core.models import AssistantMessage, UserMessage
+
+    from mchat_core.model_context import SummarizingChatCompletionContext
+
+    client = _FakeSummaryClient()
+    head = [UserMessage(content="system prompt", source="user")]
+    ctx = SummarizingChatCompletionContext(
+        summary_client=client,
+        token_threshold=20,
+        tail_size=3,
+        token_counter=_word_counter,
+        initial_messages=head,
+    )
+
+    for i in range(6):
+        await ctx.add_message(UserMessage(content=f"hello there number {i}", source="user"))
+        await ctx.add_message(AssistantMessage(content=f"hi {i}", source="ai"))
+
+    # compaction was scheduled but get_messages never waits for it
+    await ctx.wait_for_compaction()
+    assert len(client.calls) >= 1
+    assert ctx.summary == "the user said hello a lot"
+
+    msgs = await ctx.get_messages()
+    # head kept verbatim, followed by the summary, then the un-summarized tail
+    assert msgs[0].content == "system prompt"
+    assert msgs[1].source == "summary"
+    assert msgs[-1].content == "hi 5"
+    assert len(msgs) < 13
+
+
+@pytest.mark.asyncio
+async def test_summarizing_context_failed_compaction_keeps_history():
+    from autogen_core.models import UserMessage
+
+    from mchat_core.model_context import SummarizingChatCompletionContext
+
+    class BrokenClient:
+        async def create(self, messages, **kwargs):
+            raise RuntimeError("model down")
+
+    ctx = SummarizingChatCompletionContext(
+        summary_client=BrokenClient(),
+        token_threshold=5,
+        tail_size=2,
+        token_counter=_word_counter,
+    )
+    for i in range(5):
+        await ctx.add_message(UserMessage(content=f"one two three {i}", source="user"))
+    await ctx.wait_for_compaction()
+
+    msgs = await ctx.get_messages()
+    assert ctx.summary is None
+    assert len(msgs) == 5
+
+    state = await ctx.save_state()
+    await ctx.clear()
+    await ctx.load_state(state)
+    assert len(await ctx.get_messages()) == 5
+
+
+class _WordEncoding:
+    """Fake tiktoken encoding: one token per word, records encoded texts."""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode_batch(self, texts):
+        self.encoded += len(texts)
+        return [t.split() for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_cached_token_context_trims_from_front():
+    from autogen_core.models import (
+        AssistantMessage,
+        FunctionExecutionResult,
+        FunctionExecutionResultMessage,
+        UserMessage,
+    )
+
+    from mchat_core.model_context import (
+        CachedTokenLimitedChatCompletionContext,
+        MessageTokenCounter,
+    )
+
+    encoding = _WordEncoding()
+    head = [UserMessage(content="system prompt", source="user")]
+    ctx = CachedTokenLimitedChatCompletionContext(
+        model_client=None,
+        token_limit=60,
+        initial_messages=head,
+        token_counter=MessageTokenCounter(encoding=encoding),
+    )
+    # a tool result that would be orphaned once its call is trimmed
+    await ctx.add_message(
+        FunctionExecutionResultMessage(
+            content=[FunctionExecutionResult(content="42", name="f", call_id="c1")]
+        )
+    )
+    for i in range(10):
+        await ctx.add_message(UserMessage(content=f"question {i}", source="user"))
+        await ctx.add_message(AssistantMessage(content=f"answer {i}", source="ai"))
+
+    msgs = await ctx.get_messages()
+    assert msgs[0].content == "system prompt"
+    assert not isinstance(msgs[1], FunctionExecutionResultMessage)
+    assert msgs[-1].content == "answer 9"
+    assert ctx.total_tokens <= 60 - 3
+    assert len(msgs) < 22
+
+    # each message is encoded once; later calls only count new messages
+    encoded = encoding.encoded
+    assert await ctx.get_messages() == msgs
+    assert encoding.encoded == encoded
+
+    state = await ctx.save_state()
+    await ctx.clear()
+    assert await ctx.get_messages() == []
+    await ctx.load_state(state)
+    assert await ctx.get_messages() == msgs
+
+
+class _CountingEncoding:
+    """Wraps an encoding, counting the texts encoded."""
+
+    def __init__(self, encoding):
+        self._encoding = encoding
+        self.encoded = 0
+
+    def encode_batch(self, texts):
+        self.encoded += len(texts)
+        return self._encoding.encode_batch(texts)
+
+
+class _CountingClient:
+    """The count_tokens autogen's TokenLimitedChatCompletionContext calls,
+    with the same per-message accounting as MessageTokenCounter."""
+
+    def __init__(self, counter):
+        self.counter = counter
+        self.calls = 0
+
+    def count_tokens(self, messages, tools=()):
+        from mchat_core.model_context import REPLY_PRIMING_TOKENS
+
+        self.calls += 1
+        return sum(self.counter.count(messages)) + REPLY_PRIMING_TOKENS
+
+
+@pytest.mark.asyncio
+async def test_cached_token_context_against_autogen_1k_messages():
+    """Same view as autogen's TokenLimitedChatCompletionContext while the
+    history fits, with each message encoded once instead of every turn."""
+    from autogen_core.model_context import TokenLimitedChatCompletionContext
+    from autogen_core.models import AssistantMessage, UserMessage
+
+    from mchat_core.model_context import (
+        CachedTokenLimitedChatCompletionContext,
+        MessageTokenCounter,
+    )
+
+    encoding = _WordEncoding()
+    turns = 500  # 1k messages
+    text = "lorem ipsum dolor sit amet " * 20
+
+    def contexts(token_limit):
+        cached_encoding = _CountingEncoding(encoding)
+        cached = CachedTokenLimitedChatCompletionContext(
+            model_client=None,
+            token_limit=token_limit,
+            token_counter=MessageTokenCounter(encoding=cached_encoding),
+        )
+        autogen_encoding = _CountingEncoding(encoding)
+        client = _CountingClient(MessageTokenCounter(encoding=autogen_encoding))
+        reference = TokenLimitedChatCompletionContext(client, token_limit=token_limit)
+        return cached, cached_encoding, reference, autogen_encoding, client
+
+    cached, cached_encoding, reference, autogen_encoding, client = contexts(10**7)
+    for i in range(turns):
+        for message in (
+            UserMessage(content=f"{i} {text}", source="user"),
+            AssistantMessage(content=f"{i} {text}", source="ai"),
+        ):
+            await cached.add_message(message)
+            await reference.add_message(message)
+        assert await cached.get_messages() == await reference.get_messages()
+
+    # every message is encoded exactly once (content + source name), where
+    # autogen recounts the whole history on every get_messages()
+    assert cached_encoding.encoded == 2 * turns * 2
+    assert autogen_encoding.encoded == sum(2 * 2 * (i + 1) for i in range(turns))
+    assert client.calls == turns
+
+    # over the limit autogen drops from the middle and this context from the
+    # front; both views fit the limit and keep the latest message
+    token_limit = client.count_tokens([UserMessage(content=text, source="user")]) * 6
+    cached, cached_encoding, reference, autogen_encoding, client = contexts(
+        token_limit
+    )
+    for i in range(20):
+        message = UserMessage(content=f"{i} {text}", source="user")
+        await cached.add_message(message)
+        await reference.add_message(message)
+        view = await cached.get_messages()
+        expected = await reference.get_messages()
+        assert client.count_tokens(view) <= token_limit
+        assert client.count_tokens(expected) <= token_limit
+        assert view[-1] == expected[-1] == message
+        assert [m.content for m in view] == [
+            f"{j} {text}" for j in range(i + 1 - len(view), i + 1)
+        ]
+    assert len(view) == len(expected)
+    assert cached_encoding.encoded == 20 * 2
+
+
+class _EchoClient:
+    """Minimal model client recording the messages of each request."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, messages, **kwargs):
+        from autogen_core.models import CreateResult, RequestUsage
+
+        self.requests.append(list(messages))
+        return CreateResult(
+            finish_reason="stop",
+            content="ok",
+            usage=RequestUsage(prompt_tokens=0, completion_tokens=0),
+            cached=False,
+        )
+
+
+@pytest.mark.asyncio
+async def test_context_fitting_client_trims_and_emits_event():
+    from autogen_core.models import AssistantMessage, SystemMessage, UserMessage
+
+    from mchat_core.model_context import (
+        ContextBudgetExceeded,
+        ContextFittingChatCompletionClient,
+        MessageTokenCounter,
+    )
+
+    inner = _EchoClient()
+    events = []
+
+    async def on_exceeded(event):
+        events.append(event)
+
+    client = ContextFittingChatCompletionClient(
+        inner,
+        max_context=100,
+        max_output=40,
+        model_id="test-model",
+        token_counter=MessageTokenCounter(encoding=_WordEncoding()),
+        on_budget_exceeded=on_exceeded,
+    )
+    small = [SystemMessage(content="be brief"), UserMessage(content="hi", source="user")]
+    await client.create(small)
+    assert inner.requests[-1] == small
+    assert events == []
+
+    history = [SystemMessage(content="be brief")]
+    for i in range(10):
+        history.append(UserMessage(content=f"question number {i}", source="user"))
+        history.append(AssistantMessage(content=f"answer number {i}", source="ai"))
+    history.append(UserMessage(content="last question", source="user"))
+    await client.create(history)
+
+    sent = inner.requests[-1]
+    assert sent[0].content == "be brief"
+    assert sent[-1].content == "last question"
+    assert len(sent) < len(history)
+    assert len(events) == 1
+    event = events[0]
+    assert isinstance(event, ContextBudgetExceeded)
+    assert event.budget == 60
+    assert event.tokens > 60 >= event.fitted_tokens
+    assert event.dropped_messages == len(history) - len(sent)
+
+
+@pytest.mark.asyncio
+async def test_context_fitting_client_keeps_tool_calls_with_results():
+    from autogen_core.models import (
+        AssistantMessage,
+        FunctionExecutionResult,
+        FunctionExecutionResultMessage,
+        SystemMessage,
+        UserMessage,
+    )
+    from autogen_core import FunctionCall
+
+    from mchat_core.model_context import (
+        ContextFittingChatCompletionClient,
+        MessageTokenCounter,
+    )
+
+    def tool_pair(i, words):
+        call = AssistantMessage(
+            content=[FunctionCall(id=f"c{i}", name="lookup", arguments="{}")],
+            source="ai",
+        )
+        result = FunctionExecutionResultMessage(
+            content=[
+                FunctionExecutionResult(
+                    call_id=f"c{i}", name="lookup", content=" ".join(["word"] * words)
+                )
+            ]
+        )
+        return [call, result]
+
+    inner = _EchoClient()
+    client = ContextFittingChatCompletionClient(
+        inner,
+        max_context=60,
+        token_counter=MessageTokenCounter(encoding=_WordEncoding()),
+    )
+    history = [SystemMessage(content="be brief")]
+    for i in range(4):
+        history.append(UserMessage(content=f"look up number {i}", source="user"))
+        history += tool_pair(i, 10)
+    await client.create(history)
+
+    # the request ends with a tool result, which keeps its call
+    sent = inner.requests[-1]
+    assert len(sent) < len(history)
+    assert sent[0].content == "be brief"
+    assert sent[-1] is history[-1]
+    assert sent[-2] is history[-2]
+    for i, message in enumerate(sent):
+        if isinstance(message, FunctionExecutionResultMessage):
+            assert isinstance(sent[i - 1].content, list)
+
+    # a pair that does not fit on its own cannot be split
+    with pytest.raises(ValueError, match="tool call"):
+        await client.create(history[:2] + tool_pair(9, 100))
+    assert len(inner.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_fit_to_model_reports_to_agent_callback(
+    dynaconf_test_settings, patch_tools
+):
+    from mchat_core.agent_manager import AutogenManager
+    from mchat_core.model_context import ContextBudgetExceeded
+
+    calls = []
+
+    async def agent_callback(message, **kwargs):
+        calls.append((message, kwargs))
+
+    agents = {
+        "fit": {
+            "type": "agent",
+            "description": "desc",
+            "prompt": "hi",
+            "context": {"type": "buffered", "buffer_size": 10, "fit_to_model": True},
+        },
+    }
+    m = AutogenManager(
+        message_callback=lambda *a, **kw: None,
+        agent_callback=agent_callback,
+        agents=agents,
+    )
+    m.mm.config["gpt-4_1"]._max_context = 1000
+    session = await m.new_conversation(agent="fit")
+    event = ContextBudgetExceeded(model="gpt-4_1", tokens=1200, budget=1000, fitted_tokens=900)
+    await session.agent._model_client._on_budget_exceeded(event)
+
+    [(message, kwargs)] = calls
+    assert isinstance(message, str)
+    assert "1200 > 1000" in message
+    assert kwargs == {"event": event}
+
+
+@pytest.mark.asyncio
+async def test_context_fitting_client_compacts_summarizing_context():
+    from autogen_core.models import AssistantMessage, SystemMessage, UserMessage
+
+    from mchat_core.model_context import (
+        ContextFittingChatCompletionClient,
+        MessageTokenCounter,
+        SummarizingChatCompletionContext,
+    )
+
+    ctx = SummarizingChatCompletionContext(
+        summary_client=_FakeSummaryClient(),
+        token_threshold=10_000,  # never compacts on its own
+        tail_size=2,
+        token_counter=_word_counter,
+    )
+    for i in range(8):
+        await ctx.add_message(UserMessage(content=f"hello there number {i}", source="user"))
+        await ctx.add_message(AssistantMessage(content=f"hi {i}", source="ai"))
+
+    inner = _EchoClient()
+    events = []
+
+    async def on_exceeded(event):
+        events.append(event)
+
+    client = ContextFittingChatCompletionClient(
+        inner,
+        max_context=80,
+        model_context=ctx,
+        token_counter=MessageTokenCounter(encoding=_WordEncoding()),
+        on_budget_exceeded=on_exceeded,
+    )
+    system = [SystemMessage(content="be brief")]
+    await client.create(system + await ctx.get_messages())
+
+    sent = inner.requests[-1]
+    assert ctx.summary == "the user said hello a lot"
+    assert sent[0].content == "be brief"
+    assert sent[1].source == "summary"
+    assert sent[-1].content == "hi 7"
+    assert events[0].compacted is True
+
+
+@pytest.mark.asyncio
+async def test_fit_to_model_wraps_agent_model_client(dynaconf_test_settings, patch_tools):
+    from mchat_core.agent_manager import AutogenManager
+    from mchat_core.model_context import ContextFittingChatCompletionClient
+
+    agents = {
+        "fit": {
+            "type": "agent",
+            "description": "desc",
+            "prompt": "hi",
+            "context": {"type": "buffered", "buffer_size": 10, "fit_to_model": True},
+        },
+        "nofit": {"type": "agent", "description": "desc", "prompt": "hi"},
+    }
+    m = AutogenManager(message_callback=lambda *a, **kw: None, agents=agents)
+    m.mm.config["gpt-4_1"]._max_context = 1000
+    m.mm.config["gpt-4_1"]._max_output = 200
+
+    session = await m.new_conversation(agent="fit")
+    client = session.agent._model_client
+    assert isinstance(client, ContextFittingChatCompletionClient)
+    assert client.budget == 800
+    assert client.model_info == client.client.model_info
+
+    session = await m.new_conversation(agent="nofit")
+    assert not isinstance(session.agent._model_client, ContextFittingChatCompletionClient)
+
+
+def test_prompt_prefix_without_system_prompt_support():
+    from mchat_core.model_context import MessageTokenCounter, PromptPrefix
+
+    prefix = PromptPrefix.build(
+        "bot",
+        "be nice",
+        [("human", "hi"), ("ai", "hello")],
+        system_prompt_support=False,
+        token_counter=MessageTokenCounter(encoding=_WordEncoding()),
+    )
+    assert prefix.system_message is None
+    assert [m.content for m in prefix.messages] == ["be nice", "hi", "hello"]
+    assert prefix.messages[2].source == "bot"
+    assert prefix.token_count == sum(
+        MessageTokenCounter(encoding=_WordEncoding()).count(prefix.messages)
+    )
+
+    with pytest.raises(ValueError, match="system message not implemented"):
+        PromptPrefix.build("bot", "x", [("system", "nope")])
+    with pytest.raises(ValueError, match="Unknown extra context type"):
+        PromptPrefix.build("bot", "x", [("robot", "beep")])
@@ -195,6 +195,35 @@ def test_open_model_azure_chat_with_token_provider(dynaconf_test_settings):
     assert mm2.azure_token_provider is None
 
 
+def test_open_model_azure_image_uses_azure_clients(dynaconf_test_settings):
+    """
+    An Azure image model gets Azure clients for both arun and the
+    synchronous run.
+    """
+    from openai import AsyncAzureOpenAI, AzureOpenAI
+
+    from mchat_core.model_manager import ModelManager
+    dynaconf_test_settings.set(
+        "models__image__azure-dalle",
+        {
+            "api_key": "azure-key",
+            "azure_deployment": "dalle",
+            "api_version": "2024-02-01",
+            "azure_endpoint": "https://myazure.endpoint",
+            "model": "dall-e-3",
+            "api_type": "azure",
+            "size": "1024x1024",
+            "quality": "standard",
+            "num_images": 1,
+        },
+    )
+    mm = ModelManager(settings_conf=dynaconf_test_settings)
+    wrapper = mm.open_model("azure-dalle")
+    assert isinstance(wrapper.client, AsyncAzureOpenAI)
+    assert isinstance(wrapper._sync_client, AzureOpenAI)
+    assert wrapper._sync_client.api_key == "azure-key"
+
+
 def test_open_model_invalid_model_type(dynaconf_test_settings):
     """
     Test that if config tries to open a model_type that isn't 'chat', 'image',
@@ -215,18 +244,22 @@ def test_open_model_invalid_model_type(dynaconf_test_settings):
     assert "Invalid model_type" in str(exc.value)
 
 
-@patch("mchat_core.model_manager.OpenAIChatCompletionClient")
-def test_open_model_embedding_should_fail_by_default(mock_openai, dynaconf_test_settings):
+def test_open_model_embedding_returns_embedding_client(dynaconf_test_settings, tmp_path):
     """
-    The code as written only supports opening chat or image models.
-    Attempting to open an embedding model raises ValueError,
-    unless you later extend the logic for embeddings.
+    Embedding models open as an async EmbeddingClient; the on-disk vector
+    cache is off unless requested.
     """
+    from mchat_core.embeddings import EmbeddingCache, EmbeddingClient
     from mchat_core.model_manager import ModelManager
     mm = ModelManager()
-    with pytest.raises(ValueError) as exc:
-        mm.open_model("text-embedding-ada-002")
-    assert "Invalid model_type" in str(exc.value)
+    client = mm.open_model("text-embedding-ada-002")
+    assert isinstance(client, EmbeddingClient)
+    assert client.model == "text-embedding-ada-002"
+    assert client.cache is None
+    cache = EmbeddingCache(str(tmp_path / "vectors.sqlite"))
+    client = mm.open_model("text-embedding-ada-002", cache=cache, max_concurrency=2)
+    assert client.cache is cache
+    assert client.max_concurrency == 2
 
 
 @patch("mchat_core.model_manager.ModelManager.open_model")
@@ -0,0 +1,189 @@
+import asyncio
+import importlib.machinery
+import sys
+import types
+
+import pytest
+
+
+class FakeCollection:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, query_texts, n_results, include):
+        self.queries.append((list(query_texts), n_results))
+        return {
+            "ids": [[f"{text}:{i}" for i in range(n_results)] for text in query_texts],
+            "documents": [
+                [f"{text} {i}" for i in range(n_results)] for text in query_texts
+            ],
+            "metadatas": [
+                [{"filename": f"{text}.md"}] * n_results for text in query_texts
+            ],
+        }
+
+
+@pytest.fixture
+def fake_chromadb(monkeypatch):
+    """A stand-in chromadb recording the clients and collections opened."""
+    opened = {"clients": [], "collections": []}
+    collection = FakeCollection()
+
+    class PersistentClient:
+        def __init__(self, path):
+            opened["clients"].append(path)
+
+        def get_collection(self, name, **kwargs):
+            opened["collections"].append((name, kwargs))
+            return collection
+
+    module = types.ModuleType("chromadb")
+    module.__spec__ = importlib.machinery.ModuleSpec("chromadb", None)
+    module.PersistentClient = PersistentClient
+    monkeypatch.setitem(sys.modules, "chromadb", module)
+
+    from mchat_core.tools import _rag
+
+    for cache in ("_clients", "_collections", "_batchers", "_lexical_indexes"):
+        monkeypatch.setattr(_rag, cache, {})
+    return _rag, opened, collection
+
+
+@pytest.mark.asyncio
+async def test_rag_opens_lazily_and_batches_concurrent_queries(
+    fake_chromadb, monkeypatch, tmp_path
+):
+    _rag, opened, collection = fake_chromadb
+    monkeypatch.setattr(
+        _rag, "settings", {"rag_path": str(tmp_path), "rag_collection": "rules"}
+    )
+
+    tool = _rag.Rag()
+    assert tool.is_callable
+    # nothing is opened until the first query
+    assert opened["clients"] == []
+
+    results = await asyncio.gather(
+        tool.arun("energy", 2), tool.arun("trainer", 3), tool.arun("retreat", 1)
+    )
+    assert results[0] == [
+        {"content": "energy 0", "source": "Document energy.md"},
+        {"content": "energy 1", "source": "Document energy.md"},
+    ]
+    assert [len(r) for r in results] == [2, 3, 1]
+    # one call for the three concurrent queries, with the most candidates asked
+    assert collection.queries == [(["energy", "trainer", "retreat"], 20)]
+
+    # the client and collection handle are reused, also by new tool instances
+    await _rag.Rag().arun("prize", 1)
+    assert opened["clients"] == [str(tmp_path)]
+    assert opened["collections"] == [("rules", {})]
+    assert len(collection.queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_rag_query_errors_reach_every_caller(fake_chromadb):
+    _rag, _, _ = fake_chromadb
+
+    def broken():
+        raise RuntimeError("Collection docs does not exist")
+
+    batcher = _rag.QueryBatcher(broken)
+    results = await asyncio.gather(
+        batcher.query("a", 1), batcher.query("b", 1), return_exceptions=True
+    )
+    assert [str(r) for r in results] == ["Collection docs does not exist"] * 2
+    assert batcher.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_rag_embeds_queries_with_the_ingestion_model(fake_chromadb):
+    _rag, _, _ = fake_chromadb
+    embedded = []
+    queried = {}
+
+    async def embed(texts):
+        embedded.append(texts)
+        return [[float(len(t))] for t in texts]
+
+    class Collection:
+        def query(self, **kwargs):
+            queried.update(kwargs)
+            n = len(kwargs["query_embeddings"])
+            return {
+                "ids": [["a"]] * n,
+                "documents": [["doc"]] * n,
+                "metadatas": [[{}]] * n,
+            }
+
+    batcher = _rag.QueryBatcher(Collection, embed=embed)
+    await asyncio.gather(batcher.query("a", 1), batcher.query("bb", 1))
+    # one embedding request for the batch, and no query_texts for Chroma
+    assert embedded == [["a", "bb"]]
+    assert queried["query_embeddings"] == [[1.0], [2.0]]
+    assert "query_texts" not in queried
+
+
+@pytest.mark.asyncio
+async def test_rag_fuses_keyword_matches_dedupes_and_packs(
+    fake_chromadb, monkeypatch, tmp_path
+):
+    from mchat_core.tools.rag_index import LexicalIndex, lexical_index_path
+
+    _rag, _, collection = fake_chromadb
+    monkeypatch.setattr(_rag, "settings", {"rag_path": str(tmp_path)})
+    # what an ingestion run leaves next to the store
+    index = LexicalIndex(lexical_index_path(str(tmp_path), "docs"))
+    index.add(
+        "rules.md:1",
+        "Rule 4.2.1: Pikachu-EX may retreat for free.",
+        {"filename": "rules.md"},
+    )
+    index.add("rules.md:2", "Energy cards attach once per turn.", {"filename": "x"})
+    index.save()
+
+    tool = _rag.Rag()
+    results = await tool.arun("rule 4.2.1", num_results=3)
+    # the exact-term match is not among the vector results, but is fused in
+    contents = [r["content"] for r in results]
+    assert "Rule 4.2.1: Pikachu-EX may retreat for free." in contents
+    assert results[1]["source"] == "Document rules.md"
+    assert len(results) == 3
+
+    # a token budget replaces num_results
+    packed = await tool.arun("rule 4.2.1", max_tokens=12)
+    assert 1 <= len(packed) < 20
+    assert sum(len(r["content"]) for r in packed) < 12 * 8
+
+
+def test_lexical_index_ranks_exact_terms_and_persists(tmp_path):
+    from mchat_core.tools.rag_index import (
+        LexicalIndex,
+        dedupe,
+        pack_to_budget,
+        reciprocal_rank_fusion,
+    )
+
+    path = str(tmp_path / "docs.lexical.json")
+    index = LexicalIndex(path)
+    index.add("a", "Pikachu-EX has 170 HP")
+    index.add("b", "Pikachu is an electric Pokemon, Pikachu evolves")
+    index.add("c", "Trainer cards")
+    assert [id for id, _ in index.search("pikachu-ex", 5)] == ["a", "b"]
+    index.remove(["a"])
+    index.save()
+
+    reloaded = LexicalIndex(path)
+    assert [id for id, _ in reloaded.search("pikachu", 5)] == ["b"]
+    assert len(reloaded) == 2
+
+    assert reciprocal_rank_fusion([["x", "y"], ["y", "z"]]) == ["y", "x", "z"]
+    near = [
+        {"content": "the quick brown fox jumps over the lazy dog"},
+        {"content": "The quick brown fox jumps over the lazy dog."},
+        {"content": "an entirely different passage of text"},
+    ]
+    assert dedupe(near) == [near[0], near[2]]
+    # the second does not fit the 6 words left, the third does
+    words = lambda text: len(text.split())  # noqa: E731
+    assert pack_to_budget(near, 15, words) == [near[0], near[2]]
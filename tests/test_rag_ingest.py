@@ -0,0 +1,182 @@
+import asyncio
+import os
+
+import pytest
+
+from mchat_core.tools.rag_ingest import RagIngestor, chunk_text, document_chunks
+
+from .conftest import require_pkgs
+
+
+class MemoryCollection:
+    """The parts of a Chroma collection used by ingestion, in memory."""
+
+    def __init__(self):
+        self.records: dict[str, dict] = {}
+
+    def get(self, where, include):
+        source = where["source"]
+        ids = [id for id, r in self.records.items() if r["source"] == source]
+        return {"ids": ids}
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        for id, document, metadata, embedding in zip(
+            ids, documents, metadatas, embeddings, strict=True
+        ):
+            self.records[id] = {
+                **metadata,
+                "document": document,
+                "embedding": embedding,
+            }
+
+    def delete(self, ids):
+        for id in ids:
+            self.records.pop(id, None)
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.texts = []
+        self.batches = 0
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, texts):
+        self.batches += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        self.texts.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+
+def paragraphs(prefix, n):
+    return "\n\n".join(f"{prefix} paragraph {i} " + "word " * 30 for i in range(n))
+
+
+def test_chunk_text_breaks_at_boundaries_with_overlap():
+    text = paragraphs("p", 5)
+    chunks = chunk_text(text, chunk_size=400, overlap=50)
+    assert all(len(chunk) <= 400 for chunk in chunks)
+    # every chunk ends on a paragraph or word boundary
+    assert all(chunk.endswith("word") for chunk in chunks)
+    assert "".join(chunks).count("paragraph 4") >= 1
+    with pytest.raises(ValueError):
+        chunk_text(text, chunk_size=100, overlap=100)
+
+    # ids depend on content, not position; repeated passages stay distinct
+    chunks = document_chunks("doc.md", "same same same", 5, 0)
+    assert [c.text for c in chunks] == ["same"] * 3
+    assert len({c.id for c in chunks}) == 3
+    assert len({c.id.rsplit(":", 1)[0] for c in chunks}) == 1
+
+
+@pytest.mark.asyncio
+async def test_ingest_embeds_only_new_and_changed_chunks(tmp_path):
+    corpus = tmp_path / "corpus"
+    (corpus / "rules").mkdir(parents=True)
+    (corpus / "rules" / "energy.md").write_text(paragraphs("energy", 6))
+    (corpus / "trainers.txt").write_text(paragraphs("trainer", 6))
+    (corpus / "notes.json").write_text("{}")
+    collection = MemoryCollection()
+    embed = CountingEmbedder()
+    ingestor = RagIngestor(
+        collection,
+        embed,
+        chunk_size=400,
+        overlap=50,
+        batch_size=2,
+        max_concurrency=2,
+        manifest_path=str(tmp_path / "manifest.json"),
+    )
+
+    report = await ingestor.ingest(str(corpus))
+    assert report.files == 2
+    assert report.changed_files == ["rules/energy.md", "trainers.txt"]
+    assert report.embedded == len(collection.records) == len(embed.texts)
+    assert embed.batches == -(-report.embedded // 2)
+    assert embed.peak == 2
+    record = next(iter(collection.records.values()))
+    assert record["filename"] in ("energy.md", "trainers.txt")
+
+    # nothing changed: no file is read and nothing is embedded
+    embed.texts.clear()
+    report = await ingestor.ingest(str(corpus))
+    assert report.changed_files == [] and embed.texts == []
+
+    # one paragraph edited, one file removed
+    energy = corpus / "rules" / "energy.md"
+    energy.write_text(energy.read_text().replace("energy paragraph 5", "EDITED"))
+    stat = os.stat(energy)
+    os.utime(energy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (corpus / "trainers.txt").unlink()
+    report = await ingestor.ingest(str(corpus))
+    assert report.changed_files == ["rules/energy.md"]
+    assert report.removed_files == ["trainers.txt"]
+    assert 0 < report.embedded < report.kept
+    assert all("EDITED" in text or "paragraph 4" in text for text in embed.texts)
+    assert {r["source"] for r in collection.records.values()} == {"rules/energy.md"}
+    assert any("EDITED" in r["document"] for r in collection.records.values())
+    assert not any(
+        "energy paragraph 5" in r["document"] for r in collection.records.values()
+    )
+
+
+@pytest.mark.asyncio
+async def test_ingest_reads_pdfs(tmp_path):
+    require_pkgs(["pypdf"])
+    from .test_web_fetch import make_pdf
+
+    (tmp_path / "rulebook.pdf").write_bytes(make_pdf("Retreat costs", "Prize cards"))
+    collection = MemoryCollection()
+    await RagIngestor(collection, CountingEmbedder()).ingest(str(tmp_path))
+    [record] = collection.records.values()
+    assert "Retreat costs" in record["document"]
+    assert "Prize cards" in record["document"]
+    assert record["source"] == "rulebook.pdf"
+
+
+@pytest.mark.asyncio
+async def test_ingest_keeps_the_lexical_index_in_sync(tmp_path):
+    from mchat_core.tools.rag_index import LexicalIndex
+
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "a.md").write_text(paragraphs("alpha", 3))
+    (corpus / "b.md").write_text(paragraphs("beta", 3))
+    collection = MemoryCollection()
+    manifest = str(tmp_path / "manifest.json")
+    index_path = str(tmp_path / "docs.lexical.json")
+    await RagIngestor(collection, CountingEmbedder(), manifest_path=manifest).ingest(
+        str(corpus)
+    )
+
+    # an index added later is filled from the files, without embedding again
+    embed = CountingEmbedder()
+    index = LexicalIndex(index_path)
+    ingestor = RagIngestor(
+        collection, embed, manifest_path=manifest, lexical_index=index
+    )
+    await ingestor.ingest(str(corpus))
+    assert embed.texts == []
+    assert set(index.docs) == set(collection.records)
+
+    (corpus / "b.md").unlink()
+    await ingestor.ingest(str(corpus))
+    assert set(LexicalIndex(index_path).docs) == set(collection.records)
+    assert [id for id, _ in index.search("beta", 5)] == []
+
+    # a file removed while the index is empty is still dropped from the store
+    (corpus / "c.md").write_text(paragraphs("gamma", 3))
+    await ingestor.ingest(str(corpus))
+    (corpus / "a.md").unlink()
+    embed = CountingEmbedder()
+    index = LexicalIndex(str(tmp_path / "new.lexical.json"))
+    report = await RagIngestor(
+        collection, embed, manifest_path=manifest, lexical_index=index
+    ).ingest(str(corpus))
+    assert report.removed_files == ["a.md"]
+    assert embed.texts == []
+    assert set(index.docs) == set(collection.records)
+    assert [id for id, _ in index.search("alpha", 5)] == []
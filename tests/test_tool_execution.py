@@ -0,0 +1,476 @@
+import asyncio
+import json
+
+import pytest
+from autogen_core import CancellationToken
+from autogen_core.tools import FunctionTool
+
+from mchat_core.tool_execution import (
+    READ_TOOL_NAME,
+    CachedTool,
+    ManagedTool,
+    StagedTool,
+    ToolCachePolicy,
+    ToolExecutionStage,
+    ToolOutputPolicy,
+    ToolResultCache,
+    ToolResultStore,
+    count_text_tokens,
+    policy_for,
+    project_json,
+    resolve_cache_policy,
+    resolve_execution_policy,
+    resolve_output_policies,
+    truncate_text,
+)
+
+
+def make_tool(payload: str, name: str = "big_tool") -> FunctionTool:
+    def big_tool(query: str = "") -> str:
+        return payload
+
+    return FunctionTool(big_tool, name=name, description="returns a lot")
+
+
+class FakeSummaryClient:
+    def __init__(self, reply="short summary", fail=False):
+        self.reply = reply
+        self.fail = fail
+        self.calls = 0
+
+    async def create(self, messages, **kwargs):
+        from autogen_core.models import CreateResult, RequestUsage
+
+        self.calls += 1
+        self.messages = messages
+        if self.fail:
+            raise RuntimeError("model down")
+        return CreateResult(
+            finish_reason="stop",
+            content=self.reply,
+            usage=RequestUsage(prompt_tokens=0, completion_tokens=0),
+            cached=False,
+        )
+
+
+def test_project_json_dotted_paths_and_lists():
+    data = {
+        "title": "GDP",
+        "units": "billions",
+        "observations": [
+            {"date": "2024-01-01", "value": "1", "realtime_start": "x"},
+            {"date": "2024-04-01", "value": "2", "realtime_start": "y"},
+        ],
+    }
+    projected = project_json(data, ["title", "observations.date", "observations.value"])
+    assert projected == {
+        "title": "GDP",
+        "observations": [
+            {"date": "2024-01-01", "value": "1"},
+            {"date": "2024-04-01", "value": "2"},
+        ],
+    }
+
+
+@pytest.mark.parametrize("strategy", ["head", "tail", "head_tail"])
+def test_truncate_text_strategies(strategy):
+    text = " ".join(f"word{i}" for i in range(2000))
+    out = truncate_text(text, 50, strategy)
+    assert len(out) < len(text) / 4
+    assert "omitted" in out
+    if strategy in ("head", "head_tail"):
+        assert out.startswith("word0")
+    if strategy in ("tail", "head_tail"):
+        assert out.endswith("word1999")
+    assert truncate_text("short", 50, strategy) == "short"
+
+
+def test_resolve_output_policies_overrides():
+    agent = {
+        "tools": ["google_search", "fetch_fred_data", "today"],
+        "tool_output": {
+            "max_tokens": 1000,
+            "tools": {
+                "fetch_fred_data": {"fields": ["observations"], "max_tokens": 300},
+                "today": {"max_tokens": None},
+            },
+        },
+    }
+    policies = resolve_output_policies(agent)
+    assert policy_for(policies, "google_search").max_tokens == 1000
+    fred = policy_for(policies, "fetch_fred_data")
+    assert fred.max_tokens == 300 and fred.fields == ["observations"]
+    # explicitly disabled for one tool, even though the agent default is active
+    assert policy_for(policies, "today") is None
+    # no tool_output configured: nothing is compacted
+    assert policy_for(resolve_output_policies({"tools": ["x"]}), "x") is None
+
+    with pytest.raises(ValueError):
+        resolve_output_policies({"tool_output": {"strategy": "shrink"}})
+    with pytest.raises(ValueError):
+        resolve_output_policies({"tool_output": {"max_token": 10}})
+
+
+@pytest.mark.asyncio
+async def test_managed_tool_caps_output_and_stores_full_result():
+    payload = "lorem ipsum " * 2000
+    store = ToolResultStore()
+    tool = ManagedTool(make_tool(payload), ToolOutputPolicy(max_tokens=100), store)
+    assert tool.name == "big_tool"
+    assert tool.schema == make_tool(payload).schema
+
+    out = await tool.run_json({"query": "x"}, CancellationToken())
+    assert len(out) < len(payload) / 4
+    assert "compacted" in out
+    assert len(store) == 1
+
+    handle = out.split("handle '")[1].split("'")[0]
+    assert store.get(handle) == payload
+    read = await store.as_tool().run_json(
+        {"handle": handle, "offset": 100, "length": 50}, CancellationToken()
+    )
+    assert read.endswith(payload[100:150])
+    assert "no stored tool result" in store.read("res_missing")
+
+
+@pytest.mark.asyncio
+async def test_managed_tool_projects_json_fields():
+    payload = json.dumps(
+        {"title": "GDP", "notes": "n" * 500, "observations": [{"value": "1"}]}
+    )
+    tool = ManagedTool(
+        make_tool(payload),
+        ToolOutputPolicy(fields=["title", "observations"], store=False),
+        ToolResultStore(),
+    )
+    out = await tool.run_json({}, CancellationToken())
+    projected, note = out.split("\n[", 1)
+    assert json.loads(projected) == {"title": "GDP", "observations": [{"value": "1"}]}
+    assert "handle" not in note
+
+
+@pytest.mark.asyncio
+async def test_managed_tool_small_output_is_untouched():
+    store = ToolResultStore()
+    tool = ManagedTool(make_tool("tiny"), ToolOutputPolicy(max_tokens=100), store)
+    assert await tool.run_json({}, CancellationToken()) == "tiny"
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio
+async def test_managed_tool_summarize_and_fallback():
+    payload = "data " * 3000
+    client = FakeSummaryClient()
+    tool = ManagedTool(
+        make_tool(payload),
+        ToolOutputPolicy(max_tokens=50, strategy="summarize"),
+        ToolResultStore(),
+        summary_client=client,
+    )
+    out = await tool.run_json({}, CancellationToken())
+    assert out.startswith("short summary")
+    assert client.calls == 1
+
+    # a failing summarizer falls back to head/tail truncation
+    tool.summary_client = FakeSummaryClient(fail=True)
+    out = await tool.run_json({}, CancellationToken())
+    assert "omitted" in out
+
+
+@pytest.mark.asyncio
+async def test_managed_tool_fits_output_to_summary_model():
+    payload = "data " * 30000
+    client = FakeSummaryClient()
+    tool = ManagedTool(
+        make_tool(payload),
+        ToolOutputPolicy(max_tokens=50, strategy="summarize"),
+        ToolResultStore(),
+        summary_client=client,
+        summary_budget=1000,
+    )
+    out = await tool.run_json({}, CancellationToken())
+    assert out.startswith("short summary")
+    [message] = client.messages
+    assert "omitted" in message.content
+    assert count_text_tokens(message.content) <= 1000
+
+    # no room for any output at all: truncate instead of calling the model
+    tool.summary_budget = 10
+    out = await tool.run_json({}, CancellationToken())
+    assert "omitted" in out
+    assert client.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_agent_tools_are_wrapped_per_policy(dynaconf_test_settings, patch_tools):
+    from mchat_core.agent_manager import AutogenManager
+
+    agents = {
+        "researcher": {
+            "type": "agent",
+            "description": "desc",
+            "prompt": "hi",
+            "tools": ["big_tool", "google_search"],
+            "tool_output": {"max_tokens": 100},
+        }
+    }
+    m = AutogenManager(message_callback=lambda *a, **kw: None, agents=agents)
+    m.tools["big_tool"] = make_tool("x " * 5000)
+    session = await m.new_conversation(agent="researcher")
+
+    tools = {t.name: t for t in session.agent._workbench[0]._tools}
+    assert isinstance(tools["big_tool"], ManagedTool)
+    assert READ_TOOL_NAME in tools
+
+
+class CountingTool:
+    """A mchat-style tool whose bound run method is wrapped in a FunctionTool."""
+
+    cacheable = True
+    cache_ttl = 60
+
+    def __init__(self, fail=False, delay=0.0):
+        self.calls = 0
+        self.fail = fail
+        self.delay = delay
+
+    async def run(self, query: str, limit: int = 5) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return f"{query}:{limit}:{self.calls}"
+
+    def as_tool(self) -> FunctionTool:
+        return FunctionTool(self.run, name="lookup", description="looks up")
+
+
+def test_resolve_cache_policy_sources():
+    tool = CountingTool().as_tool()
+    policy = resolve_cache_policy({}, tool)
+    assert policy.enabled and policy.ttl == 60
+
+    # the tool's own ttl wins over the agent's; per-tool overrides win over both
+    assert resolve_cache_policy({"tool_cache": {"ttl": 10}}, tool).ttl == 60
+    override = {"tool_cache": {"ttl": 10, "tools": {"lookup": {"ttl": 5}}}}
+    assert resolve_cache_policy(override, tool).ttl == 5
+    disabled = {"tool_cache": {"tools": {"lookup": {"enabled": False}}}}
+    assert resolve_cache_policy(disabled, tool) is None
+    assert resolve_cache_policy({"tool_cache": {"enabled": False}}, tool) is None
+
+    # agent-level enabled does not cache tools that are not cacheable
+    plain = make_tool("x")
+    assert resolve_cache_policy({}, plain) is None
+    assert resolve_cache_policy({"tool_cache": {"enabled": True}}, plain) is None
+    enabled = {"tool_cache": {"ttl": 10, "tools": {"big_tool": {"enabled": True}}}}
+    assert resolve_cache_policy(enabled, plain).ttl == 10
+
+    with pytest.raises(ValueError):
+        resolve_cache_policy({"tool_cache": {"max_age": 1}}, plain)
+
+
+def test_mcp_annotations_enable_caching():
+    from autogen_ext.tools.mcp import StdioServerParams
+
+    from mchat_core.tool_utils import mcp_tools_from_schemas
+
+    schemas = [
+        {"name": "read", "inputSchema": {"type": "object"}},
+        {"name": "write", "inputSchema": {"type": "object"}},
+    ]
+    schemas[0]["annotations"] = {"readOnlyHint": True}
+    adapters = mcp_tools_from_schemas(StdioServerParams(command="x"), schemas)
+    assert resolve_cache_policy({}, adapters["read"]).enabled
+    assert resolve_cache_policy({}, adapters["write"]) is None
+
+
+@pytest.mark.asyncio
+async def test_cached_tool_hits_ttl_and_eviction():
+    backend = CountingTool()
+    cache = ToolResultCache(max_entries=2)
+    tool = CachedTool(backend.as_tool(), ToolCachePolicy(enabled=True), cache)
+    ct = CancellationToken()
+
+    first = await tool.run_json({"query": "gdp"}, ct, call_id="c1")
+    # same call with the default spelled out and keys reordered is a hit
+    again = await tool.run_json({"limit": 5, "query": "gdp"}, ct, call_id="c2")
+    assert first == again == "gdp:5:1"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.pop_hits(["c1", "c2"]) == ["c2"]
+    assert cache.pop_hits(["c2"]) == []
+
+    await tool.run_json({"query": "cpi"}, ct)
+    await tool.run_json({"query": "pce"}, ct)
+    assert len(cache) == 2
+    # the least recently used entry ("gdp") was evicted
+    assert await tool.run_json({"query": "gdp"}, ct) == "gdp:5:4"
+
+    expiring = CachedTool(
+        backend.as_tool(), ToolCachePolicy(enabled=True, ttl=0.05), ToolResultCache()
+    )
+    await expiring.run_json({"query": "x"}, ct)
+    await asyncio.sleep(0.06)
+    await expiring.run_json({"query": "x"}, ct)
+    assert backend.calls == 6
+
+
+@pytest.mark.asyncio
+async def test_cached_tool_dedups_in_flight_and_skips_errors():
+    backend = CountingTool(delay=0.05)
+    cache = ToolResultCache()
+    tool = CachedTool(backend.as_tool(), ToolCachePolicy(enabled=True), cache)
+    ct = CancellationToken()
+
+    results = await asyncio.gather(
+        *(tool.run_json({"query": "q"}, ct, call_id=f"c{i}") for i in range(3))
+    )
+    assert len(set(results)) == 1
+    assert backend.calls == 1
+    assert cache.hits == 2
+
+    backend.fail = True
+    with pytest.raises(RuntimeError):
+        await tool.run_json({"query": "other"}, ct)
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_reported_on_execution_event(
+    dynaconf_test_settings, patch_tools
+):
+    from autogen_agentchat.messages import ToolCallExecutionEvent
+    from autogen_core.models import FunctionExecutionResult
+
+    from mchat_core.agent_manager import AutogenManager
+
+    agents = {
+        "researcher": {
+            "type": "agent",
+            "description": "desc",
+            "prompt": "hi",
+            "tools": ["lookup", "google_search"],
+        }
+    }
+    m = AutogenManager(agents=agents)
+    m.tools["lookup"] = CountingTool().as_tool()
+    session = await m.new_conversation(agent="researcher")
+    tools = {t.name: t for t in session.agent._workbench[0]._tools}
+    assert isinstance(tools["lookup"], CachedTool)
+
+    ct = CancellationToken()
+    await tools["lookup"].run_json({"query": "q"}, ct, call_id="first")
+    await tools["lookup"].run_json({"query": "q"}, ct, call_id="second")
+    event = ToolCallExecutionEvent(
+        source="researcher",
+        content=[
+            FunctionExecutionResult(content="r", name="lookup", call_id=call_id)
+            for call_id in ("first", "second")
+        ],
+    )
+    await session._handle_tool_call_execution(event)
+    assert event.metadata["cache_hits"] == "second"
+    assert session.tool_cache_hits == 1
+    # only the call that ran has a latency; the cache hit never reached the stage
+    assert event.metadata["latency_ms"].startswith("first=")
+    assert [r.call_id for r in session.last_tool_calls] == ["first"]
+
+
+def sleepy_tool(name: str) -> FunctionTool:
+    async def nap(seconds: float) -> str:
+        await asyncio.sleep(seconds)
+        return f"slept {seconds}"
+
+    return FunctionTool(nap, name=name, description="sleeps")
+
+
+def test_resolve_execution_policy():
+    agent = {"tool_execution": {"max_parallel": 2, "tools": {"nap": {"timeout": 5}}}}
+    assert resolve_execution_policy(agent).max_parallel == 2
+    assert resolve_execution_policy(agent).timeout is None
+    assert resolve_execution_policy(agent, "nap").timeout == 5
+    assert resolve_execution_policy({}).max_parallel == 4
+    with pytest.raises(ValueError):
+        resolve_execution_policy({"tool_execution": {"parallel": 2}})
+    with pytest.raises(ValueError):
+        resolve_execution_policy({"tool_execution": {"max_parallel": 0}})
+
+
+@pytest.mark.asyncio
+async def test_stage_runs_calls_in_parallel_and_reports_completion():
+    completed = []
+
+    async def on_complete(record, result):
+        completed.append((record.call_id, result))
+
+    stage = ToolExecutionStage(max_parallel=2, on_complete=on_complete)
+    tool = StagedTool(sleepy_tool("nap"), stage, source="researcher")
+    ct = CancellationToken()
+
+    start = asyncio.get_running_loop().time()
+    results = await asyncio.gather(
+        tool.run_json({"seconds": 0.2}, ct, call_id="a"),
+        tool.run_json({"seconds": 0.1}, ct, call_id="b"),
+        tool.run_json({"seconds": 0.05}, ct, call_id="c"),
+    )
+    elapsed = asyncio.get_running_loop().time() - start
+    # two slots: "c" waits for "b", everything finishes with the slowest call
+    assert 0.2 <= elapsed < 0.3
+    assert results == ["slept 0.2", "slept 0.1", "slept 0.05"]
+    # streamed in completion order
+    assert [call_id for call_id, _ in completed] == ["b", "c", "a"]
+
+    # records come back in the order asked for, with their latency
+    records = stage.pop_records(["a", "b", "c", None])
+    assert [r.call_id for r in records] == ["a", "b", "c"]
+    assert records[0].latency >= 0.2 and records[0].source == "researcher"
+    assert stage.pop_records(["a"]) == []
+
+
+@pytest.mark.asyncio
+async def test_stage_timeouts_are_reported():
+    completed = []
+
+    async def on_complete(record, result):
+        completed.append(record)
+
+    stage = ToolExecutionStage(on_complete=on_complete)
+    tool = StagedTool(sleepy_tool("nap"), stage, timeout=0.05)
+    with pytest.raises(TimeoutError, match="nap timed out"):
+        await tool.run_json({"seconds": 1}, CancellationToken(), call_id="x")
+    assert completed[0].timed_out
+    assert stage.in_flight == 0
+    assert stage.pop_records(["x"])[0].error.startswith("Tool nap timed out")
+
+
+@pytest.mark.asyncio
+async def test_stage_cancellation_reaches_running_and_queued_calls():
+    completed = []
+
+    async def on_complete(record, result):
+        completed.append(record)
+
+    stage = ToolExecutionStage(max_parallel=1, on_complete=on_complete)
+    tool = StagedTool(sleepy_tool("nap"), stage)
+    token = CancellationToken()
+    calls = [
+        asyncio.create_task(tool.run_json({"seconds": 10}, token, call_id=c))
+        for c in ("running", "queued")
+    ]
+    await asyncio.sleep(0.05)
+    assert stage.in_flight == 1
+
+    token.cancel()
+    for call in calls:
+        with pytest.raises(asyncio.CancelledError):
+            await call
+    assert stage.in_flight == 0
+    assert completed == []
+
+    # cancel_all stops running calls even without the token
+    call = asyncio.create_task(
+        tool.run_json({"seconds": 10}, CancellationToken(), call_id="x")
+    )
+    await asyncio.sleep(0.05)
+    assert stage.cancel_all() == 1
+    with pytest.raises(asyncio.CancelledError):
+        await call
@@ -90,4 +90,303 @@ def test_load_tools_module_import_failure_is_ignored(tmp_path):
     )
     tools = load_tools(str(tmp_path))
     # The faulty module should not break discovery; result remains empty.
-    assert tools == {}
\ No newline at end of file
+    assert tools == {}
+
+LAZY_TOOL_MODULE = """
+import os
+
+from mchat_core.tool_utils import BaseTool
+
+# record that the module was imported
+open(os.path.join(os.path.dirname(__file__), "imported.txt"), "a").write("x")
+
+
+class EchoTool(BaseTool):
+    name = "echo"
+    description = (
+        "Echo the text "
+        "back"
+    )
+
+    def run(self, text: str) -> str:
+        return text
+
+
+class UpperTool(BaseTool):
+    name = "upper"
+    description = "Upper-case the text"
+
+    def run(self, text: str) -> str:
+        return text.upper()
+
+
+class DisabledTool(BaseTool):
+    name = "disabled"
+    description = "Never loaded"
+    is_callable = False
+"""
+
+
+def test_load_tools_lazy_defers_import(tmp_path):
+    from mchat_core.tool_utils import LazyTool
+
+    write_module(tmp_path, "lazy_tools", LAZY_TOOL_MODULE)
+    marker = tmp_path / "imported.txt"
+    cache = str(tmp_path / "cache" / "manifest.json")
+
+    tools = load_tools(str(tmp_path), lazy=True, manifest_cache=cache)
+    assert set(tools) == {"echo", "upper"}
+    assert isinstance(tools["echo"], LazyTool)
+    assert tools["echo"].description == "Echo the text back"
+    assert tools["echo"].schema is None
+    assert not marker.exists()
+
+    echo = tools["echo"].load()
+    upper = tools["upper"].load()
+    assert echo.name == "echo" and upper.name == "upper"
+    # one import for both tools of the module
+    assert marker.read_text() == "x"
+
+    # the schema learned on import is kept in the manifest cache
+    again = load_tools(str(tmp_path), lazy=True, manifest_cache=cache)
+    assert again["echo"].schema["parameters"]["properties"]["text"]
+
+
+def test_tool_manifest_cache_invalidated_by_mtime(tmp_path):
+    import os
+
+    from mchat_core.tool_utils import ToolManifest
+
+    tools_dir = tmp_path / "tools"
+    tools_dir.mkdir()
+    module = write_module(tools_dir, "lazy_tools", LAZY_TOOL_MODULE)
+    cache = str(tmp_path / "manifest.json")
+    ToolManifest(str(tools_dir), cache)
+
+    # unchanged files are not parsed again
+    with patch("ast.parse", side_effect=AssertionError):
+        assert set(dict(ToolManifest(str(tools_dir), cache).entries)) == {
+            "echo",
+            "upper",
+        }
+
+    module.write_text(LAZY_TOOL_MODULE.replace('name = "upper"', 'name = "shout"'))
+    stat = os.stat(module)
+    os.utime(module, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert set(ToolManifest(str(tools_dir), cache).entries) == {"echo", "shout"}
+
+
+def test_load_tools_lazy_imports_uninspectable_modules(tmp_path):
+    write_module(
+        tmp_path,
+        "dynamic_tool",
+        """
+        from mchat_core.tool_utils import BaseTool
+        PREFIX = "dyn"
+        class DynamicTool(BaseTool):
+            name = f"{PREFIX}_tool"
+            description = "Name is computed"
+            def run(self) -> str:
+                return "ok"
+        """,
+    )
+    tools = load_tools(
+        str(tmp_path), lazy=True, manifest_cache=str(tmp_path / "m.json")
+    )
+    # not a LazyTool: the module had to be imported to learn the name
+    assert tools["dyn_tool"].name == "dyn_tool"
+    assert not hasattr(tools["dyn_tool"], "load")
+
+
+EXECUTOR_TOOL_MODULE = """
+import asyncio
+import os
+import threading
+import time
+
+from mchat_core.tool_utils import BaseTool
+
+
+class AsyncTool(BaseTool):
+    name = "async_tool"
+    description = "Native coroutine"
+
+    def run(self, text: str) -> str:
+        raise AssertionError("arun is preferred")
+
+    async def arun(self, text: str) -> str:
+        return text + "!"
+
+
+class ThreadTool(BaseTool):
+    name = "thread_tool"
+    description = "Blocking I/O"
+    timeout = 0.2
+
+    def run(self, delay: float = 0.0) -> str:
+        time.sleep(delay)
+        return threading.current_thread().name
+
+
+class ProcessTool(BaseTool):
+    name = "process_tool"
+    description = "CPU-bound work"
+    executor = "process"
+
+    def run(self, n: int) -> list[int]:
+        return [os.getpid(), sum(i * i for i in range(n))]
+"""
+
+
+@pytest.mark.asyncio
+async def test_tools_run_off_the_event_loop(tmp_path):
+    import asyncio
+
+    from autogen_core import CancellationToken
+
+    from mchat_core.tool_utils import shutdown_tool_executors
+
+    write_module(tmp_path, "executor_tools", EXECUTOR_TOOL_MODULE)
+    tools = load_tools(str(tmp_path))
+    ct = CancellationToken()
+
+    # schemas come from the wrapped method, not the dispatching coroutine
+    assert set(tools["async_tool"].schema["parameters"]["properties"]) == {"text"}
+    assert await tools["async_tool"].run_json({"text": "hi"}, ct) == "hi!"
+
+    # sync run() goes to the bounded thread pool while the loop keeps running
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    thread = await tools["thread_tool"].run_json({"delay": 0.1}, ct)
+    task.cancel()
+    assert thread.startswith("mchat-tool")
+    assert ticks >= 3
+
+    with pytest.raises(TimeoutError, match="thread_tool timed out"):
+        await tools["thread_tool"].run_json({"delay": 1.0}, ct)
+
+    try:
+        pid, total = await tools["process_tool"].run_json({"n": 10}, ct)
+    finally:
+        shutdown_tool_executors()
+    assert pid != os.getpid()
+    assert total == 285
+
+
+def test_process_executor_requires_module_file():
+    from mchat_core.tool_utils import configure_tool_executors
+
+    class Crunch(BaseTool):
+        executor = "process"
+
+        def run(self) -> int:
+            return 1
+
+    with pytest.raises(ValueError, match="module file"):
+        Crunch().as_coroutine_function()
+    with pytest.raises(ValueError):
+        configure_tool_executors(threads=0)
+
+
+CANCEL_TOOL_MODULE = """
+import time
+
+from mchat_core.tool_utils import BaseTool
+
+
+class PollingTool(BaseTool):
+    name = "polling_tool"
+    description = "Stops when cancelled"
+
+    def run(self, marker: str) -> str:
+        open(marker, "w").write("running")
+        while not self.wait_cancelled(0.01):
+            pass
+        open(marker, "w").write("stopped")
+        return "cancelled"
+
+
+class ProcessPollingTool(PollingTool):
+    name = "process_polling_tool"
+    executor = "process"
+
+
+class StuckTool(BaseTool):
+    name = "stuck_tool"
+    description = "Ignores cancellation"
+
+    def run(self, seconds: float) -> str:
+        time.sleep(seconds)
+        return "done"
+"""
+
+
+@pytest.mark.asyncio
+async def test_cancelled_sync_tools_stop_and_free_the_executor(tmp_path):
+    import asyncio
+
+    from autogen_core import CancellationToken
+
+    from mchat_core.tool_utils import configure_tool_executors, shutdown_tool_executors
+
+    write_module(tmp_path, "cancel_tools", CANCEL_TOOL_MODULE)
+    tools = load_tools(str(tmp_path))
+    ct = CancellationToken()
+    marker = tmp_path / "stopped.txt"
+
+    configure_tool_executors(threads=1)
+    try:
+        # a running call sees the cooperative flag
+        call = asyncio.create_task(
+            tools["polling_tool"].run_json({"marker": str(marker)}, ct)
+        )
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        await asyncio.sleep(0.1)
+        assert marker.read_text() == "stopped"
+
+        # a call that ignores the flag fills the only worker; it is abandoned and
+        # the next call runs in a fresh executor instead of waiting behind it
+        stuck = asyncio.create_task(tools["stuck_tool"].run_json({"seconds": 1}, ct))
+        await asyncio.sleep(0.05)
+        # queued behind it before it is abandoned; moves to the fresh executor
+        queued = asyncio.create_task(tools["stuck_tool"].run_json({"seconds": 0}, ct))
+        await asyncio.sleep(0.05)
+        stuck.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await stuck
+        result = await asyncio.wait_for(
+            tools["stuck_tool"].run_json({"seconds": 0}, ct), 0.5
+        )
+        assert result == "done"
+        assert await asyncio.wait_for(queued, 0.5) == "done"
+
+        # process-pool calls see the flag too
+        marker.unlink()
+        call = asyncio.create_task(
+            tools["process_polling_tool"].run_json({"marker": str(marker)}, ct)
+        )
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            if marker.exists():
+                break
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if marker.read_text() == "stopped":
+                break
+        assert marker.read_text() == "stopped"
+    finally:
+        configure_tool_executors(threads=8)
+        shutdown_tool_executors()
@@ -0,0 +1,425 @@
+import asyncio
+import time
+
+import pytest
+
+from .conftest import require_pkgs
+
+
+def make_pdf(*texts: str) -> bytes:
+    """A minimal PDF with one page showing each of `texts`."""
+    n = len(texts)
+    # objects: 1 catalog, 2 pages, 3 font, then a page and its content per text
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(n))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(texts):
+        content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        page = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Contents {5 + 2 * i} 0 R /Resources << /Font << /F1 3 0 R >> >> >>"
+        )
+        objects.append(page.encode())
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+        )
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    out += b"startxref\n%d\n%%%%EOF\n" % xref
+    return out
+
+
+@pytest.fixture
+async def site():
+    """A local web server; counts concurrent requests and HEAD requests."""
+    from aiohttp import web
+
+    state = {"active": 0, "peak": 0, "heads": 0}
+
+    async def page(request):
+        if request.method == "HEAD":
+            state["heads"] += 1
+        state.setdefault("pages", []).append(request.match_info["name"])
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(float(request.query.get("delay", 0.1)))
+        finally:
+            state["active"] -= 1
+        return web.Response(
+            text="<html><script>x()</script><body><p>Hello "
+            f"{request.match_info['name']}</p></body></html>",
+            content_type="text/html",
+        )
+
+    async def pdf(request):
+        # served without a PDF content type: recognised by its magic bytes
+        return web.Response(
+            body=make_pdf("Annual report"), content_type="application/octet-stream"
+        )
+
+    async def broken(request):
+        state["broken"] = state.get("broken", 0) + 1
+        if state.get("fixed"):
+            return web.Response(text="<p>Fixed</p>", content_type="text/html")
+        raise web.HTTPInternalServerError()
+
+    async def huge(request):
+        # an endless page: a client must stop reading on its own
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        await response.prepare(request)
+        await response.write(b"<html><body><main><p>" + b"word " * 2000 + b"</p>")
+        state["huge_chunks"] = 0
+        try:
+            for _ in range(500):
+                await response.write(b"<p>" + b"more " * 10000 + b"</p>")
+                state["huge_chunks"] += 1
+                await asyncio.sleep(0.01)
+        except (ConnectionError, RuntimeError):
+            pass
+        return response
+
+    async def cached(request):
+        # revalidated by ETag; the text changes only with the ETag
+        state.setdefault("cached", []).append(request.headers.get("If-None-Match"))
+        etag = f'"v{state.get("version", 1)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=f"<p>{request.match_info['name']} {etag}</p>",
+            content_type="text/html",
+            headers={"ETag": etag},
+        )
+
+    async def search(request):
+        state["query"] = request.query["q"]
+        state["searches"] = state.get("searches", 0) + 1
+        base = f"http://{request.host}"
+        items = [
+            {"title": f"Result {i}", "link": f"{base}/page/{i}", "snippet": "..."}
+            for i in range(int(request.query["num"]))
+        ]
+        return web.json_response({"items": items})
+
+    app = web.Application()
+    app.router.add_get("/page/{name}", page)
+    app.router.add_get("/report", pdf)
+    app.router.add_get("/broken", broken)
+    app.router.add_get("/huge", huge)
+    app.router.add_get("/customsearch", search)
+    app.router.add_get("/cached/{name}", cached)
+    runner = web.AppRunner(app, shutdown_timeout=0.1)
+    await runner.setup()
+    server = web.TCPSite(runner, "127.0.0.1", 0)
+    await server.start()
+    port = runner.addresses[0][1]
+    yield f"http://127.0.0.1:{port}", state
+    await runner.cleanup()
+
+
+@pytest.mark.tools
+@pytest.mark.asyncio
+async def test_fetch_many_is_concurrent_and_polite(site):
+    require_pkgs(["pypdf"])
+    from mchat_core.web_fetch import FETCH_ERROR, PageFetcher
+
+    base, state = site
+    fetcher = PageFetcher(per_host=2, host_interval=0.0)
+    urls = [f"{base}/page/{i}?delay=0.2" for i in range(6)]
+    try:
+        start = time.perf_counter()
+        texts = await fetcher.fetch_many(
+            urls + [f"{base}/report", f"{base}/broken"], max_chars=100
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        await fetcher.close()
+
+    assert texts[urls[3]] == "Hello 3"
+    assert texts[f"{base}/report"] == "Annual report"
+    assert texts[f"{base}/broken"] == FETCH_ERROR
+    # at most two connections to the host at once, no HEAD requests
+    assert state["peak"] == 2
+    assert state["heads"] == 0
+    # six 0.2s pages two at a time (0.6s), not one after the other (1.2s)
+    assert elapsed < 1.0
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_deadline_returns_finished_pages(site):
+    from mchat_core.web_fetch import FETCH_TIMEOUT, PageFetcher
+
+    base, state = site
+    fetcher = PageFetcher()
+    fast, slow = f"{base}/page/fast?delay=0", f"{base}/page/slow?delay=5"
+    try:
+        start = time.perf_counter()
+        texts = await fetcher.fetch_many([fast, slow], max_chars=100, deadline=0.3)
+        assert time.perf_counter() - start < 1
+    finally:
+        await fetcher.close()
+    assert texts == {fast: "Hello fast", slow: FETCH_TIMEOUT}
+
+
+@pytest.mark.asyncio
+async def test_host_interval_spaces_request_starts():
+    from mchat_core.web_fetch import PageFetcher
+
+    fetcher = PageFetcher(host_interval=0.1)
+    await fetcher.session()
+    starts = []
+
+    async def start(host):
+        await fetcher._polite(host)
+        starts.append((host, time.monotonic()))
+
+    await asyncio.gather(*(start("a.example") for _ in range(3)), start("b.example"))
+    await fetcher.close()
+    a_starts = [t for host, t in starts if host == "a.example"]
+    assert a_starts[2] - a_starts[0] >= 0.19
+    # other hosts are not held back
+    assert [host for host, _ in starts][:2].count("b.example") == 1
+
+
+@pytest.mark.tools
+@pytest.mark.asyncio
+async def test_google_search_returns_snippets_and_prefetches(
+    site, monkeypatch, tmp_path
+):
+    require_pkgs(["pypdf"])
+    from mchat_core.tools import _web_search
+
+    base, state = site
+    monkeypatch.setattr(
+        _web_search,
+        "settings",
+        {
+            "google_api_key": "k",
+            "google_search_engine_id": "cx",
+            "google_search_cache_path": str(tmp_path),
+            "google_search_prefetch": 2,
+        },
+    )
+    monkeypatch.setattr(_web_search, "_fetcher", None)
+    search = _web_search.GoogleSearchTool()
+    fetch_page = _web_search.FetchPageTool()
+    assert search.is_callable and fetch_page.is_callable
+    assert fetch_page.fetcher is search.fetcher
+    search.api_url = f"{base}/customsearch"
+    search.fetcher.host_interval = 0.0
+    try:
+        start = time.perf_counter()
+        results = await search.arun("gdp", num_results=4)
+        # returned without waiting for any page
+        assert time.perf_counter() - start < 0.1
+        assert state["query"] == "gdp"
+        assert results[0] == {
+            "title": "Result 0",
+            "link": f"{base}/page/0",
+            "snippet": "...",
+        }
+
+        # the top two pages were prefetched; reading one waits for that fetch
+        assert await fetch_page.arun(results[0]["link"], max_chars=5) == "Hello"
+        assert await fetch_page.arun(results[3]["link"]) == "Hello 3"
+        assert sorted(state["pages"]) == ["0", "1", "3"]
+
+        # the text of the top pages can be returned with the results
+        results = await search.arun("gdp", num_results=4, include_text=3)
+        assert [r.get("text") for r in results] == [
+            "Hello 0",
+            "Hello 1",
+            "Hello 2",
+            None,
+        ]
+    finally:
+        await search.fetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_fetch_text_joins_a_running_prefetch(site):
+    from mchat_core.web_fetch import PageFetcher
+
+    base, state = site
+    fetcher = PageFetcher(host_interval=0.0)
+    url = f"{base}/page/a?delay=0.2"
+    try:
+        fetcher.prefetch([url, url], max_chars=100)
+        await asyncio.sleep(0.05)
+        # a caller giving up does not cancel the prefetch
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(fetcher.fetch_text(url, 100), 0.01)
+        assert await fetcher.fetch_text(url, 100) == "Hello a"
+        assert state["pages"] == ["a"]
+        # more text than was prefetched is fetched again
+        assert await fetcher.fetch_text(url, 1000) == "Hello a"
+        assert state["pages"] == ["a", "a"]
+    finally:
+        await fetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_fetch_text_retries_a_failed_prefetch(site):
+    from mchat_core.web_fetch import PageFetcher
+
+    base, state = site
+    fetcher = PageFetcher(host_interval=0.0)
+    url = f"{base}/broken"
+    try:
+        fetcher.prefetch([url], max_chars=100)
+        await asyncio.sleep(0.1)
+        assert state["broken"] == 1
+        # the failed prefetch is dropped and the page fetched again
+        state["fixed"] = True
+        assert await fetcher.fetch_text(url, 100) == "Fixed"
+        assert state["broken"] == 2
+        assert url not in fetcher._prefetched
+
+        # a finished prefetch is replaced by a new one, and used only once
+        fetcher.prefetch([url], max_chars=100)
+        await asyncio.sleep(0.1)
+        fetcher.prefetch([url], max_chars=100)
+        assert await fetcher.fetch_text(url, 100) == "Fixed"
+        assert state["broken"] == 4
+        assert url not in fetcher._prefetched
+    finally:
+        await fetcher.close()
+
+
+def test_html_extractor_keeps_main_content():
+    from mchat_core.web_fetch import HTMLTextExtractor, extract_html_text
+
+    page = """
+    <html><head><title>T</title><style>p {color: red}</style></head>
+    <body>
+      <header>Site banner</header>
+      <nav><a href="/">Home</a></nav>
+      <div role="navigation">Breadcrumbs</div>
+      <main><h1>Inflation &amp; rates</h1><p>Prices rose<br>2%.</p>
+        <aside>Related links</aside><p hidden>secret</p></main>
+      <footer>Copyright</footer><script>track()</script>
+    </body></html>
+    """
+    assert extract_html_text(page, 100) == "Inflation & rates Prices rose 2%."
+    # without main markup, everything outside boilerplate is kept
+    assert extract_html_text("<div>a<nav>b</nav><p>c</div>", 100) == "a c"
+
+    extractor = HTMLTextExtractor(max_chars=20)
+    extractor.feed("<main><p>" + "word " * 10 + "</p>")
+    assert extractor.done
+    assert extractor.text() == "word word word word"
+
+
+def test_pdf_extraction_reads_only_needed_pages(monkeypatch):
+    require_pkgs(["pypdf"])
+    from pypdf import PageObject
+
+    from mchat_core.web_fetch import extract_pdf_text
+
+    calls = []
+    extract = PageObject.extract_text
+
+    def counting(self, *args, **kwargs):
+        calls.append(1)
+        return extract(self, *args, **kwargs)
+
+    monkeypatch.setattr(PageObject, "extract_text", counting)
+    pdf = make_pdf("First page text", "Second page text", "Third page text")
+    assert extract_pdf_text(pdf, 20) == "First page textSecon"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_stops_reading_once_text_is_collected(site):
+    from mchat_core.web_fetch import PageFetcher
+
+    base, state = site
+    fetcher = PageFetcher(host_interval=0.0)
+    try:
+        start = time.perf_counter()
+        text = await fetcher.fetch_text(f"{base}/huge", max_chars=50)
+        elapsed = time.perf_counter() - start
+    finally:
+        await fetcher.close()
+    assert text == ("word " * 10).strip()
+    # the rest of the (5s, 250MB) page was never downloaded
+    assert elapsed < 1.0
+    await asyncio.sleep(0.1)
+    assert state["huge_chunks"] < 50
+
+
+@pytest.mark.asyncio
+async def test_web_cache_serves_and_revalidates_pages(site, tmp_path):
+    from mchat_core.web_fetch import PageFetcher, WebCache
+
+    base, state = site
+    url = f"{base}/cached/a"
+    fetcher = PageFetcher(host_interval=0.0, cache=WebCache(str(tmp_path)))
+    try:
+        assert await fetcher.fetch_text(url, 100) == 'a "v1"'
+        # fresh: no request, whether fewer or more characters are wanted (the
+        # page had less text than the first request asked for)
+        assert await fetcher.fetch_text(url, 2) == "a"
+        assert await fetcher.fetch_text(url, 1000) == 'a "v1"'
+        assert state["cached"] == [None]
+
+        # index changes are batched; none is written yet
+        assert not (tmp_path / "index.json").exists()
+        await fetcher.save_cache()
+
+        # a new cache on the same directory, with every entry stale
+        fetcher.cache = WebCache(str(tmp_path), ttl=0)
+        assert await fetcher.fetch_text(url, 100) == 'a "v1"'
+        assert fetcher.cache.revalidations == 1
+        state["version"] = 2
+        assert await fetcher.fetch_text(url, 100) == 'a "v2"'
+        assert state["cached"] == [None, '"v1"', '"v1"']
+    finally:
+        await fetcher.close()
+
+    # only extracted text is stored, in content-addressed blobs
+    blobs = sorted(p.read_text() for p in tmp_path.glob("blobs/*/*"))
+    assert blobs == ['a "v1"', 'a "v2"']
+
+
+@pytest.mark.asyncio
+async def test_web_cache_api_responses_and_eviction(site, tmp_path):
+    from mchat_core.web_fetch import PageFetcher, WebCache
+
+    base, state = site
+    cache = WebCache(str(tmp_path), api_ttl=60)
+    fetcher = PageFetcher(cache=cache)
+    url = f"{base}/customsearch"
+    try:
+        first = await fetcher.get_json(url, {"q": "gdp", "num": 2, "key": "secret"})
+        again = await fetcher.get_json(url, {"key": "secret", "num": 2, "q": "gdp"})
+        await fetcher.get_json(url, {"q": "cpi", "num": 2, "key": "secret"})
+    finally:
+        await fetcher.close()
+    assert first == again
+    assert state["searches"] == 2
+    # credentials in the parameters are not written to the index
+    assert "secret" not in (tmp_path / "index.json").read_text()
+
+    # least recently used entries go first once over the size limit
+    cache = WebCache(str(tmp_path / "small"), max_bytes=10)
+    cache.put_page("http://a", "aaaa", 100, {})
+    cache.put_page("http://b", "bbbb", 100, {})
+    assert cache.get_page("http://a", 100).text == "aaaa"
+    cache.put_page("http://c", "cccc", 100, {})
+    assert cache.get_page("http://b", 100) is None
+    assert cache.get_page("http://a", 100) is not None
+    assert len(list((tmp_path / "small").glob("blobs/*/*"))) == 2
+    # uncacheable responses are not stored
+    cache.put_page("http://d", "dddd", 100, {"Cache-Control": "private, no-store"})
+    assert cache.get_page("http://d", 100) is None